@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DashScope 任务轮询基准测试（假 DashScope 服务器）
+
+分几轮提交 N 个文生图任务，比较：
+  - 原来的方式：每个任务固定每 2 秒查询一次
+  - 集中轮询器：按历史完成耗时自适应退避
+报告任务就绪到等待方被唤醒之间的延迟（平均 / 最大）和查询请求总数。
+
+用法:
+  python benchmarks/bench_dashscope_poller.py --tasks 10 --rounds 3
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "scripts"))
+
+import anyio
+
+from stub_servers import FakeDashScope, StubServer
+from dashscope_poller import DashScopePoller
+from http_pool import http_client, http_client_lifespan
+
+
+async def submit(client, api_root: str) -> str:
+    response = await client.post(
+        f"{api_root}/services/aigc/text2image/image-synthesis",
+        json={"model": "fake", "input": {"prompt": "x"}},
+    )
+    return response.json()["output"]["task_id"]
+
+
+async def wait_fixed_interval(client, api_root: str, task_id: str) -> None:
+    """原来的轮询方式：每 2 秒查询一次"""
+    for _ in range(60):
+        await anyio.sleep(2)
+        response = await client.get(f"{api_root}/tasks/{task_id}")
+        if response.json()["output"]["task_status"] in ("SUCCEEDED", "FAILED"):
+            return
+
+
+async def run_rounds(fake: FakeDashScope, api_root: str, tasks: int, rounds: int, adaptive: bool) -> list[float]:
+    lags: list[float] = []
+
+    async with http_client_lifespan(), http_client() as client, anyio.create_task_group() as poller_tg:
+        poller = DashScopePoller(api_root, "bench")
+        poller_tg.start_soon(poller.run)
+
+        async def one_task():
+            task_id = await submit(client, api_root)
+            if adaptive:
+                await poller.wait(task_id)
+            else:
+                await wait_fixed_interval(client, api_root, task_id)
+            lags.append(time.monotonic() - fake.ready_at[task_id])
+
+        for _ in range(rounds):
+            async with anyio.create_task_group() as tg:
+                for _ in range(tasks):
+                    tg.start_soon(one_task)
+
+        poller_tg.cancel_scope.cancel()
+
+    return lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DashScope polling benchmark")
+    parser.add_argument("--tasks", type=int, default=10, help="每轮并发任务数")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--min-seconds", type=float, default=2.0)
+    parser.add_argument("--max-seconds", type=float, default=4.0)
+    args = parser.parse_args()
+
+    results = {}
+    for adaptive in (False, True):
+        with StubServer() as server:
+            fake = FakeDashScope(server, args.min_seconds, args.max_seconds)
+            api_root = f"{server.base_url}/api/v1"
+            lags = anyio.run(run_rounds, fake, api_root, args.tasks, args.rounds, adaptive)
+            results[adaptive] = (lags, sum(fake.polls.values()))
+
+    print("=" * 60)
+    print(f"DashScope Polling Benchmark ({args.rounds} rounds x {args.tasks} tasks)")
+    print("=" * 60)
+    for adaptive, label in ((False, "Fixed 2s interval"), (True, "Adaptive poller")):
+        lags, polls = results[adaptive]
+        print(f"{label:18s}: lag mean {statistics.mean(lags):5.2f}s  max {max(lags):5.2f}s  {polls:4d} polls")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
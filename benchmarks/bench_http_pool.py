@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享连接池基准测试
+
+对本地 /v1/messages 桩服务器发起 N 次 call_api_direct 调用，比较：
+  - 每次调用新建客户端（不在 http_client_lifespan 内，等同于原来的行为）
+  - 共享连接池（在 http_client_lifespan 内）
+报告总耗时和服务器端看到的 TCP 连接数。
+
+用法:
+  python benchmarks/bench_http_pool.py --calls 200 --concurrency 10
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "scripts"))
+
+import anyio
+
+from stub_servers import StubResponse, StubServer
+from http_pool import http_client_lifespan
+import cloud_paper_reader
+
+
+def messages_handler(request):
+    return StubResponse(200, {
+        "content": [{"type": "text", "text": "ok"}],
+        "usage": {"input_tokens": 10, "output_tokens": 1},
+    })
+
+
+async def run_calls(calls: int, concurrency: int) -> float:
+    limiter = anyio.CapacityLimiter(concurrency)
+
+    async def one_call():
+        async with limiter:
+            await cloud_paper_reader.call_api_direct("ping", max_tokens=1)
+
+    start = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for _ in range(calls):
+            tg.start_soon(one_call)
+    return time.perf_counter() - start
+
+
+async def run_shared(calls: int, concurrency: int) -> float:
+    async with http_client_lifespan():
+        return await run_calls(calls, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared HTTP client benchmark")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.005, help="桩服务器每个请求的延迟（秒）")
+    args = parser.parse_args()
+
+    with StubServer([("POST", r"/v1/messages", messages_handler)], latency=args.latency) as server:
+        os.environ["ANTHROPIC_API_KEY"] = "bench"
+        os.environ["ANTHROPIC_BASE_URL"] = server.base_url
+
+        fresh_time = anyio.run(run_calls, args.calls, args.concurrency)
+        fresh_connections = server.connections
+        server.reset_stats()
+
+        shared_time = anyio.run(run_shared, args.calls, args.concurrency)
+        shared_connections = server.connections
+
+    print("=" * 60)
+    print(f"HTTP Client Benchmark ({args.calls} calls, concurrency {args.concurrency})")
+    print("=" * 60)
+    print(f"Fresh client per call: {fresh_time:6.2f}s  {args.calls / fresh_time:7.1f} req/s  {fresh_connections:4d} connections")
+    print(f"Shared pooled client:  {shared_time:6.2f}s  {args.calls / shared_time:7.1f} req/s  {shared_connections:4d} connections")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown -> HTML 渲染微基准测试
+
+用仓库里已有的解读 Markdown 循环渲染 N 篇文档，比较：
+  - 每篇文档调用 markdown.markdown()（每次新建转换器、重新加载 5 个扩展）+ 重新拼接模板
+  - 复用的转换器（reset）+ 预先拼好的 PageTemplate（paper_render.markdown_to_html / render_page）
+报告 docs/second，并校验两种方式输出一致。
+
+用法:
+  python benchmarks/bench_markdown_render.py --docs 5000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "scripts"))
+
+import markdown
+
+from paper_render import MARKDOWN_EXTENSIONS, PAGE_STYLESHEET, markdown_to_html, render_page
+
+
+def render_fresh(md_content: str) -> str:
+    """原来的做法：每篇文档新建转换器，并用 f-string 拼接整页模板"""
+    body = markdown.markdown(md_content, extensions=MARKDOWN_EXTENSIONS)
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>论文解读</title>
+    <style>
+{PAGE_STYLESHEET}    </style>
+</head>
+<body>
+<div class="container">
+{body}
+<footer>
+    <p>本解读由 GitHub Actions + Claude Agent SDK + 通义万相 自动生成</p>
+</footer>
+</div>
+</body>
+</html>"""
+
+
+def render_shared(md_content: str) -> str:
+    return render_page(markdown_to_html(md_content))
+
+
+def timed(render, docs: list[str]) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    outputs = [render(doc) for doc in docs]
+    return outputs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdown render micro-benchmark")
+    parser.add_argument("--docs", type=int, default=5000)
+    args = parser.parse_args()
+
+    sources = sorted(REPO_DIR.glob("paper-explanation-*.md")) + sorted((REPO_DIR / "outputs").glob("*.md"))
+    texts = [path.read_text(encoding="utf-8") for path in sources]
+    # 只取前 2000 字符：模拟大量短文档，突出每篇文档的固定开销
+    docs = [texts[i % len(texts)][:2000] for i in range(args.docs)]
+
+    fresh_out, fresh_time = timed(render_fresh, docs)
+    shared_out, shared_time = timed(render_shared, docs)
+
+    print("=" * 60)
+    print(f"Markdown Render Benchmark ({args.docs} documents, {len(texts)} sources)")
+    print("=" * 60)
+    print(f"markdown.markdown() per doc: {fresh_time:7.2f}s  {args.docs / fresh_time:9.1f} docs/s")
+    print(f"Shared converter + template: {shared_time:7.2f}s  {args.docs / shared_time:9.1f} docs/s")
+    print(f"Speedup:                     {fresh_time / shared_time:7.2f}x")
+    print(f"Output identical:            {fresh_out == shared_out}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 渲染基准测试：冷启动 vs 预热复用
+
+用仓库里已有的解读 Markdown 生成 HTML，连续渲染 N 篇 PDF，比较：
+  - 冷启动：每篇文档新建 FontConfiguration 和样式表（等同于原来的 convert_html_to_pdf）
+  - 预热复用：一个 PdfRenderer 渲染所有文档
+  - 常驻 worker：在 pdf_renderer_lifespan 内通过 render_pdf 渲染（含进程间传输开销）
+报告首篇耗时、平均和 p50 单篇耗时。
+
+用法:
+  python benchmarks/bench_pdf_render.py --docs 20
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "scripts"))
+
+from paper_render import markdown_to_html, render_page
+from pdf_renderer import PdfRenderer, pdf_renderer_lifespan, render_pdf
+
+
+def cold_render(html: str, pdf_file: Path) -> float:
+    start = time.perf_counter()
+    PdfRenderer().write_pdf(html, pdf_file)
+    return time.perf_counter() - start
+
+
+def warm_render(renderer: PdfRenderer, html: str, pdf_file: Path) -> float:
+    start = time.perf_counter()
+    renderer.write_pdf(html, pdf_file)
+    return time.perf_counter() - start
+
+
+def worker_render(html: str, pdf_file: Path) -> float:
+    start = time.perf_counter()
+    render_pdf(html, pdf_file)
+    return time.perf_counter() - start
+
+
+def report(name: str, times: list[float]) -> None:
+    print(f"{name:<16} first {times[0]:6.2f}s  mean {statistics.mean(times):6.2f}s  "
+          f"p50 {statistics.median(times):6.2f}s  total {sum(times):7.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF render benchmark")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--source", type=Path, default=REPO_DIR / "paper-explanation-20260114-134500.md")
+    args = parser.parse_args()
+
+    html = render_page(markdown_to_html(args.source.read_text(encoding="utf-8")))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        cold = [cold_render(html, out / f"cold-{i}.pdf") for i in range(args.docs)]
+
+        startup = time.perf_counter()
+        renderer = PdfRenderer()
+        startup = time.perf_counter() - startup
+        warm = [warm_render(renderer, html, out / f"warm-{i}.pdf") for i in range(args.docs)]
+
+        with pdf_renderer_lifespan(workers=1):
+            # 模拟流水线：worker 在 LLM 调用期间完成预热
+            time.sleep(max(2.0, startup * 2))
+            worker = [worker_render(html, out / f"worker-{i}.pdf") for i in range(args.docs)]
+
+    print("=" * 60)
+    print(f"PDF Render Benchmark ({args.docs} documents, {len(html)} characters of HTML)")
+    print("=" * 60)
+    print(f"Renderer startup (fonts + stylesheet): {startup:.2f}s")
+    report("Cold", cold)
+    report("Warm", warm)
+    report("Resident worker", worker)
+    print(f"Speedup (mean):   {statistics.mean(cold) / statistics.mean(warm):6.2f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
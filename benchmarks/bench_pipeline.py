@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端流水线基准测试（全部使用本地假服务，不消耗 API 额度）
+
+启动本地的假 /v1/messages、Gemini :generateContent 和 DashScope 任务 API，
+把 ANTHROPIC_BASE_URL / GEMINI_BASE_URL / DASHSCOPE_BASE_URL 指向它们，
+以 --batch 模式在子进程里运行 cloud_paper_reader.py，对每个并发度报告：
+  - 吞吐（papers/minute）
+  - 单篇论文耗时的 p50 / p95（来自每次运行写入的 run-reports.jsonl）
+  - 主进程峰值内存（ru_maxrss）
+  - 假服务收到的请求数
+
+论文用 transformer-paper.pdf 复制出 N 份；每个并发度使用独立的临时工作目录，
+并加 --no-cache，保证每篇论文都走完整流程。
+已安装 claude-agent-sdk 时 SDK 同样读取 ANTHROPIC_BASE_URL；加 --stream 则直接走 SSE 流式 API。
+
+用法:
+  python benchmarks/bench_pipeline.py --papers 12 --concurrency 1 3 6 --claude-latency 2 --gemini-latency 1
+  python benchmarks/bench_pipeline.py --provider dashscope --dashscope-seconds 2 4
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "scripts"))
+
+from stub_servers import FakeClaude, FakeDashScope, FakeGemini, StubServer
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_batch(workdir: Path, env: dict, concurrency: int, extra_args: list[str]) -> tuple[float, int, int]:
+    """在子进程中运行一次批量处理，返回 (耗时, 退出码, 峰值内存 KB)"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(REPO_DIR / "scripts" / "cloud_paper_reader.py"),
+         "--batch", "--papers-dir", str(workdir / "papers"), "--concurrency", str(concurrency),
+         "--no-cache", *extra_args],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return time.perf_counter() - start, process.returncode, usage.ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark against local fake APIs")
+    parser.add_argument("--papers", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--source", type=Path, default=REPO_DIR / "transformer-paper.pdf")
+    parser.add_argument("--provider", choices=["gemini", "dashscope"], default="gemini",
+                        help="配图服务（dashscope 时不设置 GEMINI_API_KEY）")
+    parser.add_argument("--claude-latency", type=float, default=2.0, help="/v1/messages 响应延迟（秒）")
+    parser.add_argument("--claude-chars", type=int, default=6000, help="解读正文长度（字符）")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="Gemini 出图延迟（秒）")
+    parser.add_argument("--image-kb", type=int, default=200, help="返回图片大小（KB）")
+    parser.add_argument("--dashscope-seconds", type=float, nargs=2, default=[2.0, 4.0],
+                        metavar=("MIN", "MAX"), help="DashScope 任务完成耗时范围（秒）")
+    parser.add_argument("--stream", action="store_true", help="以 --stream 运行（SSE 流式调用）")
+    args = parser.parse_args()
+
+    server = StubServer().start()
+    claude = FakeClaude(server, reply_chars=args.claude_chars, latency=args.claude_latency)
+    gemini = FakeGemini(server, latency=args.gemini_latency, image_bytes=args.image_kb * 1024)
+    FakeDashScope(server, *args.dashscope_seconds)
+
+    env = {
+        **os.environ,
+        "ANTHROPIC_API_KEY": "bench",
+        "ANTHROPIC_BASE_URL": server.base_url,
+        "GEMINI_BASE_URL": f"{server.base_url}/v1beta/models",
+        "DASHSCOPE_API_KEY": "bench",
+        "DASHSCOPE_BASE_URL": f"{server.base_url}/compatible-mode/v1",
+        "PYTHONUNBUFFERED": "1",
+    }
+    if args.provider == "gemini":
+        env["GEMINI_API_KEY"] = "bench"
+    else:
+        env.pop("GEMINI_API_KEY", None)
+    extra_args = ["--stream"] if args.stream else []
+
+    rows = []
+    try:
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+                workdir = Path(tmp)
+                (workdir / "papers").mkdir()
+                for i in range(args.papers):
+                    shutil.copy(args.source, workdir / "papers" / f"paper-{i:03d}.pdf")
+
+                server.reset_stats()
+                elapsed, returncode, max_rss_kb = run_batch(workdir, env, concurrency, extra_args)
+
+                reports_file = workdir / "outputs" / "run-reports.jsonl"
+                reports = [json.loads(line) for line in reports_file.read_text(encoding="utf-8").splitlines()] \
+                    if reports_file.exists() else []
+                durations = [r["duration"] for r in reports if r["status"] == "ok"]
+                rows.append({
+                    "concurrency": concurrency,
+                    "ok": len(durations),
+                    "elapsed": elapsed,
+                    "ppm": len(durations) / elapsed * 60,
+                    "p50": statistics.median(durations) if durations else float("nan"),
+                    "p95": percentile(durations, 0.95) if durations else float("nan"),
+                    "rss_mb": max_rss_kb / 1024,
+                    "requests": server.requests,
+                    "returncode": returncode,
+                })
+    finally:
+        server.stop()
+
+    print("=" * 78)
+    print(f"Pipeline Benchmark ({args.papers} papers, images via {args.provider}, "
+          f"claude {args.claude_latency}s / {args.claude_chars} chars, image {args.image_kb} KB)")
+    print("=" * 78)
+    print(f"{'conc':>5}{'ok':>5}{'wall':>9}{'papers/min':>12}{'p50':>8}{'p95':>8}{'peak RSS':>11}{'requests':>10}{'exit':>6}")
+    for row in rows:
+        print(f"{row['concurrency']:>5}{row['ok']:>5}{row['elapsed']:>8.1f}s{row['ppm']:>12.1f}"
+              f"{row['p50']:>7.1f}s{row['p95']:>7.1f}s{row['rss_mb']:>9.0f}MB{row['requests']:>10}{row['returncode']:>6}")
+    print(f"Claude requests: {len(claude.requests)}, Gemini requests: {gemini.requests}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
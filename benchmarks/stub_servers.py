@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地桩服务器（基准测试用）
+在后台线程里启动一个 HTTP/1.1 keep-alive 服务器，按 (方法, 路径正则) 分发到处理函数，
+并统计请求数和 TCP 连接数，用来观察连接复用等效果。
+"""
+
+import re
+import json
+import time
+import threading
+from dataclasses import dataclass, field
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable
+
+
+@dataclass
+class StubRequest:
+    method: str
+    path: str
+    headers: dict
+    body: bytes
+    match: re.Match
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+
+@dataclass
+class StubResponse:
+    status: int = 200
+    body: bytes | dict | list = b""
+    headers: dict = field(default_factory=dict)
+
+    def encode(self) -> tuple[bytes, str]:
+        if isinstance(self.body, (dict, list)):
+            return json.dumps(self.body, ensure_ascii=False).encode("utf-8"), "application/json"
+        return self.body, self.headers.get("Content-Type", "application/octet-stream")
+
+
+Handler = Callable[[StubRequest], StubResponse]
+
+
+class StubServer:
+    """可编程的本地 HTTP 桩服务器"""
+
+    def __init__(self, routes: list[tuple[str, str, Handler]] | None = None, latency: float = 0.0):
+        self.routes = [(method, re.compile(pattern), handler) for method, pattern, handler in routes or []]
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def route(self, method: str, pattern: str, handler: Handler) -> None:
+        self.routes.append((method, re.compile(pattern), handler))
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+
+    def _dispatch(self, method: str, path: str, headers: dict, body: bytes) -> StubResponse:
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path.split("?", 1)[0])
+            if route_method == method and match:
+                return handler(StubRequest(method, path, headers, body, match))
+        return StubResponse(404, {"error": f"no route for {method} {path}"})
+
+    def start(self) -> "StubServer":
+        stub = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持 keep-alive
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                with stub._lock:
+                    stub.requests += 1
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                if stub.latency:
+                    time.sleep(stub.latency)
+                response = stub._dispatch(self.command, self.path, dict(self.headers), body)
+                payload, content_type = response.encode()
+                self.send_response(response.status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in response.headers.items():
+                    if key != "Content-Type":
+                        self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _handle
+            do_POST = _handle
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+# 1x1 PNG，供假图片下载接口返回
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+class FakeDashScope:
+    """假的 DashScope 文生图异步任务 API
+
+    每个任务的完成耗时在 [min_seconds, max_seconds] 之间随机（或由 durations 依次指定），
+    记录每个任务的就绪时间和被查询次数。
+    """
+
+    def __init__(self, server: StubServer, min_seconds: float = 2.0, max_seconds: float = 4.0,
+                 durations: list[float] | None = None, image: bytes = TINY_PNG):
+        import random
+
+        self.server = server
+        self.random = random.Random(0)
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.durations = list(durations or [])
+        self.image = image
+        self.ready_at: dict[str, float] = {}
+        self.polls: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+        server.route("POST", r"/api/v1/services/aigc/text2image/image-synthesis", self.submit)
+        server.route("GET", r"/api/v1/tasks/(?P<task_id>[\w-]+)", self.query)
+        server.route("GET", r"/images/(?P<task_id>[\w-]+)\.png", self.download)
+
+    def submit(self, request: StubRequest) -> StubResponse:
+        with self._lock:
+            self._next_id += 1
+            task_id = f"task-{self._next_id}"
+            duration = self.durations.pop(0) if self.durations else self.random.uniform(self.min_seconds, self.max_seconds)
+            self.ready_at[task_id] = time.monotonic() + duration
+            self.polls[task_id] = 0
+        return StubResponse(200, {"output": {"task_id": task_id, "task_status": "PENDING"}})
+
+    def query(self, request: StubRequest) -> StubResponse:
+        task_id = request.match.group("task_id")
+        if task_id not in self.ready_at:
+            return StubResponse(404, {"code": "NotFound"})
+        with self._lock:
+            self.polls[task_id] += 1
+        if time.monotonic() < self.ready_at[task_id]:
+            return StubResponse(200, {"output": {"task_id": task_id, "task_status": "RUNNING"}})
+        return StubResponse(200, {"output": {
+            "task_id": task_id,
+            "task_status": "SUCCEEDED",
+            "results": [{"url": f"{self.server.base_url}/images/{task_id}.png"}],
+        }})
+
+    def download(self, request: StubRequest) -> StubResponse:
+        return StubResponse(200, self.image, {"Content-Type": "image/png"})
+
+
+class FakeClaude:
+    """假的 Anthropic /v1/messages（支持 stream=true 的 SSE 输出）
+
+    reply_chars 控制回复长度；latency 为每次请求的响应延迟（秒）；
+    interrupt_streams 为前若干次流式请求在中途断开（不发送 message_stop）；
+    malformed_streams 为前若干次流式请求在中途夹带一行不完整的 data（JSON 无法解析）；
+    status 不为 200 时改为返回该状态码（模拟服务故障）。
+    带 cache_control 的系统提示词模拟提示词缓存：第一次计入 cache_creation_input_tokens，
+    之后计入 cache_read_input_tokens；前缀短于 min_cache_tokens 时不缓存（不模拟过期时间）。
+    """
+
+    def __init__(self, server: StubServer, reply_chars: int = 3000, interrupt_streams: int = 0,
+                 latency: float = 0.0, status: int = 200, min_cache_tokens: int = 1024,
+                 malformed_streams: int = 0):
+        self.server = server
+        self.reply_chars = reply_chars
+        self.interrupt_streams = interrupt_streams
+        self.malformed_streams = malformed_streams
+        self.latency = latency
+        self.status = status
+        self.min_cache_tokens = min_cache_tokens
+        self.requests: list[dict] = []
+        self.cached_prefixes: set[str] = set()
+        self._lock = threading.Lock()
+        server.route("POST", r"/v1/messages", self.messages)
+
+    def usage_for(self, payload: dict, text: str) -> dict:
+        usage = {"input_tokens": len(json.dumps(payload)) // 4, "output_tokens": len(text) // 2}
+        system = payload.get("system")
+        if isinstance(system, list) and any("cache_control" in block for block in system):
+            prefix = json.dumps(system)
+            prefix_tokens = len(prefix) // 4
+            if prefix_tokens < self.min_cache_tokens:
+                return usage
+            with self._lock:
+                hit = prefix in self.cached_prefixes
+                self.cached_prefixes.add(prefix)
+            usage["input_tokens"] -= prefix_tokens
+            usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = prefix_tokens
+        return usage
+
+    def reply_text(self) -> str:
+        body = "这是一段用于基准测试的解读内容。" * (self.reply_chars // 16 + 1)
+        return f"# 测试论文解读\n\n## 开场: 为什么要读这篇论文\n\n{body[:self.reply_chars]}"
+
+    def messages(self, request: StubRequest) -> StubResponse:
+        payload = request.json()
+        with self._lock:
+            self.requests.append(payload)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.status != 200:
+            return StubResponse(self.status, {"type": "error", "error": {"type": "api_error", "message": "stub outage"}})
+
+        text = self.reply_text()
+        # 续写请求：跳过 assistant 前缀已经包含的部分
+        if payload["messages"][-1]["role"] == "assistant":
+            text = text[len(payload["messages"][-1]["content"]):]
+        usage = self.usage_for(payload, text)
+
+        if not payload.get("stream"):
+            return StubResponse(200, {"content": [{"type": "text", "text": text}], "usage": usage})
+
+        with self._lock:
+            interrupt = self.interrupt_streams > 0
+            self.interrupt_streams -= 1 if interrupt else 0
+            malformed = not interrupt and self.malformed_streams > 0
+            self.malformed_streams -= 1 if malformed else 0
+
+        pieces = [text[i:i + 50] for i in range(0, len(text), 50)]
+        if interrupt:
+            pieces = pieces[: len(pieces) // 2]
+        events = [("message_start", {"type": "message_start", "message": {"usage": usage}})]
+        events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                            "delta": {"type": "text_delta", "text": piece}}) for piece in pieces]
+        if not interrupt:
+            events += [
+                ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                                   "usage": {"output_tokens": usage["output_tokens"]}}),
+                ("message_stop", {"type": "message_stop"}),
+            ]
+        lines = [f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n" for name, data in events]
+        if malformed:
+            lines.insert(len(lines) // 2, 'event: content_block_delta\ndata: {"type": "content_block_de\n\n')
+        body = "".join(lines)
+        return StubResponse(200, body.encode("utf-8"), {"Content-Type": "text/event-stream"})
+
+
+class FakeGemini:
+    """假的 Gemini :generateContent 图片生成接口
+
+    每次请求等待 latency 秒后返回一张 image_bytes 字节的图片（PNG 头 + 填充，base64 内联）；
+    status 不为 200 时改为返回该状态码（模拟服务故障）。
+    """
+
+    def __init__(self, server: StubServer, latency: float = 0.0, image_bytes: int = len(TINY_PNG),
+                 status: int = 200):
+        self.server = server
+        self.latency = latency
+        self.status = status
+        self.image = TINY_PNG + b"\0" * max(0, image_bytes - len(TINY_PNG))
+        self.requests = 0
+        self._lock = threading.Lock()
+        server.route("POST", r"/v1beta/models/(?P<model>[^/:]+):generateContent", self.generate)
+
+    def generate(self, request: StubRequest) -> StubResponse:
+        import base64
+
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.status != 200:
+            return StubResponse(self.status, {"error": {"code": self.status, "message": "stub outage"}})
+        return StubResponse(200, {"candidates": [{"content": {"parts": [
+            {"text": "ok"},
+            {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(self.image).decode("ascii")}},
+        ]}}]})
+
+
+class FakeMessageBatches:
+    """假的 Anthropic Message Batches API（/v1/messages/batches）
+
+    提交后 processing_seconds 秒内批次处于 in_progress，之后为 ended；结果由 claude（FakeClaude）
+    按同步调用的方式生成。fail_custom_ids 中的请求返回 errored 结果。
+    """
+
+    def __init__(self, server: StubServer, claude: "FakeClaude", processing_seconds: float = 1.0,
+                 fail_custom_ids: set[str] | None = None):
+        self.server = server
+        self.claude = claude
+        self.processing_seconds = processing_seconds
+        self.fail_custom_ids = fail_custom_ids or set()
+        self.batches: dict[str, dict] = {}
+        self.polls = 0
+        self._lock = threading.Lock()
+        server.route("POST", r"/v1/messages/batches", self.create)
+        server.route("GET", r"/v1/messages/batches/(?P<batch_id>[\w-]+)", self.retrieve)
+        server.route("GET", r"/v1/messages/batches/(?P<batch_id>[\w-]+)/results", self.results)
+
+    def create(self, request: StubRequest) -> StubResponse:
+        payload = request.json()
+        with self._lock:
+            batch_id = f"msgbatch_{len(self.batches) + 1:04d}"
+            self.batches[batch_id] = {"requests": payload["requests"], "created": time.monotonic()}
+        return StubResponse(200, self.batch_object(batch_id))
+
+    def batch_object(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        ended = time.monotonic() - batch["created"] >= self.processing_seconds
+        total = len(batch["requests"])
+        failed = sum(r["custom_id"] in self.fail_custom_ids for r in batch["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else total,
+                "succeeded": total - failed if ended else 0,
+                "errored": failed if ended else 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "results_url": f"{self.server.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def retrieve(self, request: StubRequest) -> StubResponse:
+        batch_id = request.match["batch_id"]
+        with self._lock:
+            self.polls += 1
+        if batch_id not in self.batches:
+            return StubResponse(404, {"type": "error", "error": {"type": "not_found_error", "message": batch_id}})
+        return StubResponse(200, self.batch_object(batch_id))
+
+    def results(self, request: StubRequest) -> StubResponse:
+        batch = self.batches[request.match["batch_id"]]
+        lines = []
+        for entry in batch["requests"]:
+            if entry["custom_id"] in self.fail_custom_ids:
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "invalid_request_error", "message": "prompt is too long"}}}
+            else:
+                text = self.claude.reply_text()
+                result = {"type": "succeeded", "message": {
+                    "id": f"msg_{entry['custom_id']}", "type": "message", "role": "assistant",
+                    "model": entry["params"]["model"], "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn", "usage": self.claude.usage_for(entry["params"], text),
+                }}
+            lines.append(json.dumps({"custom_id": entry["custom_id"], "result": result}, ensure_ascii=False))
+        return StubResponse(200, ("\n".join(lines) + "\n").encode("utf-8"), {"Content-Type": "application/binary"})
@@ -26,38 +26,12 @@ def install_packages():
 # 安装必要的包
 install_packages()
 
-import markdown
 from xhtml2pdf import pisa
 
-def convert_md_to_html(md_file, html_file):
-    """将Markdown转换为HTML"""
-    print(f"正在转换 {md_file} 到 HTML...")
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from paper_render import PageTemplate, markdown_to_html
 
-    # 读取Markdown文件
-    with open(md_file, 'r', encoding='utf-8') as f:
-        md_content = f.read()
-
-    # 配置Markdown扩展
-    extensions = [
-        'markdown.extensions.extra',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.toc',
-        'markdown.extensions.tables',
-        'markdown.extensions.fenced_code'
-    ]
-
-    # 转换为HTML
-    html_content = markdown.markdown(md_content, extensions=extensions)
-
-    # 添加HTML模板和样式
-    html_template = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Attention Is All You Need - 论文解读</title>
-    <style>
-        body {{
+PAGE_STYLESHEET = """        body {
             font-family: "Microsoft YaHei", "微软雅黑", "SimSun", "宋体", sans-serif;
             line-height: 1.8;
             max-width: 900px;
@@ -65,59 +39,59 @@ def convert_md_to_html(md_file, html_file):
             padding: 40px 20px;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: #333;
-        }}
-        .container {{
+        }
+        .container {
             background-color: white;
             padding: 50px;
             border-radius: 10px;
             box-shadow: 0 10px 40px rgba(0,0,0,0.1);
-        }}
-        h1 {{
+        }
+        h1 {
             color: #1a237e;
             border-bottom: 3px solid #3f51b5;
             padding-bottom: 10px;
             margin-top: 40px;
             font-size: 2.2em;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #283593;
             border-left: 4px solid #3f51b5;
             padding-left: 15px;
             margin-top: 35px;
             font-size: 1.8em;
-        }}
-        h3 {{
+        }
+        h3 {
             color: #3949ab;
             margin-top: 25px;
             font-size: 1.4em;
-        }}
-        p {{
+        }
+        p {
             text-align: justify;
             margin: 15px 0;
             font-size: 1.05em;
-        }}
-        code {{
+        }
+        code {
             background-color: #f4f4f4;
             padding: 2px 6px;
             border-radius: 3px;
             font-family: "Consolas", "Monaco", "Courier New", monospace;
             font-size: 0.9em;
             color: #e91e63;
-        }}
-        pre {{
+        }
+        pre {
             background-color: #2b2b2b;
             color: #f8f8f2;
             padding: 15px;
             border-radius: 5px;
             overflow-x: auto;
             font-family: "Consolas", "Monaco", "Courier New", monospace;
-        }}
-        pre code {{
+        }
+        pre code {
             background-color: transparent;
             color: inherit;
             padding: 0;
-        }}
-        blockquote {{
+        }
+        blockquote {
             border-left: 4px solid #ffb74d;
             padding-left: 15px;
             margin: 20px 0;
@@ -126,82 +100,91 @@ def convert_md_to_html(md_file, html_file):
             background-color: #fff8e1;
             padding: 15px;
             border-radius: 5px;
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
             margin: 20px 0;
             background-color: white;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #ddd;
             padding: 12px;
             text-align: left;
-        }}
-        th {{
+        }
+        th {
             background-color: #3f51b5;
             color: white;
             font-weight: bold;
-        }}
-        tr:nth-child(even) {{
+        }
+        tr:nth-child(even) {
             background-color: #f9f9f9;
-        }}
-        tr:hover {{
+        }
+        tr:hover {
             background-color: #f5f5f5;
-        }}
-        ul, ol {{
+        }
+        ul, ol {
             margin: 15px 0;
             padding-left: 30px;
-        }}
-        li {{
+        }
+        li {
             margin: 8px 0;
-        }}
-        strong {{
+        }
+        strong {
             color: #d32f2f;
             font-weight: 600;
-        }}
-        hr {{
+        }
+        hr {
             border: none;
             border-top: 2px solid #e0e0e0;
             margin: 30px 0;
-        }}
-        .metadata {{
+        }
+        .metadata {
             background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
             padding: 20px;
             border-radius: 8px;
             margin: 20px 0;
             border-left: 4px solid #2196f3;
-        }}
-        footer {{
+        }
+        footer {
             margin-top: 60px;
             padding-top: 20px;
             border-top: 1px solid #ddd;
             text-align: center;
             color: #999;
             font-size: 0.9em;
-        }}
-        @media print {{
-            body {{
+        }
+        @media print {
+            body {
                 background: white;
-            }}
-            .container {{
+            }
+            .container {
                 box-shadow: none;
                 padding: 20px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-<div class="container">
-{html_content}
-<footer>
-    <p>📚 本解读由 Claude Code (lunwen skill) 自动生成</p>
-    <p>🕐 生成时间: 2026年1月14日 | 🤖 基于 Transformer 论文 (Vaswani et al., 2017)</p>
-</footer>
-</div>
-</body>
-</html>"""
+            }
+        }
+"""
+
+PAGE_TEMPLATE = PageTemplate(
+    PAGE_STYLESHEET,
+    footer=(
+        "    <p>📚 本解读由 Claude Code (lunwen skill) 自动生成</p>\n"
+        "    <p>🕐 生成时间: 2026年1月14日 | 🤖 基于 Transformer 论文 (Vaswani et al., 2017)</p>\n"
+    ),
+)
+
+def convert_md_to_html(md_file, html_file):
+    """将Markdown转换为HTML"""
+    print(f"正在转换 {md_file} 到 HTML...")
+
+    # 读取Markdown文件
+    with open(md_file, 'r', encoding='utf-8') as f:
+        md_content = f.read()
+
+    # 转换为HTML（共享的 Markdown 转换器和页面模板，见 scripts/paper_render.py）
+    html_content = markdown_to_html(md_content)
+    html_template = PAGE_TEMPLATE.render(html_content, "Attention Is All You Need - 论文解读")
 
     # 写入HTML文件
     with open(html_file, 'w', encoding='utf-8') as f:
@@ -17,88 +17,85 @@ except ImportError:
     subprocess.check_call([sys.executable, "-m", "pip", "install", "xhtml2pdf", "-q"])
     from xhtml2pdf import pisa
 
-def convert_html_to_pdf(html_file, pdf_file):
-    """Convert HTML to PDF with simplified CSS"""
-    print(f"Converting {html_file} to PDF...")
-
-    # Read HTML
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from paper_render import PageTemplate
 
-    # Create simplified HTML for PDF
-    simplified_html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        @page {{
+# Simplified stylesheet for xhtml2pdf (compiled into the template once)
+PDF_STYLESHEET = """        @page {
             size: A4;
             margin: 2cm;
-        }}
-        body {{
+        }
+        body {
             font-family: SimSun, serif;
             line-height: 1.6;
             color: #333;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #1a237e;
             border-bottom: 2px solid #3f51b5;
             padding-bottom: 8px;
             page-break-after: avoid;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #283593;
             border-left: 3px solid #3f51b5;
             padding-left: 10px;
             page-break-after: avoid;
-        }}
-        h3 {{
+        }
+        h3 {
             color: #3949ab;
             page-break-after: avoid;
-        }}
-        p {{
+        }
+        p {
             text-align: justify;
             margin: 10px 0;
-        }}
-        code {{
+        }
+        code {
             background-color: #f4f4f4;
             padding: 2px 4px;
             font-family: Consolas, monospace;
-        }}
-        pre {{
+        }
+        pre {
             background-color: #f4f4f4;
             padding: 10px;
             border-left: 3px solid #999;
             page-break-inside: avoid;
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
             margin: 15px 0;
             page-break-inside: avoid;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #ddd;
             padding: 8px;
             text-align: left;
-        }}
-        th {{
+        }
+        th {
             background-color: #3f51b5;
             color: white;
-        }}
-        strong {{
+        }
+        strong {
             color: #d32f2f;
-        }}
-        hr {{
+        }
+        hr {
             border: none;
             border-top: 1px solid #ddd;
             margin: 20px 0;
-        }}
-    </style>
-</head>
-<body>
+        }
 """
 
+PDF_TEMPLATE = PageTemplate(PDF_STYLESHEET, container=False)
+
+def convert_html_to_pdf(html_file, pdf_file):
+    """Convert HTML to PDF with simplified CSS"""
+    print(f"Converting {html_file} to PDF...")
+
+    # Read HTML
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+
     # Extract content from HTML (remove container div and complex styles)
     import re
     # Find content between <div class="container"> and </div>
@@ -110,11 +107,8 @@ def convert_html_to_pdf(html_file, pdf_file):
         match = re.search(r'<body>(.*?)</body>', html_content, re.DOTALL)
         content = match.group(1) if match else html_content
 
-    simplified_html += content
-    simplified_html += """
-</body>
-</html>
-"""
+    # Create simplified HTML for PDF
+    simplified_html = PDF_TEMPLATE.render(content)
 
     # Convert to PDF
     try:
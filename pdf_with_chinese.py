@@ -21,116 +21,116 @@ except ImportError:
     from reportlab.pdfbase.ttfonts import TTFont
     from xhtml2pdf import pisa
 
-def register_chinese_fonts():
-    """Register Chinese fonts from Windows system"""
-    import platform
-
-    if platform.system() == 'Windows':
-        # Common Windows font paths
-        font_paths = [
-            'C:/Windows/Fonts/simhei.ttf',  # SimHei (黑体)
-            'C:/Windows/Fonts/simsun.ttc',  # SimSun (宋体)
-            'C:/Windows/Fonts/msyh.ttc',    # Microsoft YaHei (微软雅黑)
-        ]
-
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    font_name = os.path.splitext(os.path.basename(font_path))[0]
-                    pdfmetrics.registerFont(TTFont(font_name, font_path))
-                    print(f"[OK] Registered font: {font_name}")
-                    return font_name
-                except Exception as e:
-                    print(f"[WARN] Failed to register {font_path}: {e}")
-                    continue
-
-    return None
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from paper_render import PageTemplate
 
-def create_simple_pdf(md_file, pdf_file):
-    """Create PDF with simple HTML and Chinese font support"""
-    print(f"Converting {md_file} to PDF with Chinese font support...")
-
-    # Register Chinese fonts
-    font_name = register_chinese_fonts()
-
-    # Read Markdown file
-    with open(md_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Convert Markdown to simple HTML (without using markdown library for better compatibility)
-    # Just wrap content in basic HTML with minimal styling
-    html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        @page {{
+# Minimal stylesheet for xhtml2pdf (compiled into the template once)
+PDF_STYLESHEET = """        @page {
             size: A4;
             margin: 2cm;
-        }}
-        body {{
+        }
+        body {
             font-family: SimSun, serif;
             line-height: 1.8;
             font-size: 11pt;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #1a237e;
             font-size: 20pt;
             margin-top: 20pt;
             margin-bottom: 10pt;
             page-break-after: avoid;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #283593;
             font-size: 16pt;
             margin-top: 15pt;
             margin-bottom: 8pt;
             page-break-after: avoid;
-        }}
-        h3 {{
+        }
+        h3 {
             color: #3949ab;
             font-size: 13pt;
             margin-top: 12pt;
             margin-bottom: 6pt;
             page-break-after: avoid;
-        }}
-        p {{
+        }
+        p {
             margin: 8pt 0;
             text-align: justify;
-        }}
-        code {{
+        }
+        code {
             background-color: #f4f4f4;
             padding: 2pt 4pt;
             font-family: Consolas, monospace;
             font-size: 9pt;
-        }}
-        pre {{
+        }
+        pre {
             background-color: #f4f4f4;
             padding: 8pt;
             border-left: 3pt solid #999;
             page-break-inside: avoid;
             font-size: 9pt;
-        }}
-        strong {{
+        }
+        strong {
             color: #d32f2f;
             font-weight: bold;
-        }}
-        img {{
+        }
+        img {
             max-width: 100%;
             height: auto;
             display: block;
             margin: 10pt auto;
-        }}
-        hr {{
+        }
+        hr {
             border: none;
             border-top: 1pt solid #ddd;
             margin: 15pt 0;
-        }}
-    </style>
-</head>
-<body>
+        }
 """
 
+PDF_TEMPLATE = PageTemplate(PDF_STYLESHEET, container=False)
+
+def register_chinese_fonts():
+    """Register Chinese fonts from Windows system"""
+    import platform
+
+    if platform.system() == 'Windows':
+        # Common Windows font paths
+        font_paths = [
+            'C:/Windows/Fonts/simhei.ttf',  # SimHei (黑体)
+            'C:/Windows/Fonts/simsun.ttc',  # SimSun (宋体)
+            'C:/Windows/Fonts/msyh.ttc',    # Microsoft YaHei (微软雅黑)
+        ]
+
+        for font_path in font_paths:
+            if os.path.exists(font_path):
+                try:
+                    font_name = os.path.splitext(os.path.basename(font_path))[0]
+                    pdfmetrics.registerFont(TTFont(font_name, font_path))
+                    print(f"[OK] Registered font: {font_name}")
+                    return font_name
+                except Exception as e:
+                    print(f"[WARN] Failed to register {font_path}: {e}")
+                    continue
+
+    return None
+
+def create_simple_pdf(md_file, pdf_file):
+    """Create PDF with simple HTML and Chinese font support"""
+    print(f"Converting {md_file} to PDF with Chinese font support...")
+
+    # Register Chinese fonts
+    font_name = register_chinese_fonts()
+
+    # Read Markdown file
+    with open(md_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # Convert Markdown to simple HTML (without using markdown library for better compatibility)
+    # The page skeleton and stylesheet come from the shared template
+    html_content = ""
+
     # Simple Markdown parsing (basic support)
     lines = content.split('\n')
     in_code_block = False
@@ -186,10 +186,7 @@ def create_simple_pdf(md_file, pdf_file):
         else:
             html_content += f'<p>{line}</p>\n'
 
-    html_content += """
-</body>
-</html>
-"""
+    html_content = PDF_TEMPLATE.render(html_content)
 
     # Write HTML temporarily for debugging
     temp_html = pdf_file.replace('.pdf', '_temp.html')
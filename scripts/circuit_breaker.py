@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+各外部服务的熔断器（Claude Agent SDK、Claude 直连 API、Gemini、DashScope）
+服务整体故障时，不再让每篇论文、每张配图都等完一次超时：
+  - closed: 正常调用，记录最近 CIRCUIT_WINDOW 次调用的结果；
+    样本不少于 CIRCUIT_MIN_CALLS 且失败率达到 CIRCUIT_FAILURE_RATE 时熔断（open）
+  - open: 直接拒绝调用（抛出 CircuitOpenError），调用方立即走备用路径或返回错误
+  - half_open: 熔断 CIRCUIT_COOLDOWN 秒后放行一个探测请求；成功则恢复（closed），
+    失败则再次熔断，等待时间翻倍（最多 8 倍）
+状态保存在 CIRCUIT_STATE_FILE，下次运行继续生效：已知故障的服务在冷却结束前直接跳过。
+需要立即恢复时删除该文件即可。
+
+只有服务自身的问题计为失败：网络错误、超时、5xx、408/429；其他 4xx（请求本身的问题，如内容审核拒绝）
+计为服务可用，与服务无关的异常（响应解析失败、程序错误等）也不计为失败。
+Agent SDK 不经过 HTTP，它抛出的任何异常（CLI 进程、连接、认证错误等）都计为失败。
+
+环境变量:
+  - CIRCUIT_BREAKER: 是否启用熔断（默认 1）
+  - CIRCUIT_FAILURE_RATE: 熔断的失败率阈值（默认 0.5）
+  - CIRCUIT_MIN_CALLS: 计算失败率所需的最少调用次数（默认 4）
+  - CIRCUIT_WINDOW: 参与计算的最近调用次数（默认 10）
+  - CIRCUIT_COOLDOWN: 熔断后到第一次探测的秒数（默认 300）
+  - CIRCUIT_STATE_FILE: 状态文件（默认 outputs/.cache/circuit-breakers.json）
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import httpx
+
+from paper_cache import write_text_atomic
+
+
+CIRCUIT_BREAKER = os.environ.get("CIRCUIT_BREAKER", "1") != "0"
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", "4"))
+CIRCUIT_WINDOW = int(os.environ.get("CIRCUIT_WINDOW", "10"))
+CIRCUIT_COOLDOWN = float(os.environ.get("CIRCUIT_COOLDOWN", "300"))
+CIRCUIT_STATE_FILE = Path(os.environ.get("CIRCUIT_STATE_FILE", "outputs/.cache/circuit-breakers.json"))
+# 探测连续失败时冷却时间的最大倍数
+CIRCUIT_MAX_BACKOFF = 8
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# 服务本身不可用的 HTTP 状态码（5xx 之外）
+FAILURE_STATUSES = {408, 429}
+
+
+def is_endpoint_failure(error: BaseException | int) -> bool:
+    """HTTP 状态码或异常是否说明服务本身不可用"""
+    if isinstance(error, httpx.HTTPStatusError):
+        error = error.response.status_code
+    if isinstance(error, int):
+        return error >= 500 or error in FAILURE_STATUSES
+    return isinstance(error, (httpx.TransportError, TimeoutError))
+
+
+class CircuitOpenError(Exception):
+    """熔断中，调用被直接拒绝"""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"{endpoint} circuit open (retry in {retry_in:.0f}s)")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """单个服务的熔断器（状态由 CircuitBreakers 统一保存）"""
+
+    def __init__(self, name: str, registry: "CircuitBreakers", state: dict | None = None):
+        state = state or {}
+        self.name = name
+        self.registry = registry
+        self.state = state.get("state", CLOSED)
+        self.outcomes: list[bool] = list(state.get("outcomes", []))[-registry.window:]
+        self.opened_at = float(state.get("opened_at", 0.0))   # 墙上时间：跨运行有效
+        self.trips = int(state.get("trips", 0))               # 连续熔断次数（决定冷却时间）
+        self._probing = False
+
+    @property
+    def cooldown(self) -> float:
+        return self.registry.cooldown * min(CIRCUIT_MAX_BACKOFF, 2 ** max(0, self.trips - 1))
+
+    @property
+    def failure_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.time())
+
+    def allow(self) -> bool:
+        """是否放行一次调用；熔断冷却结束后放行一个探测请求（half_open）"""
+        if not self.registry.enabled or self.state == CLOSED:
+            return True
+        if self._probing:
+            return False
+        if self.state == OPEN and self.retry_in() > 0:
+            return False
+        if self.state == OPEN:
+            print(f"[INFO] Circuit {self.name} half-open, probing")
+            self.state = HALF_OPEN
+        self._probing = True
+        return True
+
+    def record(self, ok: bool) -> None:
+        """记录一次调用结果，按需切换状态并保存"""
+        probing, self._probing = self._probing, False
+        if probing or self.state == HALF_OPEN:
+            if ok:
+                print(f"[INFO] Circuit {self.name} closed")
+                self.state, self.outcomes, self.trips = CLOSED, [], 0
+            else:
+                self._open("probe failed")
+        elif self.state == CLOSED:
+            self.outcomes = (self.outcomes + [ok])[-self.registry.window:]
+            if len(self.outcomes) >= self.registry.min_calls and self.failure_rate >= self.registry.failure_rate:
+                self._open(f"{self.outcomes.count(False)}/{len(self.outcomes)} recent calls failed")
+        self.registry.save()
+
+    def release(self) -> None:
+        """探测请求未得出结果（被取消）：允许下一次调用重新探测"""
+        self._probing = False
+
+    def _open(self, reason: str) -> None:
+        self.state, self.opened_at, self.trips = OPEN, time.time(), self.trips + 1
+        print(f"[WARN] Circuit {self.name} opened ({reason}), retry in {self.cooldown:.0f}s")
+
+    @asynccontextmanager
+    async def guard(
+        self, is_failure: Callable[[BaseException], bool] = is_endpoint_failure,
+    ) -> AsyncIterator[Callable[[bool], None]]:
+        """保护一次调用：熔断中抛出 CircuitOpenError；返回的回调用于记录结果
+
+        未调用回调就抛出异常时按 is_failure（默认 is_endpoint_failure）记录；被取消或正常退出但未记录时不计入。
+        不经过 HTTP 的服务（如 Agent SDK 子进程）可传入自己的分类函数。
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+        recorded = False
+
+        def record(ok: bool) -> None:
+            nonlocal recorded
+            if not recorded:
+                recorded = True
+                self.record(ok)
+
+        try:
+            yield record
+        except Exception as e:
+            record(not is_failure(e))
+            raise
+        finally:
+            if not recorded:
+                self.release()
+
+    def to_dict(self) -> dict:
+        return {"state": self.state, "outcomes": self.outcomes, "opened_at": self.opened_at, "trips": self.trips}
+
+
+class CircuitBreakers:
+    """各服务的熔断器集合，状态持久化到 JSON 文件（首次使用时加载）"""
+
+    def __init__(
+        self,
+        state_file: Path = CIRCUIT_STATE_FILE,
+        enabled: bool = CIRCUIT_BREAKER,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        window: int = CIRCUIT_WINDOW,
+        cooldown: float = CIRCUIT_COOLDOWN,
+    ):
+        self.state_file = Path(state_file)
+        self.enabled = enabled
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self._breakers: dict[str, CircuitBreaker] | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, CircuitBreaker]:
+        if self._breakers is None:
+            try:
+                saved = json.loads(self.state_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                saved = {}
+            self._breakers = {name: CircuitBreaker(name, self, state) for name, state in saved.items()}
+        return self._breakers
+
+    def __getitem__(self, endpoint: str) -> CircuitBreaker:
+        breakers = self._load()
+        if endpoint not in breakers:
+            breakers[endpoint] = CircuitBreaker(endpoint, self)
+        return breakers[endpoint]
+
+    def items(self) -> list[tuple[str, CircuitBreaker]]:
+        return sorted(self._load().items())
+
+    def save(self) -> None:
+        """原子写入状态文件（多个进程同时运行时以最后写入者为准）"""
+        with self._lock:
+            data = {name: breaker.to_dict() for name, breaker in self._load().items()}
+            try:
+                self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                write_text_atomic(self.state_file, json.dumps(data, indent=2))
+            except OSError as e:
+                print(f"[WARN] Could not save circuit breaker state: {e}")
+
+    def print_status(self) -> None:
+        if not self.items():
+            print("[INFO] No circuit breaker state recorded")
+        for name, breaker in self.items():
+            line = (f"       {name:<11} {breaker.state:<9} failures={breaker.outcomes.count(False)}"
+                    f"/{len(breaker.outcomes)}")
+            if breaker.state != CLOSED:
+                line += f" trips={breaker.trips} retry in {breaker.retry_in():.0f}s"
+            print(line)
+
+
+# 进程内共享：claude_sdk / claude_api / gemini / dashscope
+endpoint_breakers = CircuitBreakers()
@@ -14,24 +14,75 @@
   - DASHSCOPE_BASE_URL: 阿里通义万相 API 端点
   - DASHSCOPE_MODEL: 阿里通义万相模型名称
   - PAPER_PATH: 论文文件路径
+
+批量模式（处理 papers/ 下所有未处理的 PDF）:
+  python scripts/cloud_paper_reader.py --batch --concurrency 3
+
+积压论文（Message Batches API 一次提交、异步完成，约半价）:
+  python scripts/cloud_paper_reader.py --bulk
+
+流式输出（边生成边写入 Markdown，每完成一个章节即刷新 HTML 预览，中断后自动续写）:
+  python scripts/cloud_paper_reader.py --stream
+
+本地任务队列（SQLite）+ 常驻 worker:
+  python scripts/cloud_paper_reader.py --enqueue papers/a.pdf papers/b.pdf
+  python scripts/cloud_paper_reader.py --worker --concurrency 3
+  python scripts/cloud_paper_reader.py --queue-status
+
+运行报告（各阶段耗时、字节数、token 数、重试次数；每次运行写 <输出>.report.json）:
+  python scripts/cloud_paper_reader.py --report-summary
+
+结果缓存（相同 PDF + 提示词 + 模型不再重复调用 Claude）:
+  python scripts/cloud_paper_reader.py --no-cache   # 忽略缓存，强制重新生成
+
+配图缓存（相同服务 + 模型 + 提示词 + 尺寸的配图直接复用）:
+  python scripts/cloud_paper_reader.py --refresh-images   # 强制重新生成配图
+
+熔断器（服务故障时直接跳过，状态跨运行保存）:
+  python scripts/cloud_paper_reader.py --circuit-status
 """
 
 import os
 import sys
 import json
 import base64
+import hashlib
+import socket
+import argparse
+import functools
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Awaitable, Callable, Iterator
+from urllib.parse import urlsplit
 
 import anyio
 import httpx
 
+from circuit_breaker import CircuitOpenError, endpoint_breakers, is_endpoint_failure
+from dashscope_poller import dashscope_poller, dashscope_poller_lifespan
+from http_pool import ENDPOINT_TIMEOUTS, http_client, http_client_lifespan
+from image_router import image_router
+from job_queue import JOB_QUEUE_DB, Job, JobQueue
+from message_batches import BULK_MAX_REQUESTS, SUCCEEDED, MessageBatchClient, PendingBatch, message_text, result_error
+from paper_cache import DiskCache, cache_key, file_lock, write_bytes_atomic, write_text_atomic
+from paper_render import IncrementalRenderer, PaperDocument, markdown_to_html
+from paper_sections import build_context, chunk_sections, truncate_at_sentence
+from run_report import RunReport, Span, current_span, print_summary, run_report, span
+from pdf_optimize import optimize_images, report_pdf_size
+from pdf_renderer import pdf_renderer_lifespan, render_pdf
+from prompt_cache import PROMPT_CACHING, is_cacheable_prefix, min_cacheable_tokens, prompt_cache_gate, system_blocks
+from token_budget import TokenEstimator, input_token_budget
+
 
 # ============================================================
 # 配置（从环境变量读取）
 # ============================================================
 # Claude API 配置（通过 yunwu.ai 代理，由 Agent SDK 自动读取）
 ANTHROPIC_MODEL = os.environ.get("ANTHROPIC_MODEL", "claude-opus-4-5-20251101")
+MAX_TOKENS = 8000
 
 # Gemini 图像生成配置（通过 yunwu.ai 代理）
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
@@ -42,6 +93,9 @@ GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-3-pro-image-preview")
 DASHSCOPE_API_KEY = os.environ.get("DASHSCOPE_API_KEY")
 DASHSCOPE_BASE_URL = os.environ.get("DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
 DASHSCOPE_MODEL = os.environ.get("DASHSCOPE_MODEL", "wanx2.1-t2i-turbo")
+DASHSCOPE_IMAGE_SIZE = "1024*1024"
+# 文生图走 DashScope 原生异步任务 API（与 DASHSCOPE_BASE_URL 同一主机）
+DASHSCOPE_API_ROOT = "{0.scheme}://{0.netloc}/api/v1".format(urlsplit(DASHSCOPE_BASE_URL))
 
 # 论文路径
 PAPER_PATH = os.environ.get("PAPER_PATH", "")
@@ -49,6 +103,57 @@ PAPER_PATH = os.environ.get("PAPER_PATH", "")
 # 输出目录
 OUTPUT_DIR = Path("outputs")
 
+# 批量模式配置
+PAPERS_DIR = Path(os.environ.get("PAPERS_DIR", "papers"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "3"))
+# 任务队列 worker 空闲时查询新任务的间隔（秒）
+WORKER_POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", "5"))
+# 已处理论文清单（按 PDF 内容的 SHA-256 记录，重命名/重新 checkout 不影响判断）
+PROCESSED_MANIFEST = OUTPUT_DIR / "processed.json"
+# 所有运行的报告（每行一个 JSON），--report-summary 按阶段汇总
+RUN_REPORTS = OUTPUT_DIR / "run-reports.jsonl"
+# --bulk 模式已提交、尚未取回结果的 Message Batch（中断后下次运行继续轮询）
+BULK_STATE = OUTPUT_DIR / "message-batch.json"
+
+# PDF 文本提取并行度（页数达到阈值时按页分片交给进程池；PDF_EXTRACT_WORKERS=1 强制串行）
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", "0")) or (os.cpu_count() or 1)
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "40"))
+
+# 送入 Claude 的论文文本按输入 token 预算（token_budget.input_token_budget）截断，
+# 超出时按章节优先级丢弃（先丢参考文献、附录）。
+# PDF 解析上限（字符）：要明显大于预算，才能看到结论等靠后的章节；超出后剩余页面不再解析
+PAPER_EXTRACT_CHARS = int(os.environ.get("PAPER_EXTRACT_CHARS", "180000"))
+
+# 分块（map-reduce）模式：每块 token 数（估算）、并发数、每块笔记的 max_tokens
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "8000"))
+CHUNK_CONCURRENCY = int(os.environ.get("CHUNK_CONCURRENCY", "4"))
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "1500"))
+
+# 解读结果缓存（键: PDF 内容 + 系统提示词 + 模型 + max_tokens）
+RESULT_CACHE_DIR = OUTPUT_DIR / ".cache" / "results"
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", "50"))
+RESULT_CACHE_MAX_AGE_DAYS = float(os.environ.get("RESULT_CACHE_MAX_AGE_DAYS", "30"))
+
+# 输出的配图按内容哈希命名（相同图片只存一份，不同论文、并发运行互不覆盖）
+IMAGE_OUTPUT_DIR = OUTPUT_DIR / "images"
+# 配图缓存索引（键: 服务 + 模型 + 提示词 + 尺寸 -> IMAGE_OUTPUT_DIR 中的文件名），图片本身不重复存储
+IMAGE_CACHE_DIR = OUTPUT_DIR / ".cache" / "images"
+
+# call_api_direct 失败时返回的错误文本前缀（这类结果不能写入缓存）
+API_ERROR_PREFIXES = ("API 调用失败", "API 调用异常")
+
+# 流式输出中断且续写次数用尽时，在正文末尾追加的标记（带此标记的结果不写入缓存）
+INCOMPLETE_MARKER = "\n\n> ⚠️ 输出中断，以上内容不完整\n"
+STREAM_MAX_RESUMES = int(os.environ.get("STREAM_MAX_RESUMES", "2"))
+
+
+class PaperReaderError(Exception):
+    """单篇论文处理失败（批量模式下只影响当前论文）"""
+
+
+class TransientPaperError(PaperReaderError):
+    """可重试的失败（API 调用失败、网络错误等），任务队列会退避后重试"""
+
 
 # ============================================================
 # 系统提示词（基于 SKILL.md）
@@ -116,23 +221,51 @@ SYSTEM_PROMPT = """你是一个专门用于阅读学术论文并生成易懂解
 """
 
 
+# 分块模式 map 阶段的提示词：只做忠实的要点整理，风格化写作留给 reduce 阶段
+CHUNK_SYSTEM_PROMPT = """你是一个学术论文阅读助手。你会收到一篇论文的其中一部分。
+请用中文整理这部分的详细笔记，供之后撰写完整解读使用：
+- 保留章节结构、核心论点、方法细节、关键公式的含义、实验设置和具体数字
+- 如果出现论文标题、作者，请原样保留（英文）
+- 只整理内容，不要评价，不要写开场白或总结
+- 参考文献列表只需概括引用了哪些方向的工作
+"""
+
+
+# ============================================================
+# 配图提示词
+# ============================================================
+# Gemini 擅长生成带文字的信息图
+GEMINI_IMAGE_PROMPTS = [
+    "Create an informative infographic about the Transformer architecture in deep learning. Include a visual diagram showing: 1) Input embeddings 2) Multi-head attention mechanism 3) Feed-forward layers 4) Output. Use clean modern design with blue and white colors. Add clear labels in English.",
+    "Create a visual summary diagram showing the key innovation of 'Attention Is All You Need' paper. Illustrate how self-attention works: Query, Key, Value vectors connecting words in a sentence. Use professional scientific illustration style with annotations."
+]
+
+DASHSCOPE_IMAGE_PROMPTS = [
+    "abstract scientific visualization, neural network concept art, flowing data streams and connections, blue and purple gradient, modern minimalist style, clean geometric shapes",
+    "futuristic knowledge concept illustration, glowing nodes and pathways, deep learning visualization, technological aesthetic, dark blue background with bright accents"
+]
+
+
 # ============================================================
 # 图片生成函数（阿里通义万相 - 使用 DashScope 原生 API）
 # ============================================================
-async def generate_image_dashscope(prompt: str, image_index: int) -> str | None:
-    """调用阿里通义万相 API 生成图片（DashScope 原生格式）"""
+async def generate_image_dashscope(prompt: str, image_index: int) -> bytes | None:
+    """调用阿里通义万相 API 生成图片（DashScope 原生格式），返回图片内容
+
+    提交任务返回非 200 状态码时抛出 httpx.HTTPStatusError，由熔断器区分服务故障和请求被拒绝（如内容审核）。
+    """
     if not DASHSCOPE_API_KEY:
         print(f"[WARN] DASHSCOPE_API_KEY not set, skipping image {image_index}")
         return None
 
     # DashScope 原生 API 端点
-    api_url = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text2image/image-synthesis"
+    api_url = f"{DASHSCOPE_API_ROOT}/services/aigc/text2image/image-synthesis"
 
     print(f"[INFO] Generating image {image_index} with model: {DASHSCOPE_MODEL}")
     print(f"[INFO] API endpoint: {api_url}")
 
     try:
-        async with httpx.AsyncClient(timeout=180) as client:
+        async with http_client() as client:
             # 第一步：提交任务（异步模式）
             response = await client.post(
                 api_url,
@@ -141,13 +274,14 @@ async def generate_image_dashscope(prompt: str, image_index: int) -> str | None:
                     "Authorization": f"Bearer {DASHSCOPE_API_KEY}",
                     "X-DashScope-Async": "enable"  # 异步模式
                 },
+                timeout=ENDPOINT_TIMEOUTS["dashscope"],
                 json={
                     "model": DASHSCOPE_MODEL,
                     "input": {
                         "prompt": prompt
                     },
                     "parameters": {
-                        "size": "1024*1024",
+                        "size": DASHSCOPE_IMAGE_SIZE,
                         "n": 1
                     }
                 }
@@ -158,7 +292,8 @@ async def generate_image_dashscope(prompt: str, image_index: int) -> str | None:
             if response.status_code != 200:
                 print(f"[WARN] DashScope API returned status {response.status_code}")
                 print(f"[WARN] Response: {response.text[:500]}")
-                return None
+                raise httpx.HTTPStatusError(f"DashScope API returned status {response.status_code}",
+                                            request=response.request, response=response)
 
             result = response.json()
             print(f"[DEBUG] Task submission response: {json.dumps(result, ensure_ascii=False)[:500]}")
@@ -171,61 +306,35 @@ async def generate_image_dashscope(prompt: str, image_index: int) -> str | None:
 
             print(f"[INFO] Task submitted, task_id: {task_id}")
 
-            # 第二步：轮询任务状态
-            task_url = f"https://dashscope.aliyuncs.com/api/v1/tasks/{task_id}"
-            max_attempts = 60  # 最多等待 60 次
+            # 第二步：等待任务完成（集中轮询器按历史耗时自适应退避，完成后立即唤醒）
+            async with dashscope_poller(DASHSCOPE_API_ROOT, DASHSCOPE_API_KEY) as poller:
+                task_result = await poller.wait(task_id)
 
-            for attempt in range(max_attempts):
-                await anyio.sleep(2)  # 每 2 秒检查一次
-
-                task_response = await client.get(
-                    task_url,
-                    headers={
-                        "Authorization": f"Bearer {DASHSCOPE_API_KEY}"
-                    }
-                )
-
-                if task_response.status_code != 200:
-                    print(f"[WARN] Task query failed: {task_response.status_code}")
-                    continue
+            if task_result is None:
+                return None
 
-                task_result = task_response.json()
-                task_status = task_result.get("output", {}).get("task_status")
-
-                print(f"[INFO] Task status ({attempt + 1}/{max_attempts}): {task_status}")
-
-                if task_status == "SUCCEEDED":
-                    # 获取图片 URL
-                    results = task_result.get("output", {}).get("results", [])
-                    if results and "url" in results[0]:
-                        image_url = results[0]["url"]
-                        print(f"[INFO] Image URL: {image_url[:100]}...")
-
-                        # 下载图片
-                        img_response = await client.get(image_url, timeout=60)
-                        if img_response.status_code == 200:
-                            image_path = OUTPUT_DIR / f"image_{image_index}.png"
-                            with open(image_path, "wb") as f:
-                                f.write(img_response.content)
-                            print(f"[INFO] Image {image_index} saved to {image_path}")
-                            return str(image_path)
-                        else:
-                            print(f"[WARN] Failed to download image: {img_response.status_code}")
-                    return None
-
-                elif task_status == "FAILED":
-                    error_msg = task_result.get("output", {}).get("message", "Unknown error")
-                    print(f"[ERROR] Task failed: {error_msg}")
-                    return None
-
-                elif task_status in ["PENDING", "RUNNING"]:
-                    continue
-                else:
-                    print(f"[WARN] Unknown task status: {task_status}")
+            task_status = task_result.get("output", {}).get("task_status")
+            if task_status == "SUCCEEDED":
+                # 获取图片 URL
+                results = task_result.get("output", {}).get("results", [])
+                if results and "url" in results[0]:
+                    image_url = results[0]["url"]
+                    print(f"[INFO] Image URL: {image_url[:100]}...")
+
+                    # 下载图片
+                    img_response = await client.get(image_url, timeout=ENDPOINT_TIMEOUTS["download"])
+                    if img_response.status_code == 200:
+                        return img_response.content
+                    else:
+                        print(f"[WARN] Failed to download image: {img_response.status_code}")
+                return None
 
-            print(f"[WARN] Task timed out after {max_attempts} attempts")
+            error_msg = task_result.get("output", {}).get("message", "Unknown error")
+            print(f"[ERROR] Task {task_status}: {error_msg}")
             return None
 
+    except httpx.HTTPStatusError:
+        raise
     except Exception as e:
         print(f"[ERROR] Image generation failed: {e}")
         import traceback
@@ -236,8 +345,11 @@ async def generate_image_dashscope(prompt: str, image_index: int) -> str | None:
 # ============================================================
 # 图片生成函数（Gemini 3 Pro Image - 通过 yunwu.ai 代理）
 # ============================================================
-async def generate_image_gemini(prompt: str, image_index: int) -> str | None:
-    """调用 Gemini 3 Pro Image API 生成图片"""
+async def generate_image_gemini(prompt: str, image_index: int) -> bytes | None:
+    """调用 Gemini 3 Pro Image API 生成图片，返回图片内容
+
+    返回非 200 状态码时抛出 httpx.HTTPStatusError，由熔断器区分服务故障和请求被拒绝（如内容审核）。
+    """
     if not GEMINI_API_KEY:
         print(f"[WARN] GEMINI_API_KEY not set, skipping image {image_index}")
         return None
@@ -249,13 +361,14 @@ async def generate_image_gemini(prompt: str, image_index: int) -> str | None:
     print(f"[INFO] API endpoint: {api_url}")
 
     try:
-        async with httpx.AsyncClient(timeout=180) as client:
+        async with http_client() as client:
             response = await client.post(
                 api_url,
                 headers={
                     "Content-Type": "application/json",
                     "Authorization": f"Bearer {GEMINI_API_KEY}"
                 },
+                timeout=ENDPOINT_TIMEOUTS["gemini"],
                 json={
                     "contents": [
                         {
@@ -275,7 +388,8 @@ async def generate_image_gemini(prompt: str, image_index: int) -> str | None:
             if response.status_code != 200:
                 print(f"[WARN] Gemini API returned status {response.status_code}")
                 print(f"[WARN] Response: {response.text[:500]}")
-                return None
+                raise httpx.HTTPStatusError(f"Gemini API returned status {response.status_code}",
+                                            request=response.request, response=response)
 
             result = response.json()
             print(f"[DEBUG] Gemini response: {json.dumps(result, ensure_ascii=False)[:500]}")
@@ -289,23 +403,15 @@ async def generate_image_gemini(prompt: str, image_index: int) -> str | None:
             parts = candidates[0].get("content", {}).get("parts", [])
             for part in parts:
                 if "inlineData" in part:
-                    inline_data = part["inlineData"]
-                    mime_type = inline_data.get("mimeType", "image/png")
-                    image_b64 = inline_data.get("data", "")
-
+                    image_b64 = part["inlineData"].get("data", "")
                     if image_b64:
-                        # 解码并保存图片
-                        image_bytes = base64.b64decode(image_b64)
-                        ext = "png" if "png" in mime_type else "jpg"
-                        image_path = OUTPUT_DIR / f"image_{image_index}.{ext}"
-                        with open(image_path, "wb") as f:
-                            f.write(image_bytes)
-                        print(f"[INFO] Image {image_index} saved to {image_path}")
-                        return str(image_path)
+                        return base64.b64decode(image_b64)
 
             print(f"[WARN] No image data found in Gemini response")
             return None
 
+    except httpx.HTTPStatusError:
+        raise
     except Exception as e:
         print(f"[ERROR] Gemini image generation failed: {e}")
         import traceback
@@ -313,24 +419,281 @@ async def generate_image_gemini(prompt: str, image_index: int) -> str | None:
         return None
 
 
+def get_image_cache() -> DiskCache:
+    return DiskCache(IMAGE_CACHE_DIR)
+
+
+def cached_image(image_cache: DiskCache, key: str) -> Path | None:
+    """配图缓存命中时返回 IMAGE_OUTPUT_DIR 中的图片（索引指向的文件已被删除时视为未命中）"""
+    entry = image_cache.get(key)
+    if entry is None:
+        return None
+    try:
+        name = entry.decode("ascii")
+    except UnicodeDecodeError:
+        return None
+    image_path = IMAGE_OUTPUT_DIR / name
+    return image_path if "/" not in name and image_path.is_file() else None
+
+
+def image_cache_key(provider: str, prompt: str) -> str:
+    """配图缓存键: SHA-256(服务, 模型, 提示词, 尺寸)"""
+    model, size = {
+        "gemini": (GEMINI_MODEL, "default"),
+        "dashscope": (DASHSCOPE_MODEL, DASHSCOPE_IMAGE_SIZE),
+    }[provider]
+    return cache_key(provider, model, prompt, size)
+
+
+def image_extension(data: bytes) -> str:
+    """按文件头判断图片格式"""
+    if data.startswith(b"\xff\xd8"):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "png"
+
+
+def save_image(data: bytes, image_index: int) -> str:
+    """把配图写入 IMAGE_OUTPUT_DIR/<内容哈希>.<扩展名>，返回文件路径
+
+    文件名由内容决定：已存在的同名文件内容必然相同，直接复用；新文件先写临时文件再 rename，
+    并发运行的论文不会读到写了一半的图片，也不会覆盖其他论文的配图。
+    """
+    image_path = IMAGE_OUTPUT_DIR / f"{hashlib.sha256(data).hexdigest()[:16]}.{image_extension(data)}"
+    if not image_path.exists():
+        IMAGE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        write_bytes_atomic(image_path, data)
+    print(f"[INFO] Image {image_index} saved to {image_path}")
+    return str(image_path)
+
+
+# 配图服务的显示名称
+IMAGE_PROVIDER_NAMES = {"gemini": "Gemini", "dashscope": "DashScope"}
+
+# 正在生成的配图（同一组缓存键 -> 完成事件）：并发处理的论文请求相同配图时只生成一次
+_image_flights: dict[str, anyio.Event] = {}
+
+
+def image_providers() -> dict[str, tuple[Callable[[str, int], Awaitable[bytes | None]], list[str]]]:
+    """已配置的配图服务 -> (生成函数, 提示词)；第 i 张图在各服务上使用各自的第 i 个提示词"""
+    providers = {}
+    if GEMINI_API_KEY:
+        providers["gemini"] = (generate_image_gemini, GEMINI_IMAGE_PROMPTS)
+    if DASHSCOPE_API_KEY:
+        providers["dashscope"] = (generate_image_dashscope, DASHSCOPE_IMAGE_PROMPTS)
+    return providers
+
+
+async def generate_images_parallel(
+    providers: dict[str, tuple[Callable[[str, int], Awaitable[bytes | None]], list[str]]],
+    refresh: bool = False,
+) -> list[tuple[str, str]]:
+    """并发生成各张配图，按序号返回成功的 (服务, 图片路径)
+
+    每张图由 image_router 选择主服务，主服务失败或超过其 p90 耗时时向另一服务发出对冲请求，
+    取最先成功的结果。配图缓存里已有任一服务的结果时直接使用；refresh=True 时强制重新生成并更新缓存。
+    同一进程内其他论文正在生成相同的配图时，等它完成后直接复用，不重复请求。
+    """
+    count = max(len(prompts) for _, prompts in providers.values())
+    results: list[tuple[str, str] | None] = [None] * count
+    image_cache = get_image_cache()
+
+    def attempt_for(provider: str, index: int) -> Callable[[], Awaitable[bytes | None]]:
+        generator, prompts = providers[provider]
+
+        async def attempt() -> bytes | None:
+            # 熔断中抛出 CircuitOpenError，由 image_router 立即改用另一服务；
+            # 生成函数抛出的 HTTPStatusError 由 guard 按状态码记录（4xx 拒绝不计为服务故障）
+            async with endpoint_breakers[provider].guard() as record_health:
+                data = await generator(prompts[index], index + 1)
+                record_health(bool(data))
+            return data
+
+        return attempt
+
+    def lookup(index: int, order: list[str], keys: dict[str, str]) -> tuple[str, Path] | None:
+        for candidate in order:
+            image_path = cached_image(image_cache, keys[candidate])
+            if image_path is not None:
+                print(f"[INFO] Image {index + 1} cache hit ({keys[candidate][:12]}), skipping {candidate}")
+                return candidate, image_path
+        return None
+
+    async def generate_one(index: int) -> None:
+        order = [p for p in image_router.order(list(providers)) if index < len(providers[p][1])]
+        keys = {p: image_cache_key(p, providers[p][1][index]) for p in order}
+        flight = cache_key(*sorted(keys.values()))
+        with span(f"image[{index + 1}]") as image_span:
+            image_span.bytes_in = len(providers[order[0]][1][index].encode("utf-8"))
+            waited = False
+            while flight in _image_flights:
+                waited = True
+                await _image_flights[flight].wait()
+            # 刚等到其他论文生成的配图时，即使 refresh 也直接使用（它就是新生成的）
+            hit = lookup(index, order, keys) if waited or not refresh else None
+            image_span.attrs["cache_hit"] = hit is not None
+            if hit is not None:
+                provider, image_path = hit
+                results[index] = (provider, str(image_path))
+                image_span.attrs["provider"] = provider
+                return
+
+            done = _image_flights[flight] = anyio.Event()
+            try:
+                outcome = await image_router.race(
+                    [(candidate, attempt_for(candidate, index)) for candidate in order],
+                    label=f"Image {index + 1}",
+                )
+                image_span.attrs["attempted"] = outcome.attempted
+                image_span.attrs["provider"] = outcome.provider or order[0]
+                if not outcome.data:
+                    image_span.status = "error"
+                    return
+                image_path = save_image(outcome.data, index + 1)
+                results[index] = (outcome.provider, image_path)
+                image_span.bytes_out = len(outcome.data)
+                try:
+                    image_cache.put(keys[outcome.provider], Path(image_path).name.encode("ascii"))
+                except OSError as e:
+                    print(f"[WARN] Could not cache image {index + 1}: {e}")
+            finally:
+                _image_flights.pop(flight, None)
+                done.set()
+
+    async with anyio.create_task_group() as tg:
+        for index in range(count):
+            tg.start_soon(generate_one, index)
+
+    return [result for result in results if result]
+
+
+async def generate_images(refresh: bool = False) -> tuple[list[str], str]:
+    """生成配图（Gemini 与 DashScope 之间对冲请求），返回 (图片路径列表, 状态描述)
+
+    refresh=True 时忽略配图缓存，强制重新生成。
+    """
+    providers = image_providers()
+    if not providers:
+        print("[INFO] GEMINI_API_KEY / DASHSCOPE_API_KEY not set, skipping image generation")
+        return [], "未生成"
+
+    names = [IMAGE_PROVIDER_NAMES[p] for p in image_router.order(list(providers))]
+    print(f"[INFO] Generating images with {' / '.join(names)}...")
+    results = await generate_images_parallel(providers, refresh)
+    if not results:
+        return [], "失败（API 错误）"
+
+    counts: dict[str, int] = {}
+    for provider, _ in results:
+        counts[provider] = counts.get(provider, 0) + 1
+    sources = ", ".join(
+        IMAGE_PROVIDER_NAMES[p] + (f" {n}张" if len(counts) > 1 else "") for p, n in counts.items()
+    )
+    return [path for _, path in results], f"成功 ({len(results)}张, {sources})"
+
+
 # ============================================================
 # PDF 文本提取
 # ============================================================
-def extract_pdf_text(pdf_path: str) -> str:
-    """从 PDF 文件中提取文本"""
-    try:
-        from PyPDF2 import PdfReader
+def _extract_page_range(pdf_path: str, start: int, end: int) -> list[tuple[int, str]]:
+    """提取 [start, end) 页的文本（进程池 worker，每个进程独立打开 PDF）"""
+    from PyPDF2 import PdfReader
 
-        reader = PdfReader(pdf_path)
-        text_parts = []
+    reader = PdfReader(pdf_path)
+    return [(page_num + 1, reader.pages[page_num].extract_text() or "") for page_num in range(start, end)]
 
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            if text:
-                text_parts.append(f"--- Page {page_num + 1} ---\n{text}")
 
-        full_text = "\n\n".join(text_parts)
-        print(f"[INFO] Extracted {len(full_text)} characters from {len(reader.pages)} pages")
+def _split_page_ranges(num_pages: int, num_shards: int) -> list[tuple[int, int]]:
+    """把页码切成连续的分片，分片数多于 worker 数以平衡各页耗时差异"""
+    shard_size = max(1, -(-num_pages // num_shards))
+    return [(start, min(start + shard_size, num_pages)) for start in range(0, num_pages, shard_size)]
+
+
+def iter_pdf_pages(pdf_path: str, workers: int | None = None) -> Iterator[tuple[int, str]]:
+    """按页码顺序逐页产出 (页码, 文本)，页码从 1 开始
+
+    页面在被消费时才解析；调用方提前停止迭代后，剩余页面不会再被提取。
+    页数达到 PDF_PARALLEL_MIN_PAGES 且 workers > 1 时，按页分片交给进程池并行提取，
+    产出顺序不变，停止迭代时取消尚未开始的分片。
+    """
+    from PyPDF2 import PdfReader
+
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    reader = PdfReader(pdf_path)
+    num_pages = len(reader.pages)
+
+    if workers <= 1 or num_pages < PDF_PARALLEL_MIN_PAGES:
+        for page_num, page in enumerate(reader.pages):
+            yield page_num + 1, page.extract_text() or ""
+        return
+
+    workers = min(workers, num_pages)
+    ranges = _split_page_ranges(num_pages, workers * 4)
+    print(f"[INFO] Parallel extraction: {len(ranges)} shards on {workers} processes")
+    # spawn: 调用方可能在 anyio 工作线程中，fork 多线程进程不安全
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        shards = pool.map(_extract_page_range, [pdf_path] * len(ranges),
+                          [start for start, _ in ranges], [end for _, end in ranges])
+        for shard in shards:
+            yield from shard
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def collect_pdf_text(
+    pages: Iterator[tuple[int, str]],
+    budget: int | None = None,
+    measure: Callable[[str], int] = len,
+) -> tuple[str, int, bool]:
+    """把逐页文本拼成带 `--- Page N ---` 标记的全文，达到预算后立即停止消费
+
+    measure 用于计算文本成本（默认按字符数，也可以传入 token 估算函数）。
+    返回 (文本, 已解析页数, 是否被截断)。
+    """
+    text_parts = []
+    used = 0
+    pages_read = 0
+
+    for page_num, text in pages:
+        pages_read += 1
+        if not text:
+            continue
+
+        part = f"--- Page {page_num} ---\n{text}"
+        # 第二页起需要计入 "\n\n" 分隔符
+        cost = measure(part) + (measure("\n\n") if text_parts else 0)
+
+        if budget is not None and used + cost > budget:
+            remaining = budget - used - (measure("\n\n") if text_parts else 0)
+            if remaining > 0:
+                # 按成本比例截取最后一页的前半部分
+                text_parts.append(part[: len(part) * remaining // measure(part)])
+            return "\n\n".join(text_parts), pages_read, True
+
+        text_parts.append(part)
+        used += cost
+
+    return "\n\n".join(text_parts), pages_read, False
+
+
+def extract_pdf_text(pdf_path: str, workers: int | None = None, max_chars: int | None = None) -> str:
+    """从 PDF 文件中提取文本
+
+    指定 max_chars 时，文本达到上限即停止解析后续页面，
+    内存占用和耗时与预算成正比，而不是与文档长度成正比。
+    """
+    try:
+        pages = iter_pdf_pages(pdf_path, workers=workers)
+        try:
+            full_text, pages_read, truncated = collect_pdf_text(pages, budget=max_chars)
+        finally:
+            pages.close()
+
+        print(f"[INFO] Extracted {len(full_text)} characters from {pages_read} pages")
+        if truncated:
+            print(f"[WARN] Text truncated to {max_chars} characters, stopped parsing after page {pages_read}")
         return full_text
 
     except Exception as e:
@@ -341,221 +704,45 @@ def extract_pdf_text(pdf_path: str) -> str:
 # ============================================================
 # Markdown 转 HTML/PDF
 # ============================================================
-def convert_md_to_html(md_content: str, html_file: Path, title: str = "论文解读") -> bool:
-    """将 Markdown 内容转换为 HTML 文件"""
+def convert_md_to_html(md_content: str, html_file: Path, title: str = "论文解读") -> PaperDocument | None:
+    """将 Markdown 内容转换为 HTML 文件，返回内存中的文档（供 PDF 阶段直接使用）"""
     try:
-        import markdown
-
-        # 配置 Markdown 扩展
-        extensions = [
-            'markdown.extensions.extra',
-            'markdown.extensions.codehilite',
-            'markdown.extensions.toc',
-            'markdown.extensions.tables',
-            'markdown.extensions.fenced_code'
-        ]
-
-        # 转换为 HTML
-        html_content = markdown.markdown(md_content, extensions=extensions)
-
-        # HTML 模板 (使用 Noto Sans CJK SC 支持中文)
-        html_template = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        @font-face {{
-            font-family: 'Noto Sans CJK SC';
-            src: local('Noto Sans CJK SC'), local('NotoSansCJK-Regular');
-        }}
-        body {{
-            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
-            line-height: 1.8;
-            max-width: 900px;
-            margin: 0 auto;
-            padding: 40px 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: #333;
-        }}
-        .container {{
-            background-color: white;
-            padding: 50px;
-            border-radius: 10px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
-            color: #1a237e;
-            border-bottom: 3px solid #3f51b5;
-            padding-bottom: 10px;
-            margin-top: 40px;
-            font-size: 2em;
-        }}
-        h2 {{
-            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
-            color: #283593;
-            border-left: 4px solid #3f51b5;
-            padding-left: 15px;
-            margin-top: 35px;
-            font-size: 1.5em;
-        }}
-        h3 {{
-            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
-            color: #3949ab;
-            margin-top: 25px;
-            font-size: 1.2em;
-        }}
-        p {{
-            text-align: justify;
-            margin: 15px 0;
-        }}
-        code {{
-            background-color: #f4f4f4;
-            padding: 2px 6px;
-            border-radius: 3px;
-            font-family: Consolas, Monaco, monospace;
-            font-size: 0.9em;
-            color: #e91e63;
-        }}
-        pre {{
-            background-color: #2b2b2b;
-            color: #f8f8f2;
-            padding: 15px;
-            border-radius: 5px;
-            overflow-x: auto;
-        }}
-        pre code {{
-            background-color: transparent;
-            color: inherit;
-            padding: 0;
-        }}
-        blockquote {{
-            border-left: 4px solid #ffb74d;
-            padding-left: 15px;
-            margin: 20px 0;
-            color: #666;
-            font-style: italic;
-            background-color: #fff8e1;
-            padding: 15px;
-            border-radius: 5px;
-        }}
-        table {{
-            border-collapse: collapse;
-            width: 100%;
-            margin: 20px 0;
-        }}
-        th, td {{
-            border: 1px solid #ddd;
-            padding: 12px;
-            text-align: left;
-        }}
-        th {{
-            background-color: #3f51b5;
-            color: white;
-        }}
-        tr:nth-child(even) {{
-            background-color: #f9f9f9;
-        }}
-        img {{
-            max-width: 100%;
-            height: auto;
-            display: block;
-            margin: 20px auto;
-            border-radius: 8px;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.1);
-        }}
-        hr {{
-            border: none;
-            border-top: 2px solid #e0e0e0;
-            margin: 30px 0;
-        }}
-        strong {{
-            color: #d32f2f;
-        }}
-        footer {{
-            margin-top: 60px;
-            padding-top: 20px;
-            border-top: 1px solid #ddd;
-            text-align: center;
-            color: #999;
-            font-size: 0.9em;
-        }}
-    </style>
-</head>
-<body>
-<div class="container">
-{html_content}
-<footer>
-    <p>本解读由 GitHub Actions + Claude Agent SDK + 通义万相 自动生成</p>
-</footer>
-</div>
-</body>
-</html>"""
+        document = PaperDocument(title, markdown_to_html(md_content), html_file.parent)
 
         with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_template)
+            f.write(document.html)
 
         print(f"[INFO] HTML file generated: {html_file}")
-        return True
+        return document
 
     except Exception as e:
         print(f"[ERROR] HTML conversion failed: {e}")
-        return False
-
-
-def convert_html_to_pdf(html_file: Path, pdf_file: Path) -> bool:
-    """将 HTML 文件转换为 PDF（使用 WeasyPrint，支持中文）"""
-    try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
-
-        print(f"[INFO] Converting HTML to PDF using WeasyPrint...")
-
-        # 配置字体
-        font_config = FontConfiguration()
-
-        # 读取 HTML 文件
-        with open(html_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        return None
 
-        # 为 PDF 优化（移除渐变背景，调整样式）
-        pdf_html = html_content.replace(
-            'background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);',
-            'background: white;'
-        )
 
-        # 将相对图片路径转换为绝对路径
-        html_dir = html_file.parent.absolute()
-        import re
-        # 匹配 src="image_X.png" 或 src='image_X.png'
-        pdf_html = re.sub(
-            r'src=["\']([^"\']+\.png)["\']',
-            lambda m: f'src="file://{html_dir / m.group(1)}"',
-            pdf_html
-        )
-        print(f"[INFO] Image base path: {html_dir}")
+def convert_document_to_pdf(document: PaperDocument, pdf_file: Path) -> bool:
+    """将文档直接渲染为 PDF（使用 WeasyPrint，支持中文；渲染器常驻并复用字体配置）
 
-        # 额外的 PDF 样式
-        pdf_css = CSS(string='''
-            @page {
-                size: A4;
-                margin: 2cm;
-            }
-            body {
-                font-family: "Noto Sans CJK SC", "Noto Sans SC", "SimHei", sans-serif;
+    PDF 与 HTML 共用同一份 HTML 字符串：渐变背景由样式表的 @media print 规则去掉，
+    相对图片路径按 document.base_url 解析。
+    """
+    try:
+        print(f"[INFO] Converting document to PDF using WeasyPrint...")
+        print(f"[INFO] Image base path: {document.base_dir.absolute()}")
+
+        with tempfile.TemporaryDirectory(prefix="pdf-images-") as tmp:
+            # 配图按目标 DPI 降采样、重新压缩后再嵌入（只影响 PDF，HTML 仍引用原图）
+            images = optimize_images([p for p in document.images if p.is_file()], Path(tmp))
+            url_overrides = {
+                source.absolute().as_uri(): item.output.absolute().as_uri()
+                for source, item in images.items()
             }
-        ''', font_config=font_config)
 
-        # 生成 PDF
-        HTML(string=pdf_html).write_pdf(
-            pdf_file,
-            stylesheets=[pdf_css],
-            font_config=font_config
-        )
+            # 生成 PDF（A4 页面样式和字体配置在渲染器中只加载一次）
+            elapsed = render_pdf(document.html, pdf_file, document.base_url, url_overrides)
 
-        print(f"[INFO] PDF file generated: {pdf_file}")
+        print(f"[INFO] PDF file generated: {pdf_file} ({elapsed:.2f}s)")
+        report_pdf_size(pdf_file, images)
         return True
 
     except Exception as e:
@@ -566,44 +753,125 @@ def convert_html_to_pdf(html_file: Path, pdf_file: Path) -> bool:
 
 
 # ============================================================
-# 主执行函数（使用 Claude Agent SDK）
+# 已处理论文清单
 # ============================================================
-async def run_paper_reader():
-    """使用 Claude Agent SDK 执行论文解读"""
+def file_sha256(path: str | Path) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_processed_manifest() -> dict:
+    """读取已处理论文清单 {sha256: {paper, output, processed_at}}"""
+    if not PROCESSED_MANIFEST.exists():
+        return {}
+    try:
+        with open(PROCESSED_MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[WARN] Failed to read {PROCESSED_MANIFEST}: {e}")
+        return {}
+
+
+def record_processed(paper_path: str, md_file: Path) -> None:
+    """将论文记录到已处理清单
+
+    多个 worker 进程和 --batch 运行可能同时更新清单：读-改-写在文件锁（processed.json.lock）内进行，
+    并原子写入，读者不会读到写了一半的文件，也不会互相覆盖对方新增的条目。
+    """
+    digest = file_sha256(paper_path)
+    with file_lock(PROCESSED_MANIFEST.with_name(PROCESSED_MANIFEST.name + ".lock")):
+        manifest = load_processed_manifest()
+        manifest[digest] = {
+            "paper": str(paper_path),
+            "output": str(md_file),
+            "processed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        write_text_atomic(PROCESSED_MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+def find_unprocessed_papers(papers_dir: Path = PAPERS_DIR) -> list[Path]:
+    """查找 papers/ 目录下尚未处理的 PDF（按修改时间从旧到新）"""
+    if not papers_dir.is_dir():
+        return []
+    processed = load_processed_manifest()
+    papers = sorted(papers_dir.glob("*.pdf"), key=lambda p: p.stat().st_mtime)
+    return [p for p in papers if file_sha256(p) not in processed]
+
+
+# ============================================================
+# 解读结果缓存
+# ============================================================
+def get_result_cache() -> DiskCache:
+    return DiskCache(
+        RESULT_CACHE_DIR,
+        suffix=".md",
+        max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+        max_age_days=RESULT_CACHE_MAX_AGE_DAYS,
+    )
+
 
-    # 验证环境变量
+def result_cache_key(paper_path: str, chunked: bool = False) -> str:
+    """缓存键: SHA-256(PDF 内容, 系统提示词, 模型, max_tokens)，分块模式另加区分"""
+    parts = [file_sha256(paper_path), SYSTEM_PROMPT, ANTHROPIC_MODEL, MAX_TOKENS]
+    if chunked:
+        parts += ["chunked", CHUNK_SYSTEM_PROMPT, CHUNK_TOKENS]
+    return cache_key(*parts)
+
+
+def is_api_error(text: str) -> bool:
+    """call_api_direct 以错误文本代替异常返回，这里识别这类结果"""
+    return text.startswith(API_ERROR_PREFIXES)
+
+
+def is_cacheable_explanation(explanation: str) -> bool:
+    """空结果、过短结果、API 错误文本和中断的流式输出都不缓存"""
+    return len(explanation) >= 100 and not is_api_error(explanation) and INCOMPLETE_MARKER not in explanation
+
+
+# ============================================================
+# 主执行函数（使用 Claude Agent SDK）
+# ============================================================
+def check_environment() -> None:
+    """验证必需的环境变量"""
     if not os.environ.get("ANTHROPIC_API_KEY"):
-        print("[ERROR] ANTHROPIC_API_KEY environment variable is not set")
-        sys.exit(1)
+        raise PaperReaderError("ANTHROPIC_API_KEY environment variable is not set")
 
     if not os.environ.get("ANTHROPIC_BASE_URL"):
         print("[WARN] ANTHROPIC_BASE_URL not set, will use default Anthropic API")
 
-    if not PAPER_PATH or not Path(PAPER_PATH).exists():
-        print(f"[ERROR] Paper file not found: {PAPER_PATH}")
-        sys.exit(1)
 
-    # 创建输出目录
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+def record_token_usage(record: Span, estimator: TokenEstimator, estimated: int) -> None:
+    """记录估算的 input_tokens；只用一次成功、无重试的调用的实际用量校准估算器"""
+    record.attrs["estimated_input_tokens"] = estimated
+    if record.total_input_tokens and not record.retries and record.status == "ok":
+        estimator.record(estimated, record.total_input_tokens)
 
-    # 提取 PDF 文本
-    print(f"[INFO] Reading paper: {PAPER_PATH}")
-    pdf_text = extract_pdf_text(PAPER_PATH)
 
-    if not pdf_text:
-        print("[ERROR] Failed to extract text from PDF")
-        sys.exit(1)
+async def call_llm(
+    user_prompt: str,
+    stream_to: Path | None = None,
+    on_text: Callable[[str], None] | None = None,
+    estimator: TokenEstimator | None = None,
+) -> str:
+    """生成解读正文的 LLM 调用（记录为 llm span）"""
+    estimator = estimator or TokenEstimator(ANTHROPIC_MODEL)
+    with span("llm", model=ANTHROPIC_MODEL, stream=stream_to is not None) as llm_span:
+        llm_span.bytes_in = len(user_prompt.encode("utf-8"))
+        estimated = estimator.estimate_messages(SYSTEM_PROMPT, user_prompt)
+        explanation = await call_claude(user_prompt, stream_to=stream_to, on_text=on_text)
+        llm_span.bytes_out = len(explanation.encode("utf-8"))
+        if is_api_error(explanation):
+            llm_span.status = "error"
+        record_token_usage(llm_span, estimator, estimated)
+    return explanation
 
-    # 限制文本长度（避免超出 token 限制）
-    max_chars = 100000
-    if len(pdf_text) > max_chars:
-        print(f"[WARN] Text truncated from {len(pdf_text)} to {max_chars} characters")
-        pdf_text = pdf_text[:max_chars]
 
-    start_time = datetime.now()
-
-    # 构建提示词
-    user_prompt = f"""请阅读以下学术论文内容，并按照"黄叔风格"生成一篇通俗易懂的中文解读文章。
+def explanation_prompt(pdf_text: str) -> str:
+    return f"""请阅读以下学术论文内容，并按照"黄叔风格"生成一篇通俗易懂的中文解读文章。
 
 论文内容:
 ```
@@ -612,104 +880,259 @@ async def run_paper_reader():
 
 请生成完整的 Markdown 格式解读文章，包含所有章节。"""
 
-    # 使用 Claude Agent SDK
-    print(f"[INFO] Calling Claude Agent SDK (model: {ANTHROPIC_MODEL})...")
-    print(f"[INFO] Base URL: {os.environ.get('ANTHROPIC_BASE_URL', 'default')}")
 
-    try:
-        from claude_agent_sdk import query
+async def prepare_prompt(paper_path: str) -> str:
+    """提取 PDF 文本，按输入 token 预算截断，返回生成解读的用户提示词"""
+    # 提取 PDF 文本
+    print(f"[INFO] Reading paper: {paper_path}")
+    # 超出 PAPER_EXTRACT_CHARS 的页面不会被解析
+    with span("extract", max_chars=PAPER_EXTRACT_CHARS) as extract_span:
+        extract_span.bytes_in = Path(paper_path).stat().st_size
+        pdf_text = await anyio.to_thread.run_sync(
+            lambda: extract_pdf_text(paper_path, max_chars=PAPER_EXTRACT_CHARS)
+        )
+        extract_span.bytes_out = len(pdf_text.encode("utf-8"))
 
-        full_response = []
-        async for message in query(
-            prompt=user_prompt,
-            system=SYSTEM_PROMPT,
-            model=ANTHROPIC_MODEL,
-            max_tokens=8000
-        ):
-            # 处理不同类型的消息
-            if hasattr(message, 'content'):
-                content = message.content
-                if isinstance(content, list):
-                    for block in content:
-                        if hasattr(block, 'text'):
-                            full_response.append(block.text)
-                else:
-                    full_response.append(str(content))
-            elif hasattr(message, 'text'):
-                full_response.append(message.text)
-            elif hasattr(message, 'result'):
-                full_response.append(str(message.result))
+    if not pdf_text:
+        raise PaperReaderError(f"Failed to extract text from PDF: {paper_path}")
+
+    # 按模型的输入 token 预算（扣除系统提示词和提示词模板）截断：按章节优先级丢弃，而不是硬切
+    estimator = TokenEstimator(ANTHROPIC_MODEL)
+    budget = input_token_budget(ANTHROPIC_MODEL, MAX_TOKENS) - estimator.estimate_messages(
+        SYSTEM_PROMPT, explanation_prompt("")
+    )
+    paper_tokens = estimator.estimate(pdf_text)
+    if paper_tokens > budget:
+        with span("truncate", budget=budget, tokens=paper_tokens) as truncate_span:
+            truncate_span.bytes_in = len(pdf_text.encode("utf-8"))
+            pdf_text, omitted = build_context(pdf_text, budget, estimator.estimate)
+            truncate_span.bytes_out = len(pdf_text.encode("utf-8"))
+            truncate_span.attrs["omitted"] = omitted
+        print(f"[WARN] Text reduced from ~{paper_tokens} to ~{estimator.estimate(pdf_text)} tokens "
+              f"(budget {budget}, {len(pdf_text)} characters)")
+        if omitted:
+            print(f"[INFO] Omitted sections: {', '.join(omitted)}")
+
+    return explanation_prompt(pdf_text)
+
+
+async def generate_explanation(
+    paper_path: str,
+    stream_to: Path | None = None,
+    on_text: Callable[[str], None] | None = None,
+) -> str:
+    """提取 PDF 文本并调用 Claude 生成解读 Markdown"""
+    return await call_llm(await prepare_prompt(paper_path), stream_to, on_text)
+
+
+def bulk_explanation(message: dict) -> str:
+    """Message Batches 已返回的解读（记录为 llm span，token 用量取自结果）"""
+    with span("llm", model=message.get("model", ANTHROPIC_MODEL), bulk=True) as llm_span:
+        explanation = message_text(message)
+        llm_span.add_usage(message.get("usage"))
+        llm_span.bytes_out = len(explanation.encode("utf-8"))
+    return explanation
+
+
+async def generate_explanation_chunked(
+    paper_path: str,
+    stream_to: Path | None = None,
+    on_text: Callable[[str], None] | None = None,
+) -> str:
+    """分块（map-reduce）模式：不截断任何内容
+
+    map: 把论文按章节切成若干块，并发生成每块的要点笔记（短调用，受 CHUNK_CONCURRENCY 限制）
+    reduce: 用原有 SYSTEM_PROMPT 基于全部笔记生成完整解读（一次长调用）
+    总耗时约等于一次短调用 + 一次长调用，与块数基本无关。
+    """
+    print(f"[INFO] Reading paper (chunked mode): {paper_path}")
+    with span("extract") as extract_span:
+        extract_span.bytes_in = Path(paper_path).stat().st_size
+        pdf_text = await anyio.to_thread.run_sync(extract_pdf_text, paper_path)
+        extract_span.bytes_out = len(pdf_text.encode("utf-8"))
 
-        explanation = "\n".join(full_response)
+    if not pdf_text:
+        raise PaperReaderError(f"Failed to extract text from PDF: {paper_path}")
 
-        if not explanation or len(explanation) < 100:
-            print("[WARN] Agent SDK returned empty/short response, trying direct API...")
-            explanation = await call_api_direct(user_prompt)
+    estimator = TokenEstimator(ANTHROPIC_MODEL)
+    chunks = chunk_sections(pdf_text, CHUNK_TOKENS, estimator.estimate)
+    print(f"[INFO] Map: {len(chunks)} chunk(s) of <= ~{CHUNK_TOKENS} tokens, concurrency={CHUNK_CONCURRENCY}")
 
-    except ImportError as e:
-        print(f"[WARN] Claude Agent SDK not available ({e}), using direct API...")
-        explanation = await call_api_direct(user_prompt)
-    except Exception as e:
-        print(f"[WARN] Agent SDK error ({e}), falling back to direct API...")
-        explanation = await call_api_direct(user_prompt)
+    limiter = anyio.CapacityLimiter(max(1, CHUNK_CONCURRENCY))
+    notes: list[str] = [""] * len(chunks)
 
-    # 计算处理时间
-    processing_time = (datetime.now() - start_time).total_seconds()
+    async def summarize_chunk(index: int, chunk: str) -> None:
+        async with limiter:
+            prompt = f"""以下是一篇学术论文的第 {index + 1}/{len(chunks)} 部分。
 
-    # 生成配图（优先使用 Gemini，备用 DashScope）
-    image_status = "未生成"
-    generated_images = []
+```
+{chunk}
+```"""
+            with span(f"chunk[{index + 1}]") as chunk_span:
+                chunk_span.bytes_in = len(prompt.encode("utf-8"))
+                estimated = estimator.estimate_messages(CHUNK_SYSTEM_PROMPT, prompt)
+                note = await call_claude(prompt, system=CHUNK_SYSTEM_PROMPT, max_tokens=CHUNK_MAX_TOKENS)
+                chunk_span.bytes_out = len(note.encode("utf-8"))
+                record_token_usage(chunk_span, estimator, estimated)
+        if is_api_error(note) or not note.strip():
+            # 摘要失败时退回原文节选，保证这部分内容仍然进入 reduce 阶段
+            print(f"[WARN] Chunk {index + 1} summary failed, using raw excerpt")
+            note = truncate_at_sentence(chunk, CHUNK_MAX_TOKENS * 2)
+        notes[index] = note
+
+    async with anyio.create_task_group() as tg:
+        for index, chunk in enumerate(chunks):
+            tg.start_soon(summarize_chunk, index, chunk)
+
+    joined_notes = "\n\n".join(
+        f"### 第 {index + 1} 部分笔记\n{note}" for index, note in enumerate(notes)
+    )
+    print(f"[INFO] Reduce: {len(joined_notes)} characters of notes")
+
+    user_prompt = f"""下面是一篇学术论文按顺序分段整理的详细笔记（覆盖论文全部内容）。
+请基于这些笔记，按照"黄叔风格"生成一篇通俗易懂的中文解读文章。
+
+论文笔记:
+{joined_notes}
 
-    if GEMINI_API_KEY:
-        print("[INFO] Generating images with Gemini 3 Pro Image...")
-        # Gemini 擅长生成带文字的信息图
-        image_prompts = [
-            "Create an informative infographic about the Transformer architecture in deep learning. Include a visual diagram showing: 1) Input embeddings 2) Multi-head attention mechanism 3) Feed-forward layers 4) Output. Use clean modern design with blue and white colors. Add clear labels in English.",
-            "Create a visual summary diagram showing the key innovation of 'Attention Is All You Need' paper. Illustrate how self-attention works: Query, Key, Value vectors connecting words in a sentence. Use professional scientific illustration style with annotations."
-        ]
-
-        for i, prompt in enumerate(image_prompts):
-            img_path = await generate_image_gemini(prompt, i + 1)
-            if img_path:
-                generated_images.append(img_path)
-
-        if generated_images:
-            image_status = f"成功 ({len(generated_images)}张, Gemini)"
-        else:
-            image_status = "Gemini 失败"
-
-    # 如果 Gemini 失败或未配置，尝试 DashScope
-    if not generated_images and DASHSCOPE_API_KEY:
-        print("[INFO] Falling back to DashScope (通义万相)...")
-        image_prompts = [
-            "abstract scientific visualization, neural network concept art, flowing data streams and connections, blue and purple gradient, modern minimalist style, clean geometric shapes",
-            "futuristic knowledge concept illustration, glowing nodes and pathways, deep learning visualization, technological aesthetic, dark blue background with bright accents"
-        ]
-
-        for i, prompt in enumerate(image_prompts):
-            img_path = await generate_image_dashscope(prompt, i + 1)
-            if img_path:
-                generated_images.append(img_path)
-
-        if generated_images:
-            image_status = f"成功 ({len(generated_images)}张, DashScope)"
+请生成完整的 Markdown 格式解读文章，包含所有章节。"""
+
+    return await call_llm(user_prompt, stream_to, on_text, estimator)
+
+
+async def run_paper_reader(
+    paper_path: str | None = None,
+    use_cache: bool = True,
+    chunked: bool = False,
+    stream: bool = False,
+    refresh_images: bool = False,
+    timings: dict[str, float] | None = None,
+    fail_on_api_error: bool = False,
+    bulk_message: dict | None = None,
+) -> Path:
+    """使用 Claude Agent SDK 执行论文解读（处理单篇论文，返回 Markdown 文件路径）
+
+    stream=True 时通过 SSE 流式调用 API，生成的内容边到边写入 Markdown 文件，
+    每完成一个 `##` 章节就增量渲染到 HTML 预览文件；PDF 仍在最后统一生成。
+    每个阶段记录为运行报告中的 span，报告写在输出文件旁边（.report.json）并追加到 RUN_REPORTS；
+    传入 timings 时同时填入各阶段耗时（秒）。fail_on_api_error=True 时 API 调用失败抛出
+    TransientPaperError，而不是把错误信息写进解读文件。
+    bulk_message 为 Message Batches 已返回的 message 对象：直接用它作为解读正文，不再调用 Claude。
+    refresh_images=True 时忽略配图缓存，重新生成配图。
+    """
+    paper_path = str(paper_path or PAPER_PATH)
+    report: RunReport | None = None
+    try:
+        with run_report(paper_path) as report:
+            return await _run_paper_reader(
+                paper_path, use_cache, chunked, stream, refresh_images, fail_on_api_error, bulk_message, report
+            )
+    finally:
+        if report is not None:
+            if timings is not None:
+                timings.update(report.stage_durations(), total=report.duration)
+            write_run_report(report)
+
+
+def write_run_report(report: RunReport) -> None:
+    """报告写在输出文件旁边（还没确定输出文件名时只追加到历史记录）"""
+    try:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        output_stem = report.attrs.get("output_stem")
+        report_file = OUTPUT_DIR / f"{output_stem}.report.json" if output_stem else None
+        report.write(report_file, RUN_REPORTS)
+        if report_file:
+            print(f"[INFO] Run report: {report_file}")
+    except OSError as e:
+        print(f"[WARN] Could not write run report: {e}")
+
+
+async def _run_paper_reader(
+    paper_path: str,
+    use_cache: bool,
+    chunked: bool,
+    stream: bool,
+    refresh_images: bool,
+    fail_on_api_error: bool,
+    bulk_message: dict | None,
+    report: RunReport,
+) -> Path:
+    if not paper_path or not Path(paper_path).exists():
+        raise PaperReaderError(f"Paper file not found: {paper_path}")
+
+    # 创建输出目录
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # 输出文件名带论文名，批量并发时不会互相覆盖
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_stem = f"paper-explanation-{timestamp}-{Path(paper_path).stem}"
+    md_file = OUTPUT_DIR / f"{output_stem}.md"
+    html_file = OUTPUT_DIR / f"{output_stem}.html"
+    report.attrs.update(output_stem=output_stem, model=ANTHROPIC_MODEL, chunked=chunked, stream=stream,
+                        bulk=bulk_message is not None)
+    renderer = IncrementalRenderer(html_file, "论文解读") if stream and bulk_message is None else None
+
+    # 查询结果缓存：命中则跳过 PDF 提取和 LLM 调用，直接用缓存的 Markdown 重新渲染
+    result_cache = get_result_cache()
+    cache_id = result_cache_key(paper_path, chunked)
+    cached = result_cache.get(cache_id) if use_cache and bulk_message is None else None
+
+    async def produce_explanation() -> None:
+        nonlocal explanation, processing_time, explanation_error
+        start_time = datetime.now()
+        if cached is not None:
+            print(f"[INFO] Result cache hit ({cache_id[:12]}), skipping Claude call")
+            explanation = cached.decode("utf-8")
+            report.attrs["cache_hit"] = True
         else:
-            image_status = "失败（API 错误）"
+            stream_to = md_file if stream else None
+            on_text = renderer.feed if renderer else None
+            try:
+                if bulk_message is not None:
+                    explanation = bulk_explanation(bulk_message)
+                elif chunked:
+                    explanation = await generate_explanation_chunked(paper_path, stream_to, on_text)
+                else:
+                    explanation = await generate_explanation(paper_path, stream_to, on_text)
+            except PaperReaderError as e:
+                # 正文失败时配图也没有意义，取消兄弟任务；异常在任务组外重新抛出，避免被包成 ExceptionGroup
+                explanation_error = e
+                tg.cancel_scope.cancel()
+                return
+            if is_cacheable_explanation(explanation):
+                result_cache.put(cache_id, explanation.encode("utf-8"))
+                print(f"[INFO] Result cached ({cache_id[:12]})")
+        processing_time = (datetime.now() - start_time).total_seconds()
+
+    async def produce_images() -> None:
+        nonlocal generated_images, image_status
+        generated_images, image_status = await generate_images(refresh_images)
+
+    # 配图不依赖解读正文：文本和配图作为兄弟任务并行，总耗时约为 max(LLM, 最慢的一张图)
+    explanation = ""
+    processing_time = 0.0
+    generated_images: list[str] = []
+    image_status = "未生成"
+    explanation_error: PaperReaderError | None = None
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(produce_explanation)
+        tg.start_soon(produce_images)
 
-    if not GEMINI_API_KEY and not DASHSCOPE_API_KEY:
-        print("[INFO] DASHSCOPE_API_KEY not set, skipping image generation")
+    if explanation_error:
+        raise explanation_error
+    if fail_on_api_error and is_api_error(explanation):
+        raise TransientPaperError(explanation.strip())
 
     # 添加元数据
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     metadata = f"""
 
 ---
 
 **元数据**
-📄 论文文件: `{PAPER_PATH}`
+📄 论文文件: `{paper_path}`
 ⏱️ 处理时长: {processing_time:.1f}秒
 🖼️ 配图生成: {image_status}
-🤖 生成模型: {ANTHROPIC_MODEL} (via Claude Agent SDK)
+🤖 生成模型: {ANTHROPIC_MODEL} (via {"Message Batches" if bulk_message else "Claude Agent SDK"}{", 缓存命中" if cached is not None else ""})
 📅 生成时间: {datetime.now().strftime("%Y年%m月%d日 %H:%M:%S")}
 
 ---
@@ -722,24 +1145,44 @@ async def run_paper_reader():
     if generated_images:
         image_section = "\n\n---\n\n## 配图\n\n"
         for i, img_path in enumerate(generated_images):
-            img_name = Path(img_path).name
-            image_section += f"![配图{i+1}]({img_name})\n\n"
+            # 相对 Markdown / HTML 文件所在的输出目录引用
+            img_ref = Path(img_path).relative_to(OUTPUT_DIR).as_posix()
+            image_section += f"![配图{i+1}]({img_ref})\n\n"
 
     final_output = explanation + image_section + metadata
 
-    # 保存 Markdown 文件
-    md_file = OUTPUT_DIR / f"paper-explanation-{timestamp}.md"
-    with open(md_file, "w", encoding="utf-8") as f:
-        f.write(final_output)
+    # 保存 Markdown 文件（流式模式下覆盖边生成边写入的正文；原子替换，中途失败不会截断已有内容）
+    write_text_atomic(md_file, final_output)
     print(f"[SUCCESS] Markdown saved to: {md_file}")
 
-    # 转换为 HTML
-    html_file = OUTPUT_DIR / f"paper-explanation-{timestamp}.html"
-    convert_md_to_html(final_output, html_file, "论文解读")
+    # 转换为 HTML（流式模式下正文章节已在生成过程中渲染，这里只补渲染剩余部分）
+    with span("html", incremental=renderer is not None) as html_span:
+        html_span.bytes_in = len(final_output.encode("utf-8"))
+        if renderer:
+            document = await anyio.to_thread.run_sync(renderer.finish, final_output)
+        else:
+            document = await anyio.to_thread.run_sync(convert_md_to_html, final_output, html_file, "论文解读")
+        if document is None:
+            html_span.status = "error"
+        else:
+            html_span.bytes_out = len(document.html.encode("utf-8"))
 
     # 转换为 PDF
-    pdf_file = OUTPUT_DIR / f"paper-explanation-{timestamp}.pdf"
-    convert_html_to_pdf(html_file, pdf_file)
+    pdf_file = OUTPUT_DIR / f"{output_stem}.pdf"
+    if document is not None:
+        document.images = [Path(p) for p in generated_images]
+        with span("pdf", images=len(document.images)) as pdf_span:
+            pdf_span.bytes_in = html_span.bytes_out + sum(p.stat().st_size for p in document.images if p.is_file())
+            if await anyio.to_thread.run_sync(convert_document_to_pdf, document, pdf_file):
+                pdf_span.bytes_out = pdf_file.stat().st_size
+            else:
+                pdf_span.status = "error"
+
+    # 只有完整的解读才记入已处理清单；API 错误文本、中断的输出留到下次运行重新处理
+    if is_cacheable_explanation(explanation):
+        record_processed(paper_path, md_file)
+    else:
+        print(f"[WARN] Explanation is incomplete or an API error, not marking {paper_path} as processed")
 
     print(f"[INFO] Processing time: {processing_time:.1f}s")
     print(f"[INFO] Output files:")
@@ -750,8 +1193,457 @@ async def run_paper_reader():
     return md_file
 
 
-async def call_api_direct(prompt: str) -> str:
-    """直接调用 API（备用方案，当 Agent SDK 不可用时）"""
+async def run_batch(
+    papers: list[Path],
+    concurrency: int = BATCH_CONCURRENCY,
+    bulk_messages: dict[str, dict] | None = None,
+    **reader_options,
+) -> dict[str, list[str]]:
+    """并发处理多篇论文
+
+    每篇论文在自己的失败边界内运行：单篇失败只记录错误，不会取消同批次的其他论文。
+    API 调用失败（含熔断）计为失败，不把错误信息写成解读，也不记入已处理清单。
+    reader_options 原样传给 run_paper_reader（use_cache、chunked、stream 等）；
+    bulk_messages 为论文路径 -> Message Batches 返回的 message（见 run_bulk）。
+    """
+    limiter = anyio.CapacityLimiter(max(1, concurrency))
+    results: dict[str, list[str]] = {"succeeded": [], "failed": []}
+
+    async def process_one(paper: Path) -> None:
+        async with limiter:
+            print(f"[INFO] [batch] Start: {paper}")
+            try:
+                md_file = await run_paper_reader(
+                    str(paper), fail_on_api_error=True, bulk_message=(bulk_messages or {}).get(str(paper)),
+                    **reader_options,
+                )
+            except Exception as e:
+                print(f"[ERROR] [batch] Failed: {paper}: {e}")
+                results["failed"].append(str(paper))
+            else:
+                print(f"[SUCCESS] [batch] Done: {paper} -> {md_file}")
+                results["succeeded"].append(str(paper))
+
+    async with anyio.create_task_group() as tg:
+        for paper in papers:
+            tg.start_soon(process_one, paper)
+
+    return results
+
+
+async def submit_bulk(client: MessageBatchClient, papers: list[Path], concurrency: int) -> tuple[PendingBatch, list[str]]:
+    """准备各篇论文的提示词并提交为一个 Message Batch，返回 (已提交的批次, 准备失败的论文)"""
+    limiter = anyio.CapacityLimiter(max(1, concurrency))
+    prompts: dict[str, str] = {}
+    failed: list[str] = []
+
+    async def prepare(paper: Path) -> None:
+        async with limiter:
+            try:
+                prompts[str(paper)] = await prepare_prompt(str(paper))
+            except PaperReaderError as e:
+                print(f"[ERROR] [bulk] Failed: {paper}: {e}")
+                failed.append(str(paper))
+
+    async with anyio.create_task_group() as tg:
+        for paper in papers:
+            tg.start_soon(prepare, paper)
+
+    # custom_id 只允许字母、数字、- 和 _，按提交顺序编号，论文路径记录在状态文件里
+    ordered = [str(paper) for paper in papers if str(paper) in prompts]
+    custom_ids = {f"paper-{i}": paper for i, paper in enumerate(ordered)}
+    requests = [
+        {
+            "custom_id": custom_id,
+            "params": {
+                "model": ANTHROPIC_MODEL,
+                "max_tokens": MAX_TOKENS,
+                "system": system_blocks(SYSTEM_PROMPT, prompt_cacheable(SYSTEM_PROMPT)),
+                "messages": [{"role": "user", "content": prompts[paper]}],
+            },
+        }
+        for custom_id, paper in custom_ids.items()
+    ]
+    if not requests:
+        return PendingBatch("", {}), failed
+
+    try:
+        batch = await client.submit(requests)
+    except httpx.HTTPStatusError as e:
+        raise TransientPaperError(f"Message batch submission failed: {e.response.status_code} {e.response.text}") from e
+    except httpx.HTTPError as e:
+        raise TransientPaperError(f"Message batch submission failed: {e}") from e
+
+    pending = PendingBatch(batch["id"], custom_ids, datetime.now().isoformat(timespec="seconds"))
+    pending.save(BULK_STATE)
+    print(f"[INFO] [bulk] Submitted batch {pending.id} with {len(requests)} request(s)")
+    return pending, failed
+
+
+async def run_bulk(
+    papers: list[Path],
+    concurrency: int = BATCH_CONCURRENCY,
+    use_cache: bool = True,
+    refresh_images: bool = False,
+) -> dict[str, list[str]]:
+    """Message Batches 批量模式：所有论文的 Claude 调用一次提交，结果再交给常规的渲染流程
+
+    缓存命中的论文直接渲染；其余论文（最多 BULK_MAX_REQUESTS 篇）提交为一个批次，轮询到结束后
+    并发生成 Markdown / HTML / PDF（配图照常生成）。BULK_STATE 中有未取回的批次时先继续轮询它，
+    不提交新批次；该批次已无法查询（4xx，例如已过期、已删除或换了密钥）时删除状态文件并抛出 PaperReaderError。
+    失败的论文不记入已处理清单，下次运行会重新提交。
+    """
+    client = MessageBatchClient(
+        os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com"),
+        os.environ.get("ANTHROPIC_API_KEY", ""),
+    )
+    results: dict[str, list[str]] = {"succeeded": [], "failed": []}
+
+    def merge(batch_results: dict[str, list[str]]) -> None:
+        for key in results:
+            results[key] += batch_results[key]
+
+    pending = PendingBatch.load(BULK_STATE)
+    if pending is not None:
+        print(f"[INFO] [bulk] Resuming batch {pending.id} ({len(pending.papers)} paper(s), "
+              f"submitted {pending.submitted_at})")
+    else:
+        result_cache = get_result_cache()
+        cached = [p for p in papers if use_cache and result_cache.get(result_cache_key(str(p))) is not None]
+        uncached = [p for p in papers if p not in cached]
+        if cached:
+            print(f"[INFO] [bulk] {len(cached)} paper(s) found in result cache")
+            merge(await run_batch(cached, concurrency, use_cache=True, refresh_images=refresh_images))
+        if len(uncached) > BULK_MAX_REQUESTS:
+            print(f"[INFO] [bulk] {len(uncached) - BULK_MAX_REQUESTS} paper(s) left for the next run "
+                  f"(BULK_MAX_REQUESTS={BULK_MAX_REQUESTS})")
+            uncached = uncached[:BULK_MAX_REQUESTS]
+        if not uncached:
+            return results
+        pending, failed = await submit_bulk(client, uncached, concurrency)
+        results["failed"] += failed
+        if not pending.papers:
+            return results
+
+    try:
+        batch = await client.wait(pending.id)
+        batch_results = await client.results(batch)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code >= 500:
+            raise TransientPaperError(f"Could not download results of batch {pending.id}: {e}") from e
+        # 批次不存在、已过期或无权访问（换了 API 密钥或代理）：丢弃状态文件，下次运行重新提交这些论文
+        print(f"[ERROR] [bulk] Batch {pending.id} is no longer available: {e.response.status_code} {e.response.text[:200]}")
+        BULK_STATE.unlink(missing_ok=True)
+        raise PaperReaderError(
+            f"Message batch {pending.id} could not be retrieved ({e.response.status_code}); "
+            f"discarded {BULK_STATE}, its papers will be resubmitted on the next run"
+        ) from e
+    except httpx.HTTPError as e:
+        # 状态文件保留：下次运行重新下载结果
+        raise TransientPaperError(f"Could not download results of batch {pending.id}: {e}") from e
+
+    messages: dict[str, dict] = {}
+    for custom_id, paper in pending.papers.items():
+        result = batch_results.get(custom_id, {"type": "missing"})
+        if result.get("type") == SUCCEEDED:
+            messages[paper] = result["message"]
+        else:
+            print(f"[ERROR] [bulk] {paper}: {result_error(result)}")
+            results["failed"].append(paper)
+
+    merge(await run_batch(
+        [Path(p) for p in messages], concurrency,
+        bulk_messages=messages, use_cache=use_cache, refresh_images=refresh_images,
+    ))
+    BULK_STATE.unlink(missing_ok=True)
+    return results
+
+
+async def run_worker(
+    queue: JobQueue,
+    concurrency: int = BATCH_CONCURRENCY,
+    poll_interval: float = WORKER_POLL_INTERVAL,
+    exit_when_idle: bool = False,
+) -> dict[str, int]:
+    """任务队列 worker：并发领取并处理队列中的论文
+
+    每个槽位循环领取任务；临时性失败（TransientPaperError、网络错误等）由队列退避后重试，
+    论文不存在、无法提取文本等永久性失败直接标记为 failed。各阶段耗时写入任务记录。
+    exit_when_idle=True 时队列中没有排队任务（包括等待重试的任务）后退出，否则常驻等待新任务。
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stale = await anyio.to_thread.run_sync(queue.requeue_stale)
+    if stale:
+        print(f"[WARN] [worker] Requeued {stale} stale running job(s)")
+    print(f"[INFO] [worker] {worker_id} started, concurrency={concurrency}, queue={queue.db_path}")
+    stats = {"succeeded": 0, "failed": 0, "retried": 0}
+
+    async def process_job(job: Job) -> None:
+        print(f"[INFO] [worker] Job {job.id} (attempt {job.attempts}/{job.max_attempts}): {job.paper_path}")
+        timings: dict[str, float] = {}
+        try:
+            md_file = await run_paper_reader(job.paper_path, timings=timings, fail_on_api_error=True, **job.options)
+        except Exception as e:
+            transient = isinstance(e, TransientPaperError) or not isinstance(e, PaperReaderError)
+            status = await anyio.to_thread.run_sync(queue.fail, job.id, f"{type(e).__name__}: {e}", transient, timings)
+            stats["retried" if status == "queued" else "failed"] += 1
+            print(f"[ERROR] [worker] Job {job.id} failed ({'will retry' if status == 'queued' else 'giving up'}): {e}")
+        else:
+            await anyio.to_thread.run_sync(queue.complete, job.id, str(md_file), timings)
+            stats["succeeded"] += 1
+            stage_summary = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in timings.items())
+            print(f"[SUCCESS] [worker] Job {job.id} done -> {md_file} ({stage_summary})")
+
+    async def slot() -> None:
+        while True:
+            job = await anyio.to_thread.run_sync(queue.claim, worker_id)
+            if job is not None:
+                await process_job(job)
+                continue
+            # 没有可执行任务：等到最早的重试任务可执行（最多 poll_interval）；队列清空且 exit_when_idle 时退出
+            wait = await anyio.to_thread.run_sync(queue.next_available_in)
+            if wait is None and exit_when_idle:
+                return
+            await anyio.sleep(poll_interval if wait is None else min(wait, poll_interval))
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(max(1, concurrency)):
+            tg.start_soon(slot)
+
+    return stats
+
+
+async def call_claude(
+    prompt: str,
+    system: str = SYSTEM_PROMPT,
+    max_tokens: int = MAX_TOKENS,
+    stream_to: Path | None = None,
+    on_text: Callable[[str], None] | None = None,
+) -> str:
+    """调用 Claude：优先使用 Agent SDK，失败或结果过短时退回直接调用 API
+
+    指定 stream_to 时改用 SSE 流式 API，生成的文本实时追加到该文件，并回调 on_text。
+    """
+    if stream_to is not None:
+        return await call_api_stream(prompt, stream_to, system, max_tokens, on_text)
+
+    print(f"[INFO] Calling Claude Agent SDK (model: {ANTHROPIC_MODEL})...")
+    print(f"[INFO] Base URL: {os.environ.get('ANTHROPIC_BASE_URL', 'default')}")
+
+    try:
+        from claude_agent_sdk import query
+
+        full_response = []
+        # SDK 的异常（CLI 进程、连接、认证错误等）都说明 SDK 路径不可用，全部计为失败
+        async with endpoint_breakers["claude_sdk"].guard(is_failure=lambda e: True) as record_health:
+            async for message in query(
+                prompt=prompt,
+                system=system,
+                model=ANTHROPIC_MODEL,
+                max_tokens=max_tokens
+            ):
+                # 处理不同类型的消息
+                if hasattr(message, 'content'):
+                    content = message.content
+                    if isinstance(content, list):
+                        for block in content:
+                            if hasattr(block, 'text'):
+                                full_response.append(block.text)
+                    else:
+                        full_response.append(str(content))
+                elif hasattr(message, 'text'):
+                    full_response.append(message.text)
+                elif hasattr(message, 'result'):
+                    full_response.append(str(message.result))
+                if isinstance(getattr(message, 'usage', None), dict):
+                    current_span().add_usage(message.usage)
+
+            explanation = "\n".join(full_response)
+            record_health(len(explanation) >= 100)
+
+        if not explanation or len(explanation) < 100:
+            print("[WARN] Agent SDK returned empty/short response, trying direct API...")
+            current_span().retries += 1
+            explanation = await call_api_direct(prompt, system, max_tokens)
+
+    except ImportError as e:
+        print(f"[WARN] Claude Agent SDK not available ({e}), using direct API...")
+        explanation = await call_api_direct(prompt, system, max_tokens)
+    except CircuitOpenError as e:
+        print(f"[WARN] Skipping Agent SDK ({e}), using direct API...")
+        explanation = await call_api_direct(prompt, system, max_tokens)
+    except Exception as e:
+        print(f"[WARN] Agent SDK error ({e}), falling back to direct API...")
+        current_span().retries += 1
+        explanation = await call_api_direct(prompt, system, max_tokens)
+
+    return explanation
+
+
+class StreamInterrupted(Exception):
+    """SSE 流在 message_stop 之前中断"""
+
+
+async def _stream_messages(
+    payload: dict,
+    on_text: Callable[[str], None],
+    on_start: Callable[[], None] | None = None,
+) -> str | None:
+    """发起一次流式 /v1/messages 请求，逐个文本增量回调 on_text，返回 stop_reason
+
+    收到 message_start（响应开始返回）时回调 on_start。
+    流在 message_stop 之前中断或收到无法解析的 data 行时抛出 StreamInterrupted；HTTP 错误时抛出 httpx.HTTPStatusError。
+    """
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    base_url = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+    if not base_url.endswith("/v1/messages"):
+        base_url = base_url.rstrip("/") + "/v1/messages"
+
+    stop_reason = None
+    async with http_client() as client:
+        async with client.stream(
+            "POST",
+            base_url,
+            headers={
+                "Content-Type": "application/json",
+                "x-api-key": api_key,
+                "anthropic-version": "2023-06-01"
+            },
+            json={**payload, "stream": True},
+            timeout=ENDPOINT_TIMEOUTS["claude"],
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[5:].strip() or "{}")
+                except json.JSONDecodeError as e:
+                    # 不完整或损坏的 data 行：按流中断处理，由调用方以已生成的部分续写
+                    raise StreamInterrupted(f"malformed SSE data ({e}): {line[:80]!r}") from e
+                event_type = event.get("type")
+
+                if event_type == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                    on_text(event["delta"]["text"])
+                elif event_type == "message_start":
+                    usage = event.get("message", {}).get("usage") or {}
+                    current_span().add_usage({k: v for k, v in usage.items() if k != "output_tokens"})
+                    if on_start:
+                        on_start()
+                elif event_type == "message_delta":
+                    stop_reason = event.get("delta", {}).get("stop_reason") or stop_reason
+                    current_span().add_usage({"output_tokens": (event.get("usage") or {}).get("output_tokens", 0)})
+                elif event_type == "message_stop":
+                    return stop_reason
+                elif event_type == "error":
+                    raise StreamInterrupted(event.get("error", {}).get("message", "stream error"))
+
+    raise StreamInterrupted("stream ended before message_stop")
+
+
+async def call_api_stream(
+    prompt: str,
+    stream_to: Path,
+    system: str = SYSTEM_PROMPT,
+    max_tokens: int = MAX_TOKENS,
+    on_text: Callable[[str], None] | None = None,
+) -> str:
+    """流式调用 API（SSE），文本增量实时追加到 stream_to（并回调 on_text），报告首字延迟
+
+    流中断时，以已生成的部分作为 assistant 前缀发起续写请求，最多 STREAM_MAX_RESUMES 次。
+    """
+    print(f"[INFO] Streaming Claude API (model: {ANTHROPIC_MODEL}) -> {stream_to}")
+    parts: list[str] = []
+    start = anyio.current_time()
+    first_token_at: float | None = None
+
+    with open(stream_to, "w", encoding="utf-8") as out:
+        def on_delta(text: str) -> None:
+            nonlocal first_token_at
+            if first_token_at is None:
+                first_token_at = anyio.current_time()
+                print(f"[INFO] Time to first token: {first_token_at - start:.2f}s")
+                current_span().attrs["ttft"] = round(first_token_at - start, 3)
+            parts.append(text)
+            out.write(text)
+            out.flush()
+            if on_text:
+                on_text(text)
+
+        for attempt in range(STREAM_MAX_RESUMES + 1):
+            messages = [{"role": "user", "content": prompt}]
+            partial = "".join(parts)
+            if partial.strip():
+                # 续写：API 不接受以空白结尾的 assistant 前缀
+                parts[:] = [partial.rstrip()]
+                messages.append({"role": "assistant", "content": parts[0]})
+                print(f"[INFO] Resuming stream from {len(parts[0])} characters (attempt {attempt})")
+                current_span().retries += 1
+
+            try:
+                async with endpoint_breakers["claude_api"].guard() as record_health, \
+                        prompt_cache_gate.turn(prompt_cache_key(system), prompt_cacheable(system)) as cache_ready:
+                    try:
+                        stop_reason = await _stream_messages(
+                            {"model": ANTHROPIC_MODEL, "max_tokens": max_tokens,
+                             "system": system_blocks(system, prompt_cacheable(system)), "messages": messages},
+                            on_delta,
+                            on_start=cache_ready,
+                        )
+                    except StreamInterrupted:
+                        # 流中途断开与网络错误一样计为服务故障
+                        record_health(False)
+                        raise
+                    record_health(True)
+            except CircuitOpenError as e:
+                print(f"[ERROR] {e}")
+                if not "".join(parts).strip():
+                    return f"API 调用失败: {e}"
+                break
+            except (StreamInterrupted, httpx.TransportError) as e:
+                print(f"[WARN] Stream interrupted after {len(''.join(parts))} characters: {e}")
+                continue
+            except httpx.HTTPStatusError as e:
+                print(f"[ERROR] API returned status {e.response.status_code}: {e.response.text}")
+                if not "".join(parts).strip():
+                    return f"API 调用失败: {e.response.status_code}"
+                break
+
+            text = "".join(parts)
+            print(f"[INFO] Stream finished ({stop_reason}) in {anyio.current_time() - start:.1f}s, {len(text)} characters")
+            return text
+
+    text = "".join(parts)
+    if not text.strip():
+        return "API 调用异常: stream interrupted"
+    print(f"[WARN] Stream could not be completed, keeping {len(text)} partial characters")
+    return text + INCOMPLETE_MARKER
+
+
+def prompt_cache_key(system: str) -> str:
+    """提示词缓存的前缀标识（缓存按模型和完整前缀区分）"""
+    return cache_key(ANTHROPIC_MODEL, system)
+
+
+@functools.lru_cache(maxsize=None)
+def prompt_cacheable(system: str) -> bool:
+    """系统提示词是否达到模型的最小可缓存长度（不足时不加 cache_control，也不等待缓存写入）"""
+    tokens = TokenEstimator(ANTHROPIC_MODEL).estimate(system)
+    cacheable = is_cacheable_prefix(ANTHROPIC_MODEL, tokens)
+    if PROMPT_CACHING and not cacheable:
+        print(f"[INFO] System prompt (~{tokens} tokens) is below the minimum cacheable length for "
+              f"{ANTHROPIC_MODEL} ({min_cacheable_tokens(ANTHROPIC_MODEL)}), prompt caching skipped")
+    return cacheable
+
+
+async def call_api_direct(prompt: str, system: str = SYSTEM_PROMPT, max_tokens: int = MAX_TOKENS) -> str:
+    """直接调用 API（备用方案，当 Agent SDK 不可用时）
+
+    系统提示词达到最小可缓存长度时带 cache_control 标记：批量运行时第一篇论文写入缓存，之后的论文读取缓存前缀。
+    """
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     base_url = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
 
@@ -760,7 +1652,8 @@ async def call_api_direct(prompt: str) -> str:
         base_url = base_url.rstrip("/") + "/v1/messages"
 
     try:
-        async with httpx.AsyncClient(timeout=180) as client:
+        async with endpoint_breakers["claude_api"].guard() as record_health, http_client() as client, \
+                prompt_cache_gate.turn(prompt_cache_key(system), prompt_cacheable(system)) as cache_ready:
             response = await client.post(
                 base_url,
                 headers={
@@ -768,28 +1661,156 @@ async def call_api_direct(prompt: str) -> str:
                     "x-api-key": api_key,
                     "anthropic-version": "2023-06-01"
                 },
+                timeout=ENDPOINT_TIMEOUTS["claude"],
                 json={
                     "model": ANTHROPIC_MODEL,
-                    "max_tokens": 8000,
-                    "system": SYSTEM_PROMPT,
+                    "max_tokens": max_tokens,
+                    "system": system_blocks(system, prompt_cacheable(system)),
                     "messages": [
                         {"role": "user", "content": prompt}
                     ]
                 }
             )
 
+            record_health(not is_endpoint_failure(response.status_code))
             if response.status_code == 200:
+                cache_ready()
                 result = response.json()
+                current_span().add_usage(result.get("usage"))
                 return result["content"][0]["text"]
             else:
                 print(f"[ERROR] API returned status {response.status_code}: {response.text}")
                 return f"API 调用失败: {response.status_code}"
 
+    except CircuitOpenError as e:
+        print(f"[ERROR] Skipping direct API call: {e}")
+        return f"API 调用失败: {e}"
     except Exception as e:
         print(f"[ERROR] Direct API call failed: {e}")
         return f"API 调用异常: {e}"
 
 
+# ============================================================
+# 命令行参数
+# ============================================================
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Paper Reader - Cloud Execution Script")
+    parser.add_argument("--batch", action="store_true",
+                        help="处理 papers/ 目录下所有未处理的 PDF")
+    parser.add_argument("--papers-dir", type=Path, default=PAPERS_DIR,
+                        help="批量模式的论文目录（默认: papers/）")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="批量模式下同时处理的论文数（默认: 3）")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="忽略解读结果缓存，强制重新调用 Claude")
+    parser.add_argument("--refresh-images", action="store_true",
+                        help="忽略配图缓存，强制重新生成配图（新图片会覆盖缓存）")
+    parser.add_argument("--stream", action="store_true",
+                        help="流式调用 Claude API，边生成边写入 Markdown 和 HTML 预览，中断后自动续写")
+    parser.add_argument("--chunked", action="store_true",
+                        help="分块（map-reduce）模式：长论文不截断，分块并发整理笔记后再生成解读")
+    parser.add_argument("--bulk", action="store_true",
+                        help="批量模式下通过 Message Batches API 一次提交所有论文（约半价，异步完成，通常 1 小时内）")
+    parser.add_argument("--enqueue", nargs="+", type=Path, metavar="PDF",
+                        help="把论文加入本地任务队列（选项 --no-cache/--stream/--chunked/--refresh-images 随任务保存）")
+    parser.add_argument("--worker", action="store_true",
+                        help="以 worker 方式运行：持续领取并处理任务队列中的论文（并发数见 --concurrency）")
+    parser.add_argument("--exit-when-idle", action="store_true",
+                        help="worker 在队列清空后退出（默认常驻）")
+    parser.add_argument("--queue-status", action="store_true",
+                        help="显示任务队列状态")
+    parser.add_argument("--queue-db", type=Path, default=JOB_QUEUE_DB,
+                        help="任务队列数据库（默认: outputs/jobs.sqlite3）")
+    parser.add_argument("--circuit-status", action="store_true",
+                        help="显示各服务熔断器的状态（outputs/.cache/circuit-breakers.json）")
+    parser.add_argument("--report-summary", action="store_true",
+                        help="按阶段汇总历次运行报告（outputs/run-reports.jsonl）")
+    return parser.parse_args(argv)
+
+
+def run_queue_command(args: argparse.Namespace) -> int:
+    """--enqueue / --queue-status：只操作队列数据库，不需要 API 配置"""
+    queue = JobQueue(args.queue_db)
+    if args.enqueue:
+        options = {"use_cache": not args.no_cache, "chunked": args.chunked, "stream": args.stream,
+                   "refresh_images": args.refresh_images}
+        for paper in args.enqueue:
+            if not paper.exists():
+                print(f"[ERROR] Paper file not found: {paper}")
+                continue
+            job_id = queue.enqueue(paper, options)
+            if job_id is None:
+                print(f"[INFO] Already queued: {paper}")
+            else:
+                print(f"[INFO] Queued job {job_id}: {paper}")
+
+    counts = queue.counts()
+    print(f"[INFO] Queue {args.queue_db}: " + ", ".join(f"{status}={n}" for status, n in counts.items()))
+    if args.queue_status:
+        for job in queue.recent():
+            line = f"       #{job['id']} {job['status']:<9} attempts={job['attempts']}/{job['max_attempts']} {job['paper_path']}"
+            if job["status"] == "succeeded" and job["timings"]:
+                line += " " + ", ".join(f"{k}={v:.1f}s" for k, v in json.loads(job["timings"]).items())
+            elif job["last_error"]:
+                line += f" ({job['last_error']})"
+            print(line)
+    return 0
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.enqueue or args.queue_status:
+        return run_queue_command(args)
+    if args.report_summary:
+        print_summary(RUN_REPORTS)
+        return 0
+    if args.circuit_status:
+        endpoint_breakers.print_status()
+        return 0
+
+    check_environment()
+
+    # 共享连接池、DashScope 轮询器和 PDF 渲染 worker 在整个运行期间有效（批量模式下所有论文共用）
+    with pdf_renderer_lifespan():
+        async with http_client_lifespan(), dashscope_poller_lifespan(DASHSCOPE_API_ROOT, DASHSCOPE_API_KEY or ""):
+            return await run_cli(args)
+
+
+async def run_cli(args: argparse.Namespace) -> int:
+    reader_options = {"use_cache": not args.no_cache, "chunked": args.chunked, "stream": args.stream,
+                      "refresh_images": args.refresh_images}
+
+    if args.worker:
+        stats = await run_worker(JobQueue(args.queue_db), args.concurrency, exit_when_idle=args.exit_when_idle)
+        print(f"[INFO] Worker finished: {stats['succeeded']} succeeded, {stats['failed']} failed, {stats['retried']} retried")
+        return 1 if stats["failed"] and not stats["succeeded"] else 0
+
+    if not (args.batch or args.bulk):
+        await run_paper_reader(**reader_options)
+        return 0
+
+    papers = find_unprocessed_papers(args.papers_dir)
+    if not papers and not (args.bulk and BULK_STATE.exists()):
+        print(f"[INFO] No unprocessed PDF files in {args.papers_dir}")
+        return 0
+
+    if args.bulk:
+        if args.chunked or args.stream:
+            print("[WARN] --bulk ignores --chunked and --stream")
+        print(f"[INFO] Bulk mode (Message Batches): {len(papers)} paper(s), render concurrency={args.concurrency}")
+        results = await run_bulk(papers, args.concurrency, use_cache=not args.no_cache,
+                                 refresh_images=args.refresh_images)
+    else:
+        print(f"[INFO] Batch mode: {len(papers)} paper(s), concurrency={args.concurrency}")
+        results = await run_batch(papers, args.concurrency, **reader_options)
+
+    print(f"[INFO] Batch finished: {len(results['succeeded'])} succeeded, {len(results['failed'])} failed")
+    for paper in results["failed"]:
+        print(f"       - FAILED: {paper}")
+
+    # 只有全部失败才返回非零，保证成功的结果仍能被后续步骤提交
+    return 1 if results["failed"] and not results["succeeded"] else 0
+
+
 # ============================================================
 # 入口点
 # ============================================================
@@ -801,4 +1822,10 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
 
-    anyio.run(run_paper_reader)
+    cli_args = parse_args()
+    try:
+        exit_code = anyio.run(main, cli_args)
+    except PaperReaderError as e:
+        print(f"[ERROR] {e}")
+        exit_code = 1
+    sys.exit(exit_code)
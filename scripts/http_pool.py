@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 连接池
+整条流水线（Claude、Gemini、DashScope、图片下载）共用一个 httpx.AsyncClient，
+复用 TLS 握手和 keep-alive 连接；客户端的生命周期由流水线入口管理。
+
+环境变量:
+  - HTTP_MAX_CONNECTIONS: 连接池最大连接数（默认 20）
+  - HTTP_MAX_KEEPALIVE: 最大空闲 keep-alive 连接数（默认 10）
+  - HTTP2: 是否启用 HTTP/2（默认 1，需要安装 h2: pip install "httpx[http2]"）
+  - HTTP_TIMEOUT_<ENDPOINT>: 各端点的读超时（秒），如 HTTP_TIMEOUT_CLAUDE=300
+"""
+
+import os
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "10"))
+HTTP2_ENABLED = os.environ.get("HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+
+def _endpoint_timeout(name: str, read: float) -> httpx.Timeout:
+    read = float(os.environ.get(f"HTTP_TIMEOUT_{name.upper()}", read))
+    return httpx.Timeout(read, connect=10.0)
+
+
+# 各端点超时：LLM 和图片生成是长请求，任务轮询是短请求
+ENDPOINT_TIMEOUTS = {
+    "claude": _endpoint_timeout("claude", 180),
+    "gemini": _endpoint_timeout("gemini", 180),
+    "dashscope": _endpoint_timeout("dashscope", 30),
+    "download": _endpoint_timeout("download", 60),
+}
+
+_shared_client: httpx.AsyncClient | None = None
+
+
+def create_client() -> httpx.AsyncClient:
+    """创建带连接池的客户端（默认超时按最长的端点设置，单个请求可再覆盖）"""
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=ENDPOINT_TIMEOUTS["claude"],
+    )
+
+
+@asynccontextmanager
+async def http_client_lifespan() -> AsyncIterator[httpx.AsyncClient]:
+    """在流水线运行期间打开共享客户端，退出时关闭连接池"""
+    global _shared_client
+    if _shared_client is not None:
+        yield _shared_client
+        return
+
+    async with create_client() as client:
+        _shared_client = client
+        try:
+            yield client
+        finally:
+            _shared_client = None
+
+
+@asynccontextmanager
+async def http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """获取 HTTP 客户端：在 http_client_lifespan 内返回共享客户端，否则临时创建一个"""
+    if _shared_client is not None:
+        yield _shared_client
+        return
+
+    async with create_client() as client:
+        yield client
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配图服务路由：对冲请求（hedged requests）
+每张配图先发给主服务；主服务失败，或超过它历史耗时的 p90 仍未返回时，再向备用服务发出同一张图的请求，
+取最先成功的结果并取消另一个请求。主服务按各服务最近的耗时和成功率选择（预计拿到一张图的时间最短者），
+没有历史数据时按配置的顺序（Gemini 优先）。
+相比"所有 Gemini 请求都失败后再整体切换到 DashScope"，一个服务故障或变慢时，
+每张图最多多等一个 p90，而不是一个完整的超时。
+
+环境变量:
+  - IMAGE_HEDGE_DELAY: 主服务样本不足时，发出对冲请求前等待的秒数（默认 30）
+  - IMAGE_HEDGE_MIN_SAMPLES: 使用 p90 作为对冲等待时间所需的最少成功样本数（默认 5）
+"""
+
+import os
+import statistics
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import anyio
+
+
+IMAGE_HEDGE_DELAY = float(os.environ.get("IMAGE_HEDGE_DELAY", "30"))
+IMAGE_HEDGE_MIN_SAMPLES = int(os.environ.get("IMAGE_HEDGE_MIN_SAMPLES", "5"))
+# 对冲等待时间的下限（避免 p90 很小时几乎每张图都发两份请求）
+IMAGE_HEDGE_MIN_DELAY = 1.0
+
+
+@dataclass
+class ProviderStats:
+    """单个服务最近的耗时（仅成功请求）和结果（被取消的请求不计入）"""
+    latencies: deque = field(default_factory=lambda: deque(maxlen=50))
+    outcomes: deque = field(default_factory=lambda: deque(maxlen=50))
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(elapsed)
+
+    @property
+    def success_rate(self) -> float:
+        """平滑后的成功率（没有样本时为 0.5，单次失败不会让服务彻底失去主服务资格）"""
+        return (sum(self.outcomes) + 1) / (len(self.outcomes) + 2)
+
+    def percentile(self, q: float, default: float) -> float:
+        if len(self.latencies) < IMAGE_HEDGE_MIN_SAMPLES:
+            return default
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def expected_seconds(self, default: float) -> float:
+        """预计拿到一张成功配图的时间：中位耗时 / 成功率"""
+        median = statistics.median(self.latencies) if self.latencies else default
+        return median / self.success_rate
+
+
+@dataclass
+class HedgeResult:
+    provider: str | None       # 胜出的服务（全部失败时为 None）
+    data: bytes | None
+    attempted: list[str]       # 实际发出请求的服务（按发出顺序）
+
+
+class ImageRouter:
+    """按服务统计选择主服务，并在主服务过慢或失败时发出对冲请求"""
+
+    def __init__(self, hedge_delay: float = IMAGE_HEDGE_DELAY):
+        self.hedge_delay_default = hedge_delay
+        self.stats: dict[str, ProviderStats] = {}
+
+    def _stats(self, provider: str) -> ProviderStats:
+        return self.stats.setdefault(provider, ProviderStats())
+
+    def order(self, providers: list[str]) -> list[str]:
+        """按预计耗时排序（稳定排序：数据相同时保持配置顺序）"""
+        return sorted(providers, key=lambda p: self._stats(p).expected_seconds(self.hedge_delay_default))
+
+    def hedge_delay(self, provider: str) -> float:
+        """主服务超过该时间仍未返回时发出对冲请求：历史成功耗时的 p90"""
+        return max(IMAGE_HEDGE_MIN_DELAY, self._stats(provider).percentile(0.9, self.hedge_delay_default))
+
+    async def race(
+        self,
+        attempts: list[tuple[str, Callable[[], Awaitable[bytes | None]]]],
+        label: str = "image",
+    ) -> HedgeResult:
+        """按顺序发出请求：前一个失败或超过其 p90 时发出下一个；返回最先成功的结果，其余请求被取消
+
+        attempts 为 (服务名, 无参协程函数) 列表，协程返回图片内容，失败时返回 None 或抛出异常。
+        """
+        result = HedgeResult(None, None, [])
+        finished: set[str] = set()
+
+        async def attempt_one(provider: str, attempt: Callable[[], Awaitable[bytes | None]],
+                              done: anyio.Event) -> None:
+            started = anyio.current_time()
+            try:
+                data = await attempt()
+            except Exception as e:
+                print(f"[WARN] {label}: {provider} failed: {e}")
+                data = None
+            # 被取消（另一服务已胜出）时不会执行到这里，不计入统计
+            self._stats(provider).record(bool(data), anyio.current_time() - started)
+            finished.add(provider)
+            if data and result.provider is None:
+                result.provider, result.data = provider, data
+                tg.cancel_scope.cancel()
+            done.set()
+
+        async with anyio.create_task_group() as tg:
+            for index, (provider, attempt) in enumerate(attempts):
+                done = anyio.Event()
+                result.attempted.append(provider)
+                tg.start_soon(attempt_one, provider, attempt, done)
+                if index == len(attempts) - 1:
+                    break
+                delay = self.hedge_delay(provider)
+                with anyio.move_on_after(delay):
+                    await done.wait()
+                next_provider = attempts[index + 1][0]
+                if done.is_set():
+                    print(f"[INFO] {label}: {provider} failed, trying {next_provider}")
+                else:
+                    print(f"[INFO] {label}: {provider} slower than {delay:.1f}s, hedging with {next_provider}")
+
+        cancelled = [p for p in result.attempted if p not in finished]
+        if result.provider and cancelled:
+            print(f"[INFO] {label}: {result.provider} won, cancelled {', '.join(cancelled)}")
+        return result
+
+
+# 进程内共享：批量模式下所有论文的配图共用同一份统计
+image_router = ImageRouter()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于 SQLite 的本地论文任务队列
+  - enqueue: 加入一篇论文（同一路径已在排队或处理中时不重复加入）
+  - claim: worker 原子地领取最早可执行的任务（BEGIN IMMEDIATE 保证多进程下不会重复领取）
+  - complete / fail: 记录结果、各阶段耗时；临时性失败按指数退避重新排队，超过最大次数后标记失败
+  - requeue_stale: worker 崩溃后遗留的 running 任务超时后重新排队
+每次操作使用独立的连接，可以在 anyio.to_thread 中调用。
+
+环境变量:
+  - JOB_QUEUE_DB: 队列数据库路径（默认 outputs/jobs.sqlite3）
+  - JOB_MAX_ATTEMPTS: 每个任务的最大尝试次数（默认 3）
+  - JOB_RETRY_BASE_SECONDS: 重试退避的基数（默认 30 秒，第 n 次重试等待 base * 2^(n-1)）
+  - JOB_STALE_SECONDS: running 任务超过该时间未完成视为 worker 已崩溃（默认 3600 秒）
+"""
+
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+JOB_QUEUE_DB = Path(os.environ.get("JOB_QUEUE_DB", "outputs/jobs.sqlite3"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "3600"))
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    paper_path TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL,
+    last_error TEXT,
+    result_path TEXT,
+    timings TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_available ON jobs (status, available_at);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    paper_path: str
+    options: dict
+    attempts: int
+    max_attempts: int
+
+
+class JobQueue:
+    """SQLite 任务队列（可被多个 worker 进程共享）"""
+
+    def __init__(self, db_path: Path = JOB_QUEUE_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # isolation_level=None：由 BEGIN IMMEDIATE 显式控制事务
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, paper_path: str | Path, options: dict | None = None,
+                max_attempts: int = JOB_MAX_ATTEMPTS) -> int | None:
+        """加入任务，返回任务 ID；同一论文已在排队或处理中时返回 None"""
+        paper_path = str(Path(paper_path).absolute())
+        now = time.time()
+        with self._transaction() as conn:
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE paper_path = ? AND status IN ('queued', 'running')",
+                (paper_path,),
+            ).fetchone()
+            if existing:
+                return None
+            cursor = conn.execute(
+                "INSERT INTO jobs (paper_path, options, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (paper_path, json.dumps(options or {}), max_attempts, now, now, now),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str) -> Job | None:
+        """领取最早可执行的任务并标记为 running；没有可执行任务时返回 None"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ?"
+                " ORDER BY available_at, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, claimed_by = ?,"
+                " claimed_at = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now, now, row["id"]),
+            )
+        return Job(row["id"], row["paper_path"], json.loads(row["options"]), row["attempts"] + 1, row["max_attempts"])
+
+    def complete(self, job_id: int, result_path: str, timings: dict | None = None) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result_path = ?, timings = ?, last_error = NULL,"
+                " updated_at = ? WHERE id = ?",
+                (result_path, json.dumps(timings or {}), time.time(), job_id),
+            )
+
+    def fail(self, job_id: int, error: str, transient: bool, timings: dict | None = None) -> str:
+        """记录失败；临时性失败且未超过最大次数时退避后重新排队。返回任务的新状态"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if transient and row["attempts"] < row["max_attempts"]:
+                status = "queued"
+                available_at = now + JOB_RETRY_BASE_SECONDS * 2 ** (row["attempts"] - 1)
+            else:
+                status, available_at = "failed", now
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, last_error = ?, timings = ?,"
+                " claimed_by = NULL, updated_at = ? WHERE id = ?",
+                (status, available_at, error, json.dumps(timings or {}), now, job_id),
+            )
+        return status
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+        """把超时未完成的 running 任务重新排队（worker 崩溃或被杀掉），返回重新排队的数量"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,"
+                " available_at = ?, last_error = 'worker did not finish', claimed_by = NULL, updated_at = ?"
+                " WHERE status = 'running' AND claimed_at < ?",
+                (now, now, now - stale_seconds),
+            )
+            return cursor.rowcount
+
+    def next_available_in(self) -> float | None:
+        """距离最早的排队任务可执行还有多少秒；没有排队任务时返回 None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MIN(available_at) AS t FROM jobs WHERE status = 'queued'").fetchone()
+        return None if row["t"] is None else max(0.0, row["t"] - time.time())
+
+    def counts(self) -> dict[str, int]:
+        """各状态的任务数"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def recent(self, limit: int = 20) -> list[dict]:
+        """最近更新的任务（用于查看状态）"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
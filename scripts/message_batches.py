@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Anthropic Message Batches API 客户端（积压论文的批量模式）
+把多篇论文的 /v1/messages 请求一次提交为一个 Message Batch，由服务端异步处理：
+  - 按批量价格计费（约为同步调用的一半），不受单个请求 180 秒超时的限制
+  - 通常 1 小时内完成，最长 24 小时；未完成的请求以 expired 结束
+  - 提交后把 batch ID 和论文对应关系写入状态文件，运行中断后下次启动继续轮询同一个批次，不重复提交
+
+环境变量:
+  - BULK_POLL_INTERVAL: 查询批次状态的间隔（默认 30 秒）
+  - BULK_MAX_REQUESTS: 每个批次最多包含的论文数（默认 500；单个批次上限 100000 个请求 / 256 MB）
+"""
+
+import os
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import anyio
+import httpx
+
+from http_pool import ENDPOINT_TIMEOUTS, http_client
+from paper_cache import write_text_atomic
+
+
+BULK_POLL_INTERVAL = float(os.environ.get("BULK_POLL_INTERVAL", "30"))
+BULK_MAX_REQUESTS = int(os.environ.get("BULK_MAX_REQUESTS", "500"))
+
+# 结果类型：succeeded / errored / canceled / expired
+SUCCEEDED = "succeeded"
+
+
+@dataclass
+class PendingBatch:
+    """已提交、尚未取回结果的批次（custom_id -> 论文路径）"""
+    id: str
+    papers: dict[str, str]
+    submitted_at: str = ""
+
+    def save(self, state_file: Path) -> None:
+        state_file.parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(state_file, json.dumps(self.__dict__, ensure_ascii=False, indent=2))
+
+    @classmethod
+    def load(cls, state_file: Path) -> "PendingBatch | None":
+        try:
+            return cls(**json.loads(state_file.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+class MessageBatchClient:
+    """/v1/messages/batches 的提交、轮询和结果下载"""
+
+    def __init__(self, base_url: str, api_key: str, poll_interval: float = BULK_POLL_INTERVAL):
+        base_url = base_url.rstrip("/")
+        if base_url.endswith("/v1/messages"):
+            base_url = base_url[: -len("/v1/messages")]
+        self.batches_url = f"{base_url}/v1/messages/batches"
+        self.api_key = api_key
+        self.poll_interval = poll_interval
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+        }
+
+    async def submit(self, requests: list[dict]) -> dict:
+        """提交批次（requests 为 {"custom_id", "params"} 列表），返回批次对象"""
+        async with http_client() as client:
+            response = await client.post(
+                self.batches_url, headers=self.headers, json={"requests": requests},
+                timeout=ENDPOINT_TIMEOUTS["claude"],
+            )
+            response.raise_for_status()
+            return response.json()
+
+    async def retrieve(self, batch_id: str) -> dict:
+        async with http_client() as client:
+            response = await client.get(
+                f"{self.batches_url}/{batch_id}", headers=self.headers, timeout=ENDPOINT_TIMEOUTS["dashscope"],
+            )
+            response.raise_for_status()
+            return response.json()
+
+    async def wait(self, batch_id: str) -> dict:
+        """轮询直到批次结束（processing_status == "ended"），返回最终的批次对象
+
+        查询失败（网络错误、5xx）只打印警告并继续轮询：批次在服务端照常处理；4xx（如批次不存在）直接抛出。
+        """
+        last_counts = None
+        while True:
+            try:
+                batch = await self.retrieve(batch_id)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500:
+                    raise
+                print(f"[WARN] [bulk] Could not query batch {batch_id}: {e}")
+            except httpx.HTTPError as e:
+                print(f"[WARN] [bulk] Could not query batch {batch_id}: {e}")
+            else:
+                counts = batch.get("request_counts", {})
+                if counts != last_counts:
+                    print(f"[INFO] [bulk] Batch {batch_id} {batch.get('processing_status')}: "
+                          + ", ".join(f"{k}={v}" for k, v in counts.items()))
+                    last_counts = counts
+                if batch.get("processing_status") == "ended":
+                    return batch
+            await anyio.sleep(self.poll_interval)
+
+    async def results(self, batch: dict) -> dict[str, dict]:
+        """下载已结束批次的结果（JSONL），返回 custom_id -> result"""
+        results_url = batch.get("results_url") or f"{self.batches_url}/{batch['id']}/results"
+        results: dict[str, dict] = {}
+        async with http_client() as client:
+            async with client.stream(
+                "GET", results_url, headers=self.headers, timeout=ENDPOINT_TIMEOUTS["claude"],
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        entry = json.loads(line)
+                        results[entry["custom_id"]] = entry["result"]
+        return results
+
+
+def message_text(message: dict) -> str:
+    """从 message 对象中取出文本内容"""
+    return "".join(block.get("text", "") for block in message.get("content", []) if block.get("type") == "text")
+
+
+def result_error(result: dict) -> str:
+    """非 succeeded 结果的说明文字"""
+    error = result.get("error") or {}
+    # errored 结果的 error 是一个 API 错误响应：{"type": "error", "error": {"type", "message"}}
+    error = error.get("error", error)
+    detail = error.get("message") or error.get("type") or ""
+    return f"{result.get('type', 'unknown')}{': ' + detail if detail else ''}"
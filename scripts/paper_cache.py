@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的磁盘缓存
+键为若干输入（PDF 内容、提示词、模型等）的 SHA-256，值为任意字节
+按总大小和存活时间淘汰，最近访问时间用文件 mtime 记录（近似 LRU）
+另提供原子写入（write_bytes_atomic / write_text_atomic）和进程间文件锁（file_lock）
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 flock，退化为不加锁
+    fcntl = None
+
+
+def cache_key(*parts: bytes | str | int) -> str:
+    """计算缓存键：各部分带长度前缀拼接后取 SHA-256，避免拼接歧义"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, int):
+            part = str(part)
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def write_bytes_atomic(path: Path, data: bytes) -> None:
+    """先写同目录下的临时文件再 rename：读者不会读到写了一半的文件，失败时不留下临时文件"""
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    write_bytes_atomic(path, text.encode("utf-8"))
+
+
+@contextmanager
+def file_lock(lock_file: Path) -> Iterator[None]:
+    """进程间互斥：对旁路锁文件加 flock 排他锁（阻塞等待），退出时释放
+
+    只用于很短的读-改-写；同一进程内不可嵌套获取同一把锁。
+    """
+    lock_file = Path(lock_file)
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_file, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class DiskCache:
+    """目录形式的键值缓存（单进程内多协程安全，写入使用临时文件 + rename）"""
+
+    def __init__(self, root: Path, suffix: str = "", max_bytes: int = 0, max_age_days: float = 0):
+        self.root = Path(root)
+        self.suffix = suffix
+        self.max_bytes = max_bytes          # 0 表示不限制大小
+        self.max_age = max_age_days * 86400  # 0 表示不限制时间
+
+    def path_for(self, key: str) -> Path:
+        # 两级目录，避免单个目录下文件过多
+        return self.root / key[:2] / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> bytes | None:
+        path = self.path_for(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        if self.max_age and time.time() - stat.st_mtime > self.max_age:
+            path.unlink(missing_ok=True)
+            return None
+
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        # 更新 mtime 作为最近访问时间
+        os.utime(path)
+        return data
+
+    def put(self, key: str, data: bytes) -> Path:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_bytes_atomic(path, data)
+        self.evict()
+        return path
+
+    def entries(self) -> list[tuple[Path, os.stat_result]]:
+        if not self.root.is_dir():
+            return []
+        return [
+            (p, p.stat()) for p in self.root.glob(f"*/*{self.suffix}")
+            if not p.name.startswith(".tmp-")
+        ]
+
+    def evict(self) -> int:
+        """删除过期条目，并按最近访问时间淘汰到 max_bytes 以内，返回删除的条目数"""
+        entries = self.entries()
+        now = time.time()
+        removed = 0
+
+        if self.max_age:
+            alive = []
+            for path, stat in entries:
+                if now - stat.st_mtime > self.max_age:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+                else:
+                    alive.append((path, stat))
+            entries = alive
+
+        if self.max_bytes:
+            total = sum(stat.st_size for _, stat in entries)
+            for path, stat in sorted(entries, key=lambda e: e[1].st_mtime):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= stat.st_size
+                removed += 1
+
+        return removed
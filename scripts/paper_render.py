@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown -> HTML 渲染
+  - markdown_to_html: 每个线程复用一个 markdown.Markdown 实例，文档之间 reset，不再为每篇文档重新加载扩展
+  - PageTemplate / render_page: 样式表只保存一份，页面骨架预先拼好（样式使用 Noto Sans CJK SC 支持中文）
+  - IncrementalRenderer: 消费流式生成的 Markdown，每写完一个 `##` 章节就转换成 HTML 片段，
+    并立即刷新预览 HTML 文件；最后只需渲染剩余的尾部，再生成 PDF
+"""
+
+import re
+import html
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+
+from paper_cache import write_text_atomic
+
+
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.extra',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.toc',
+    'markdown.extensions.tables',
+    'markdown.extensions.fenced_code'
+]
+
+_SECTION_HEADING_RE = re.compile(r"^##\s")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+_local = threading.local()
+
+
+def get_markdown() -> "markdown.Markdown":
+    """当前线程复用的 Markdown 转换器（扩展只在第一次使用时加载；实例非线程安全，所以每个线程一个）"""
+    converter = getattr(_local, "markdown", None)
+    if converter is None:
+        import markdown
+
+        converter = _local.markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return converter
+
+
+def markdown_to_html(md_content: str) -> str:
+    """把 Markdown 转换为 HTML 片段（复用转换器，转换后 reset 清掉 toc、脚注等文档级状态）"""
+    converter = get_markdown()
+    try:
+        return converter.convert(md_content)
+    finally:
+        converter.reset()
+
+
+class PageTemplate:
+    """HTML 页面模板：样式表和页面骨架在创建时拼接一次，渲染时只拼接标题和正文"""
+
+    def __init__(self, stylesheet: str, footer: str = "", container: bool = True):
+        self.stylesheet = stylesheet
+        self._head = (
+            '<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n'
+            '    <meta charset="UTF-8">\n'
+            '    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+            '    <title>'
+        )
+        self._style = f"</title>\n    <style>\n{stylesheet}    </style>\n</head>\n<body>\n"
+        self._tail = "\n"
+        if container:
+            self._style += '<div class="container">\n'
+        if footer:
+            self._tail += f"<footer>\n{footer}</footer>\n"
+        if container:
+            self._tail += "</div>\n"
+        self._tail += "</body>\n</html>"
+
+    def render(self, body_html: str, title: str = "论文解读") -> str:
+        return "".join((self._head, html.escape(title, quote=False), self._style, body_html, self._tail))
+
+
+# 解读页面样式 (使用 Noto Sans CJK SC 支持中文)
+PAGE_STYLESHEET = """        @font-face {
+            font-family: 'Noto Sans CJK SC';
+            src: local('Noto Sans CJK SC'), local('NotoSansCJK-Regular');
+        }
+        body {
+            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
+            line-height: 1.8;
+            max-width: 900px;
+            margin: 0 auto;
+            padding: 40px 20px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: #333;
+        }
+        .container {
+            background-color: white;
+            padding: 50px;
+            border-radius: 10px;
+            box-shadow: 0 10px 40px rgba(0,0,0,0.1);
+        }
+        h1 {
+            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
+            color: #1a237e;
+            border-bottom: 3px solid #3f51b5;
+            padding-bottom: 10px;
+            margin-top: 40px;
+            font-size: 2em;
+        }
+        h2 {
+            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
+            color: #283593;
+            border-left: 4px solid #3f51b5;
+            padding-left: 15px;
+            margin-top: 35px;
+            font-size: 1.5em;
+        }
+        h3 {
+            font-family: 'Noto Sans CJK SC', 'Noto Sans SC', 'Microsoft YaHei', 'SimHei', sans-serif;
+            color: #3949ab;
+            margin-top: 25px;
+            font-size: 1.2em;
+        }
+        p {
+            text-align: justify;
+            margin: 15px 0;
+        }
+        code {
+            background-color: #f4f4f4;
+            padding: 2px 6px;
+            border-radius: 3px;
+            font-family: Consolas, Monaco, monospace;
+            font-size: 0.9em;
+            color: #e91e63;
+        }
+        pre {
+            background-color: #2b2b2b;
+            color: #f8f8f2;
+            padding: 15px;
+            border-radius: 5px;
+            overflow-x: auto;
+        }
+        pre code {
+            background-color: transparent;
+            color: inherit;
+            padding: 0;
+        }
+        blockquote {
+            border-left: 4px solid #ffb74d;
+            padding-left: 15px;
+            margin: 20px 0;
+            color: #666;
+            font-style: italic;
+            background-color: #fff8e1;
+            padding: 15px;
+            border-radius: 5px;
+        }
+        table {
+            border-collapse: collapse;
+            width: 100%;
+            margin: 20px 0;
+        }
+        th, td {
+            border: 1px solid #ddd;
+            padding: 12px;
+            text-align: left;
+        }
+        th {
+            background-color: #3f51b5;
+            color: white;
+        }
+        tr:nth-child(even) {
+            background-color: #f9f9f9;
+        }
+        img {
+            max-width: 100%;
+            height: auto;
+            display: block;
+            margin: 20px auto;
+            border-radius: 8px;
+            box-shadow: 0 4px 12px rgba(0,0,0,0.1);
+        }
+        hr {
+            border: none;
+            border-top: 2px solid #e0e0e0;
+            margin: 30px 0;
+        }
+        strong {
+            color: #d32f2f;
+        }
+        footer {
+            margin-top: 60px;
+            padding-top: 20px;
+            border-top: 1px solid #ddd;
+            text-align: center;
+            color: #999;
+            font-size: 0.9em;
+        }
+        @media print {
+            body {
+                background: white;
+            }
+        }
+"""
+
+PAGE_TEMPLATE = PageTemplate(
+    PAGE_STYLESHEET,
+    footer="    <p>本解读由 GitHub Actions + Claude Agent SDK + 通义万相 自动生成</p>\n",
+)
+
+
+def render_page(body_html: str, title: str = "论文解读") -> str:
+    """把 HTML 正文套进解读页面模板"""
+    return PAGE_TEMPLATE.render(body_html, title)
+
+
+@dataclass
+class PaperDocument:
+    """渲染好的解读文档：HTML 和 PDF 都由它直接生成，不再经过写文件再读回
+
+    图片在正文里用相对路径引用，base_dir 提供解析它们的基准目录；
+    PDF 样式由页面样式表中的 @media print 规则和 pdf_renderer 的页面样式给出。
+    """
+    title: str
+    body_html: str
+    base_dir: Path
+    images: list[Path] = field(default_factory=list)
+
+    @cached_property
+    def html(self) -> str:
+        return render_page(self.body_html, self.title)
+
+    @property
+    def base_url(self) -> str:
+        return self.base_dir.absolute().as_uri() + "/"
+
+
+class IncrementalRenderer:
+    """按 `##` 章节增量渲染流式 Markdown
+
+    feed() 接收文本增量；每当出现新的 `##` 标题（不在代码块内），之前已完整的章节就被
+    转换为 HTML 片段，并重写预览文件，生成过程中即可在浏览器里查看已完成的章节。
+    finish() 只渲染尚未转换的部分并写出最终 HTML。
+    """
+
+    def __init__(self, html_file: Path, title: str = "论文解读"):
+        self.html_file = Path(html_file)
+        self.title = title
+        self.fragments: list[str] = []
+        self.rendered_markdown = ""   # 已转换为 HTML 片段的 Markdown
+        self._pending = ""            # 当前尚未完成的章节
+        self._line_buffer = ""        # 尚未遇到换行的半行
+        self._in_fence = False
+
+    @property
+    def markdown(self) -> str:
+        """到目前为止收到的全部 Markdown"""
+        return self.rendered_markdown + self._pending + self._line_buffer
+
+    def feed(self, text: str) -> None:
+        self._line_buffer += text
+        *lines, self._line_buffer = self._line_buffer.split("\n")
+        flushed = False
+        for line in lines:
+            if _FENCE_RE.match(line):
+                self._in_fence = not self._in_fence
+            elif not self._in_fence and _SECTION_HEADING_RE.match(line) and self._pending.strip():
+                self._flush_section()
+                flushed = True
+            self._pending += line + "\n"
+        if flushed:
+            self.write_preview()
+
+    def _flush_section(self) -> None:
+        self.fragments.append(markdown_to_html(self._pending))
+        self.rendered_markdown += self._pending
+        self._pending = ""
+
+    def write_preview(self) -> None:
+        write_text_atomic(self.html_file, render_page("\n".join(self.fragments), self.title))
+
+    def finish(self, full_markdown: str) -> PaperDocument:
+        """写出并返回完整文档：full_markdown 以已渲染部分开头时只渲染剩余部分，否则整篇重新渲染
+
+        最终文档在正文后追加配图和元数据；流式续写或中断标记也可能改写正文尾部，
+        所以以最终 Markdown 为准。
+        """
+        if full_markdown.startswith(self.rendered_markdown):
+            rest = full_markdown[len(self.rendered_markdown):]
+        else:
+            self.fragments, self.rendered_markdown, rest = [], "", full_markdown
+        self._pending, self._line_buffer, self._in_fence = rest, "", False
+        if self._pending.strip():
+            self._flush_section()
+        document = PaperDocument(self.title, "\n".join(self.fragments), self.html_file.parent)
+        write_text_atomic(self.html_file, document.html)
+        print(f"[INFO] HTML file generated: {self.html_file} ({len(self.fragments)} section(s))")
+        return document
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+论文章节识别与按优先级截断
+
+识别提取文本中的 Abstract / Introduction / Method / Results / Conclusion / References 等一级章节，
+超出预算时先去掉页眉页脚等样板文字，再按优先级丢弃章节（参考文献、附录最先被丢弃），
+保留的章节按原文顺序拼接，截断点落在句子边界上。
+分块（map-reduce）模式下则按章节把全文切成若干块，不丢弃内容。
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable
+
+
+# 章节类型 -> 优先级（数字越小越重要，越晚被丢弃）
+SECTION_PRIORITY = {
+    "front": 0,          # 标题、作者（第一个章节标题之前的内容）
+    "abstract": 0,
+    "conclusion": 1,
+    "introduction": 2,
+    "results": 3,
+    "method": 4,
+    "other": 5,
+    "related": 6,
+    "appendix": 7,
+    "acknowledgments": 8,
+    "references": 9,
+}
+
+# 章节标题关键词 -> 章节类型（按顺序匹配）
+SECTION_KEYWORDS = [
+    ("abstract", r"abstract|摘\s*要"),
+    ("introduction", r"introduction|引\s*言|绪\s*论|前\s*言"),
+    ("related", r"related\s+work|background|literature\s+review|相关工作|研究背景"),
+    ("method", r"method|approach|model|architecture|framework|design|方法|模型"),
+    ("results", r"result|experiment|evaluation|analysis|training|实验|结果|评估"),
+    ("conclusion", r"conclusion|discussion|summary|future\s+work|结论|总结|讨论"),
+    ("acknowledgments", r"acknowledg|致\s*谢"),
+    ("references", r"references|bibliography|参考文献"),
+    ("appendix", r"appendix|supplementary|附\s*录"),
+]
+
+# 一级章节标题：可选编号（"3"、"3."、"III."、"第三章"）+ 短标题；不匹配 "3.1" 这类子章节
+_HEADING_RE = re.compile(
+    r"^(?:(?:\d{1,2}\.?|[IVX]{1,5}\.|[A-H]\.?|第[一二三四五六七八九十\d]+[章节])\s+)?"
+    r"(?P<title>[A-Za-z一-鿿][\w一-鿿 ,:&\-]{1,60})$"
+)
+_PAGE_MARKER_RE = re.compile(r"^--- Page \d+ ---$")
+_SENTENCE_END_RE = re.compile(r"[.!?。！？](?=\s|$)")
+
+OMISSION_MARKER = "\n\n[... 已省略: {names} ...]\n\n"
+
+
+@dataclass
+class Section:
+    kind: str
+    title: str
+    text: str
+
+    @property
+    def priority(self) -> int:
+        return SECTION_PRIORITY[self.kind]
+
+
+def classify_heading(line: str) -> tuple[str, str] | None:
+    """判断一行是否为一级章节标题，返回 (章节类型, 标题)"""
+    stripped = line.strip()
+    match = _HEADING_RE.match(stripped)
+    if not match:
+        return None
+
+    title = match.group("title").strip()
+    numbered = stripped != title
+    # 带编号的标题要求首字母大写（或中文），排除 "3 layers of ..." 这类正文/表格行
+    if numbered and not (title[0].isupper() or not title[0].isascii()):
+        return None
+
+    for kind, pattern in SECTION_KEYWORDS:
+        # 未编号的标题必须整行就是关键词（如 "Abstract"、"References"），避免把正文短句当成标题
+        if numbered and re.match(rf"(?:{pattern})", title, re.IGNORECASE):
+            return kind, title
+        if not numbered and re.fullmatch(rf"(?:{pattern})s?", title, re.IGNORECASE):
+            return kind, title
+
+    # 带编号但不含关键词的一级标题（如 "4 Why Self-Attention"）
+    if numbered and len(title.split()) <= 8:
+        return "other", title
+    return None
+
+
+def split_sections(text: str) -> list[Section]:
+    """把论文文本切分为章节；第一个章节标题之前的内容归为 front"""
+    sections = [Section("front", "", "")]
+    lines: list[str] = []
+
+    for line in text.splitlines(keepends=True):
+        heading = classify_heading(line)
+        if heading:
+            sections[-1].text = "".join(lines)
+            sections.append(Section(heading[0], heading[1], ""))
+            lines = []
+        lines.append(line)
+    sections[-1].text = "".join(lines)
+
+    return [s for s in sections if s.text.strip()]
+
+
+def strip_boilerplate(text: str, min_pages: int = 3) -> str:
+    """去掉页眉页脚等样板文字：纯页码行，以及在多页首尾重复出现的行"""
+    pages = re.split(r"(?m)^--- Page \d+ ---$", text)
+    edge_counts: Counter[str] = Counter()
+    for page in pages:
+        page_lines = [l.strip() for l in page.splitlines() if l.strip()]
+        edge_counts.update(set(page_lines[:2] + page_lines[-2:]))
+
+    repeated = {line for line, count in edge_counts.items() if count >= min_pages}
+    kept = []
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if _PAGE_MARKER_RE.match(stripped):
+            kept.append(line)
+        elif stripped.isdigit() or stripped in repeated:
+            continue
+        else:
+            kept.append(line)
+    return "".join(kept)
+
+
+def truncate_at_sentence(text: str, limit: int) -> str:
+    """截取不超过 limit 个字符的前缀，尽量落在句子边界（其次是换行）上"""
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(head)]
+    if ends and ends[-1] >= limit // 2:
+        return head[: ends[-1]]
+    newline = head.rfind("\n")
+    if newline >= limit // 2:
+        return head[:newline]
+    return head
+
+
+def build_context(text: str, budget: int, measure: Callable[[str], int] = len) -> tuple[str, list[str]]:
+    """在预算内构建论文上下文，返回 (文本, 被省略的章节标题列表)
+
+    measure 为文本成本函数（默认字符数）；截断章节时按成本比例换算为字符数。
+    """
+    if measure(text) <= budget:
+        return text, []
+
+    text = strip_boilerplate(text)
+    if measure(text) <= budget:
+        return text, []
+
+    sections = split_sections(text)
+    # 预留省略标记的开销：每个章节最多一个标记，且每个标题只出现一次
+    all_names = ", ".join(s.title or s.kind for s in sections)
+    remaining = budget - measure(OMISSION_MARKER.format(names="")) * len(sections) - measure(all_names)
+    chosen: dict[int, str] = {}
+
+    for index in sorted(range(len(sections)), key=lambda i: (sections[i].priority, i)):
+        section = sections[index]
+        cost = measure(section.text)
+        if cost <= remaining:
+            chosen[index] = section.text
+            remaining -= cost
+        elif remaining > 0:
+            limit = len(section.text) * remaining // max(cost, 1)
+            partial = truncate_at_sentence(section.text, limit)
+            if partial.strip():
+                chosen[index] = partial
+                remaining -= measure(partial)
+
+    parts = []
+    omitted: list[str] = []
+    pending: list[str] = []
+    for index, section in enumerate(sections):
+        if index in chosen:
+            if pending:
+                parts.append(OMISSION_MARKER.format(names=", ".join(pending)))
+                pending = []
+            parts.append(chosen[index])
+        else:
+            name = section.title or section.kind
+            pending.append(name)
+            omitted.append(name)
+    if pending:
+        parts.append(OMISSION_MARKER.format(names=", ".join(pending)))
+
+    return "".join(parts), omitted
+
+
+def chunk_sections(text: str, budget: int, measure: Callable[[str], int] = len) -> list[str]:
+    """按章节把全文切成成本不超过 budget 的块（不丢弃任何内容）
+
+    measure 为文本成本函数（默认字符数）。相邻的小章节合并到同一块；超长章节在句子边界处再切分。
+    """
+    pieces: list[tuple[str, int]] = []
+    for section in split_sections(text):
+        rest = section.text
+        cost = measure(rest)
+        while cost > budget:
+            limit = max(1, len(rest) * budget // cost)
+            head = truncate_at_sentence(rest, limit)
+            pieces.append((head, measure(head)))
+            rest = rest[len(head):]
+            cost = measure(rest)
+        if rest:
+            pieces.append((rest, cost))
+
+    chunks: list[str] = []
+    current, current_cost = "", 0
+    for piece, cost in pieces:
+        if current and current_cost + cost > budget:
+            chunks.append(current)
+            current, current_cost = "", 0
+        current += piece
+        current_cost += cost
+    if current:
+        chunks.append(current)
+    return chunks
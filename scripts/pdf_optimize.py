@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 体积优化
+  - 配图在排版前按目标 DPI 降采样（A4 版心宽度 17cm），无透明通道的图片转为 JPEG，
+    有透明通道的保持 PNG 无损但重新压缩；原图不变，优化后的副本只用于 PDF
+  - 生成 PDF 后检查嵌入字体是否为子集（CJK 字体全量嵌入会让 PDF 多出十几 MB），
+    并报告图片优化前后和最终 PDF 的大小
+
+环境变量:
+  - PDF_IMAGE_DPI: 配图的目标分辨率（默认 150；0 表示不优化配图）
+  - PDF_JPEG_QUALITY: JPEG 质量（默认 82）
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+PDF_IMAGE_DPI = int(os.environ.get("PDF_IMAGE_DPI", "150"))
+PDF_JPEG_QUALITY = int(os.environ.get("PDF_JPEG_QUALITY", "82"))
+
+# A4 宽 21cm，左右页边距各 2cm（见 pdf_renderer.PDF_PAGE_CSS）
+CONTENT_WIDTH_INCHES = 17 / 2.54
+
+# 子集字体的 BaseFont 名带 6 个大写字母的前缀，如 "ABCDEF+NotoSansCJKsc-Regular"
+_SUBSET_PREFIX_RE = re.compile(r"^/?[A-Z]{6}\+")
+
+
+@dataclass
+class ImageOptimization:
+    source: Path
+    output: Path
+    bytes_before: int
+    bytes_after: int
+
+
+def optimize_image(
+    source: Path,
+    dest_dir: Path,
+    dpi: int = PDF_IMAGE_DPI,
+    jpeg_quality: int = PDF_JPEG_QUALITY,
+) -> ImageOptimization:
+    """生成用于 PDF 的优化副本；优化后反而更大时直接使用原图"""
+    from PIL import Image
+
+    max_width = int(CONTENT_WIDTH_INCHES * dpi)
+    with Image.open(source) as image:
+        image.load()
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if has_alpha:
+            output = dest_dir / f"{source.stem}.png"
+            image.save(output, "PNG", optimize=True)
+        else:
+            output = dest_dir / f"{source.stem}.jpg"
+            image.convert("RGB").save(output, "JPEG", quality=jpeg_quality, optimize=True, progressive=True)
+
+    before, after = source.stat().st_size, output.stat().st_size
+    if after >= before:
+        return ImageOptimization(source, source, before, before)
+    return ImageOptimization(source, output, before, after)
+
+
+def optimize_images(sources: list[Path], dest_dir: Path, dpi: int = PDF_IMAGE_DPI) -> dict[Path, ImageOptimization]:
+    """批量优化配图，返回 原图 -> 优化结果；dpi=0 或 Pillow 不可用时返回空字典（使用原图）"""
+    if dpi <= 0 or not sources:
+        return {}
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("[WARN] Pillow not available, embedding original images")
+        return {}
+
+    results = {}
+    for source in sources:
+        try:
+            results[source] = optimize_image(source, dest_dir, dpi)
+        except Exception as e:
+            print(f"[WARN] Image optimization failed for {source.name}: {e}")
+    return results
+
+
+@dataclass
+class PdfReport:
+    size: int
+    fonts: list[str] = field(default_factory=list)
+    full_fonts: list[str] = field(default_factory=list)   # 嵌入但未子集化的字体
+    image_bytes: int = 0
+
+
+def inspect_pdf(pdf_file: Path) -> PdfReport:
+    """统计 PDF 大小、嵌入字体（是否子集化）和图片流大小"""
+    from PyPDF2 import PdfReader
+
+    report = PdfReport(size=pdf_file.stat().st_size)
+    seen: set[int] = set()
+
+    def visit_font(font) -> None:
+        name = str(font.get("/BaseFont", ""))
+        descendants = font.get("/DescendantFonts")
+        descriptors = [font.get("/FontDescriptor")]
+        if descendants:
+            descriptors += [d.get_object().get("/FontDescriptor") for d in descendants]
+        embedded = any(
+            d is not None and any(k in d.get_object() for k in ("/FontFile", "/FontFile2", "/FontFile3"))
+            for d in descriptors
+        )
+        report.fonts.append(name)
+        if embedded and not _SUBSET_PREFIX_RE.match(name):
+            report.full_fonts.append(name)
+
+    for page in PdfReader(str(pdf_file)).pages:
+        resources = page.get("/Resources")
+        if resources is None:
+            continue
+        resources = resources.get_object()
+        fonts = resources.get("/Font")
+        for ref in (fonts.get_object() if fonts else {}).values():
+            font = ref.get_object()
+            if id(font) not in seen:
+                seen.add(id(font))
+                visit_font(font)
+        xobjects = resources.get("/XObject")
+        for ref in (xobjects.get_object() if xobjects else {}).values():
+            xobject = ref.get_object()
+            if xobject.get("/Subtype") == "/Image" and id(xobject) not in seen:
+                seen.add(id(xobject))
+                report.image_bytes += int(xobject.get("/Length", 0))
+
+    return report
+
+
+def report_pdf_size(pdf_file: Path, images: dict[Path, ImageOptimization]) -> PdfReport | None:
+    """打印优化前后的大小和字体子集化检查结果"""
+    try:
+        report = inspect_pdf(pdf_file)
+    except Exception as e:
+        print(f"[WARN] Could not inspect PDF: {e}")
+        return None
+
+    if images:
+        before = sum(item.bytes_before for item in images.values())
+        after = sum(item.bytes_after for item in images.values())
+        print(f"[INFO] PDF images: {before / 1024:.0f} KB -> {after / 1024:.0f} KB "
+              f"({len(images)} image(s), {PDF_IMAGE_DPI} DPI)")
+    print(f"[INFO] PDF size: {report.size / 1024:.0f} KB "
+          f"(image streams {report.image_bytes / 1024:.0f} KB, {len(report.fonts)} font(s))")
+    if report.full_fonts:
+        print(f"[WARN] Fonts embedded without subsetting: {', '.join(report.full_fonts)}")
+    return report
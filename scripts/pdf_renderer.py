@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可复用的 WeasyPrint PDF 渲染器
+FontConfiguration（fontconfig 初始化、CJK 字体扫描）和 PDF 页面样式表只在渲染器创建时加载一次，
+之后每篇文档只做 HTML 解析和排版。渲染放在常驻的 worker 进程里执行：
+  - 进程启动后立即预热（与 LLM 调用并行），第一篇文档不再承担冷启动开销
+  - 批量模式下所有论文共用同一个已预热的 worker
+  - 排版是 CPU 密集型工作，放在独立进程里不会占用事件循环所在进程的 GIL
+
+环境变量:
+  - PDF_RENDER_WORKERS: 渲染 worker 进程数（默认 1；0 表示在调用线程内渲染，仍复用预热的渲染器）
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "1"))
+
+# PDF 专用样式：A4 页面和中文字体
+PDF_PAGE_CSS = '''
+    @page {
+        size: A4;
+        margin: 2cm;
+    }
+    body {
+        font-family: "Noto Sans CJK SC", "Noto Sans SC", "SimHei", sans-serif;
+    }
+'''
+
+
+class PdfRenderer:
+    """持有预热的 FontConfiguration 和编译好的样式表，可连续渲染多篇文档（非线程安全）"""
+
+    def __init__(self, stylesheet: str = PDF_PAGE_CSS):
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        started = time.perf_counter()
+        self.font_config = FontConfiguration()
+        self.stylesheets = [CSS(string=stylesheet, font_config=self.font_config)]
+        self.documents = 0
+        self.startup_seconds = time.perf_counter() - started
+
+    def write_pdf(
+        self,
+        html: str,
+        pdf_file: Path,
+        base_url: str | None = None,
+        url_overrides: dict[str, str] | None = None,
+    ) -> float:
+        """把 HTML 字符串渲染为 PDF 文件，返回渲染耗时（秒）
+
+        相对路径按 base_url 解析；url_overrides 把解析后的 URL 替换为另一个 URL（如优化过的配图副本）。
+        """
+        from weasyprint import HTML, default_url_fetcher
+
+        def fetch(url: str, *args, **kwargs):
+            return default_url_fetcher((url_overrides or {}).get(url, url), *args, **kwargs)
+
+        started = time.perf_counter()
+        HTML(string=html, base_url=base_url, url_fetcher=fetch).write_pdf(
+            str(pdf_file),
+            stylesheets=self.stylesheets,
+            font_config=self.font_config,
+        )
+        self.documents += 1
+        return time.perf_counter() - started
+
+
+# 当前进程内的渲染器（worker 进程里由 _warm_up 创建；进程内渲染时按需创建）
+_renderer: PdfRenderer | None = None
+_renderer_lock = threading.Lock()
+_shared_pool: ProcessPoolExecutor | None = None
+
+
+def get_renderer() -> PdfRenderer:
+    global _renderer
+    if _renderer is None:
+        _renderer = PdfRenderer()
+    return _renderer
+
+
+def _warm_up() -> float:
+    """worker 进程启动后立即加载字体配置和样式表，返回预热耗时"""
+    return get_renderer().startup_seconds
+
+
+def _render(html: str, pdf_file: str, base_url: str | None, url_overrides: dict[str, str] | None) -> float:
+    with _renderer_lock:
+        return get_renderer().write_pdf(html, Path(pdf_file), base_url, url_overrides)
+
+
+@contextmanager
+def pdf_renderer_lifespan(workers: int = PDF_RENDER_WORKERS) -> Iterator[ProcessPoolExecutor | None]:
+    """在流水线运行期间保持渲染 worker 进程常驻（workers=0 时不启动进程，在调用线程内渲染）"""
+    global _shared_pool
+    if _shared_pool is not None or workers <= 0:
+        yield _shared_pool
+        return
+
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    # 立即提交预热任务：worker 在 LLM 调用期间完成字体加载
+    warm_ups: list[Future] = [pool.submit(_warm_up) for _ in range(workers)]
+    _shared_pool = pool
+    try:
+        yield pool
+    finally:
+        _shared_pool = None
+        for future in warm_ups:
+            future.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def render_pdf(
+    html: str,
+    pdf_file: Path,
+    base_url: str | None = None,
+    url_overrides: dict[str, str] | None = None,
+) -> float:
+    """渲染 PDF：在 pdf_renderer_lifespan 内交给常驻 worker，否则用当前进程的预热渲染器；返回渲染耗时"""
+    if _shared_pool is not None:
+        return _shared_pool.submit(_render, html, str(pdf_file), base_url, url_overrides).result()
+    return _render(html, str(pdf_file), base_url, url_overrides)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Anthropic 提示词缓存
+每篇论文的系统提示词完全相同，带上 cache_control 标记后，之后的请求直接读取缓存的前缀
+（缓存读取按约 1/10 的输入单价计费，且跳过这部分的预填充）。
+
+缓存要等第一个请求开始返回后才可用：批量运行时如果所有论文同时发出请求，每个请求都会各写一次缓存。
+PromptCacheGate 让同一前缀的第一个请求先发出，其余请求等它开始返回（或等待超时）后再发出；
+缓存仍有效（ephemeral 缓存 5 分钟，每次命中后刷新）时不再等待。
+
+前缀短于模型的最小可缓存长度（MODEL_MIN_CACHE_TOKENS）时 API 不会缓存它：这时不加 cache_control，
+也不经过 PromptCacheGate（否则只是白白推迟并发请求）。
+
+环境变量:
+  - PROMPT_CACHING: 是否给系统提示词加 cache_control（默认 1；代理不支持数组形式的 system 时设为 0）
+  - PROMPT_CACHE_WARMUP_SECONDS: 等待第一个请求写入缓存的最长时间（默认 5 秒）
+"""
+
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+import anyio
+
+
+PROMPT_CACHING = os.environ.get("PROMPT_CACHING", "1") != "0"
+PROMPT_CACHE_WARMUP_SECONDS = float(os.environ.get("PROMPT_CACHE_WARMUP_SECONDS", "5"))
+# ephemeral 缓存的存活时间（秒）
+PROMPT_CACHE_TTL = 300
+
+# 各模型可缓存前缀的最小长度（token）
+MODEL_MIN_CACHE_TOKENS = {
+    "claude-opus-4-5": 4096,
+    "claude-haiku-4-5": 4096,
+    "claude-3-5-haiku": 2048,
+    "claude-3-haiku": 2048,
+}
+DEFAULT_MIN_CACHE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model: str) -> int:
+    return next(
+        (value for prefix, value in MODEL_MIN_CACHE_TOKENS.items() if model.startswith(prefix)),
+        DEFAULT_MIN_CACHE_TOKENS,
+    )
+
+
+def is_cacheable_prefix(model: str, prefix_tokens: int) -> bool:
+    """开启缓存且前缀（估算 token 数）达到模型的最小可缓存长度"""
+    return PROMPT_CACHING and prefix_tokens >= min_cacheable_tokens(model)
+
+
+def system_blocks(system: str, cacheable: bool = True) -> str | list[dict]:
+    """请求体的 system 字段：可缓存时为带 cache_control 的文本块（缓存前缀 = 系统提示词）"""
+    if not (PROMPT_CACHING and cacheable):
+        return system
+    return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+
+class PromptCacheGate:
+    """按缓存前缀协调请求顺序：第一个请求写入缓存，其余请求随后发出以命中缓存"""
+
+    def __init__(self, warmup_seconds: float = PROMPT_CACHE_WARMUP_SECONDS, ttl: float = PROMPT_CACHE_TTL):
+        self.warmup_seconds = warmup_seconds
+        self.ttl = ttl
+        self._written: dict[str, float] = {}         # 前缀 -> 最近一次写入/命中的时间
+        self._pending: dict[str, anyio.Event] = {}   # 前缀 -> 正在写入缓存的请求
+
+    def is_warm(self, key: str) -> bool:
+        written = self._written.get(key)
+        return written is not None and time.monotonic() - written < self.ttl
+
+    def mark_ready(self, key: str) -> None:
+        """响应开始返回：缓存已写入（或已刷新），放行等待中的请求"""
+        self._written[key] = time.monotonic()
+        event = self._pending.get(key)
+        if event is not None:
+            event.set()
+
+    @asynccontextmanager
+    async def turn(self, key: str, cacheable: bool = True) -> AsyncIterator[Callable[[], None]]:
+        """轮到当前请求发出时进入；返回的回调在响应开始返回时调用
+
+        cacheable=False（前缀不会被缓存）时立即放行。
+        """
+        def ready() -> None:
+            self.mark_ready(key)
+
+        if not (PROMPT_CACHING and cacheable) or self.is_warm(key):
+            yield ready
+            return
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            with anyio.move_on_after(self.warmup_seconds):
+                await pending.wait()
+            yield ready
+            return
+
+        event = self._pending[key] = anyio.Event()
+        try:
+            yield ready
+        finally:
+            # 第一个请求失败时也放行其他请求（它们中的下一个会重新写入缓存）
+            self._pending.pop(key, None)
+            event.set()
+
+
+prompt_cache_gate = PromptCacheGate()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行报告：按阶段记录耗时和数据量
+每篇论文的处理过程记录为一组 span（extract、truncate、llm、image[i]、html、pdf 等），
+每个 span 带耗时、输入/输出字节数、token 数（含提示词缓存的读取/写入 token）和重试次数；流式调用另记录首字延迟（attrs["ttft"]）。
+  - 单次运行的报告写成 JSON，放在输出文件旁边（<output>.report.json）
+  - 所有运行的报告追加到 outputs/run-reports.jsonl，summarize_reports() 按阶段汇总
+
+span 通过 contextvars 传递：run_paper_reader 开始一个 RunReport 后，同一任务（以及它派生的子任务）
+里调用 span() 都会记录到这份报告；底层函数用 current_span() 补充 token 数、重试次数等信息。
+没有活动报告时 span() 仍可使用，只是记录被丢弃。
+"""
+
+import json
+import time
+import statistics
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from paper_cache import file_lock, write_text_atomic
+
+
+@dataclass
+class Span:
+    name: str
+    start: float = 0.0            # 相对运行开始的秒数
+    duration: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+    retries: int = 0
+    status: str = "ok"
+    attrs: dict = field(default_factory=dict)
+
+    @property
+    def stage(self) -> str:
+        """阶段名：image[2] -> image"""
+        return self.name.split("[", 1)[0]
+
+    def add_usage(self, usage: dict | None) -> None:
+        """累加 API 返回的 usage（多次调用、流式续写时累计）"""
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0) or 0
+            self.output_tokens += usage.get("output_tokens", 0) or 0
+            self.cache_read_tokens += usage.get("cache_read_input_tokens", 0) or 0
+            self.cache_creation_tokens += usage.get("cache_creation_input_tokens", 0) or 0
+
+    @property
+    def total_input_tokens(self) -> int:
+        """全部输入 token（未缓存 + 缓存读取 + 缓存写入）"""
+        return self.input_tokens + self.cache_read_tokens + self.cache_creation_tokens
+
+
+@dataclass
+class RunReport:
+    paper: str
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    status: str = "ok"
+    error: str = ""
+    duration: float = 0.0
+    spans: list[Span] = field(default_factory=list)
+    attrs: dict = field(default_factory=dict)
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def stage_durations(self) -> dict[str, float]:
+        """各阶段耗时（同名阶段累加，如所有 image[i] 合计为 image）"""
+        totals: dict[str, float] = {}
+        for span in self.spans:
+            totals[span.stage] = totals.get(span.stage, 0.0) + span.duration
+        return totals
+
+    def to_dict(self) -> dict:
+        data = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        data["stages"] = self.stage_durations()
+        return data
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.duration = time.perf_counter() - self._t0
+        if error is not None:
+            self.status, self.error = "error", f"{type(error).__name__}: {error}"
+
+    def write(self, report_file: Path | None, history_file: Path | None = None) -> None:
+        """写出单次运行报告（原子写入），并追加到历史记录（jsonl，多个 worker 进程同时追加时加文件锁）"""
+        data = self.to_dict()
+        if report_file is not None:
+            write_text_atomic(report_file, json.dumps(data, ensure_ascii=False, indent=2))
+        if history_file is not None:
+            with file_lock(history_file.with_name(history_file.name + ".lock")), \
+                    open(history_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+
+_current_report: ContextVar[RunReport | None] = ContextVar("current_report", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def run_report(paper: str) -> Iterator[RunReport]:
+    """为一次运行开始一份报告（在当前上下文中生效）"""
+    report = RunReport(paper)
+    token = _current_report.set(report)
+    try:
+        yield report
+    except BaseException as e:
+        report.finish(e)
+        raise
+    else:
+        report.finish()
+    finally:
+        _current_report.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """记录一个阶段；异常时标记为 error 并继续抛出"""
+    report = _current_report.get()
+    record = Span(name, attrs=attrs)
+    started = time.perf_counter()
+    if report is not None:
+        record.start = started - report._t0
+    token = _current_span.set(record)
+    try:
+        yield record
+    except BaseException as e:
+        record.status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        record.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        if report is not None:
+            report.spans.append(record)
+
+
+def current_span() -> Span:
+    """当前所在的 span（不在任何 span 内时返回一个不会被记录的临时 span）"""
+    return _current_span.get() or Span("untracked")
+
+
+def load_reports(history_file: Path) -> list[dict]:
+    if not history_file.exists():
+        return []
+    reports = []
+    for line in history_file.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            try:
+                reports.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return reports
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize_reports(reports: list[dict]) -> dict[str, dict]:
+    """按阶段汇总多次运行：次数、总耗时、均值、p50/p95、字节数、token 数（含缓存）、重试次数、错误数
+
+    记录了首字延迟（attrs["ttft"]，流式调用）的阶段另给出首字延迟的 p50/p95。
+    """
+    stages: dict[str, dict] = {}
+    for report in reports:
+        runs = [("run", report["duration"], {}, report["status"] != "ok")]
+        runs += [
+            (s["name"].split("[", 1)[0], s["duration"], s, s["status"] != "ok")
+            for s in report.get("spans", [])
+        ]
+        for stage, duration, data, failed in runs:
+            entry = stages.setdefault(stage, {
+                "count": 0, "durations": [], "bytes_in": 0, "bytes_out": 0,
+                "input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "cache_creation_tokens": 0,
+                "retries": 0, "errors": 0, "ttfts": [],
+            })
+            entry["count"] += 1
+            entry["durations"].append(duration)
+            if data.get("attrs", {}).get("ttft") is not None:
+                entry["ttfts"].append(data["attrs"]["ttft"])
+            entry["errors"] += int(failed)
+            for key in ("bytes_in", "bytes_out", "input_tokens", "output_tokens",
+                        "cache_read_tokens", "cache_creation_tokens", "retries"):
+                entry[key] += data.get(key, 0)
+
+    for entry in stages.values():
+        durations = entry.pop("durations")
+        ttfts = entry.pop("ttfts")
+        if ttfts:
+            entry.update(ttft_p50=_percentile(ttfts, 0.5), ttft_p95=_percentile(ttfts, 0.95))
+        entry.update(
+            total=sum(durations),
+            mean=statistics.mean(durations),
+            p50=_percentile(durations, 0.5),
+            p95=_percentile(durations, 0.95),
+        )
+    return stages
+
+
+def print_summary(history_file: Path) -> None:
+    reports = load_reports(history_file)
+    if not reports:
+        print(f"[INFO] No run reports in {history_file}")
+        return
+    summary = summarize_reports(reports)
+    total = summary.pop("run")
+    print(f"[INFO] {len(reports)} run(s) in {history_file}, {total['errors']} failed, "
+          f"mean {total['mean']:.1f}s, p95 {total['p95']:.1f}s")
+    print(f"       {'stage':<10}{'count':>6}{'mean':>8}{'p50':>8}{'p95':>8}{'share':>7}"
+          f"{'MB in':>8}{'MB out':>8}{'tok in':>9}{'tok out':>9}{'cache rd':>9}{'cache wr':>9}{'retry':>6}{'err':>5}")
+    for stage, entry in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+        print(f"       {stage:<10}{entry['count']:>6}{entry['mean']:>7.2f}s{entry['p50']:>7.2f}s{entry['p95']:>7.2f}s"
+              f"{entry['total'] / max(total['total'], 1e-9):>7.0%}"
+              f"{entry['bytes_in'] / 1e6:>8.2f}{entry['bytes_out'] / 1e6:>8.2f}"
+              f"{entry['input_tokens']:>9}{entry['output_tokens']:>9}"
+              f"{entry['cache_read_tokens']:>9}{entry['cache_creation_tokens']:>9}{entry['retries']:>6}{entry['errors']:>5}")
+    for stage, entry in sorted(summary.items()):
+        if "ttft_p50" in entry:
+            print(f"       {stage} time to first token: p50 {entry['ttft_p50']:.2f}s, p95 {entry['ttft_p95']:.2f}s")
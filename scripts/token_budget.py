@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线 token 估算与输入预算
+不同文字的 token 密度差别很大：中文大约每个汉字 1 个 token，英文大约 4 个字符 1 个 token，
+公式里的符号、希腊字母和数字则切得更碎。按字符数截断要么浪费上下文、要么超出预算，
+这里按文字类别分别计数，得到不依赖网络的启发式估算。
+
+估算值按模型校准：每次 API 调用返回实际 input_tokens 后，记录 实际/估算 的比值
+（前几次取累计平均，之后做指数滑动平均），保存在校准文件里，下次运行继续使用。
+
+环境变量:
+  - INPUT_TOKEN_BUDGET: 单次调用的输入 token 预算（默认按模型取 MODEL_INPUT_BUDGETS）
+  - TOKEN_CALIBRATION_FILE: 校准数据文件（默认 outputs/.cache/token-calibration.json）
+"""
+
+import os
+import re
+import json
+import threading
+from pathlib import Path
+
+from paper_cache import write_text_atomic
+
+
+INPUT_TOKEN_BUDGET = int(os.environ.get("INPUT_TOKEN_BUDGET", "0"))
+TOKEN_CALIBRATION_FILE = Path(os.environ.get("TOKEN_CALIBRATION_FILE", "outputs/.cache/token-calibration.json"))
+
+# 模型名前缀 -> 输入 token 预算（单价越低的模型给越多上下文）
+MODEL_INPUT_BUDGETS = {
+    "claude-opus": 30000,
+    "claude-sonnet": 40000,
+    "claude-haiku": 60000,
+}
+DEFAULT_INPUT_BUDGET = 30000
+# 模型上下文窗口（输入 + 输出）
+MODEL_CONTEXT_WINDOW = 200000
+
+# 每条消息的固定开销（角色标记等）
+MESSAGE_OVERHEAD_TOKENS = 10
+
+# 各文字类别的 token 系数（未校准的初值）
+_TOKEN_PATTERNS = [
+    # 汉字、假名、韩文及全角标点：约每字 1 个 token
+    ("cjk", re.compile(r"[　-〿぀-ヿ㐀-䶿一-鿿가-힯豈-﫿＀-￯]"), 1.0),
+    # 英文单词：约 4 个字母 1 个 token，短词至少 1 个
+    ("word", re.compile(r"[A-Za-z]+"), None),
+    # 数字串：约 3 位 1 个 token
+    ("digits", re.compile(r"\d+"), None),
+    # 数学符号、希腊字母等其他非 ASCII 字符：多字节，常被切成 1~2 个 token
+    ("symbol", re.compile(r"[^\x00-\x7f　-〿぀-ヿ㐀-䶿一-鿿가-힯豈-﫿＀-￯]"), 1.5),
+    # ASCII 标点（公式里的括号、下标、运算符）
+    ("punct", re.compile(r"[!-/:-@\[-`{-~]"), 0.7),
+    # 换行（空格通常并入后面的单词）
+    ("newline", re.compile(r"\n+"), 1.0),
+]
+
+
+def raw_token_estimate(text: str) -> float:
+    """未校准的 token 估算"""
+    total = 0.0
+    for kind, pattern, weight in _TOKEN_PATTERNS:
+        if kind == "word":
+            total += sum(0.2 + len(m) * 0.25 for m in pattern.findall(text))
+        elif kind == "digits":
+            total += sum(0.3 + len(m) / 3 for m in pattern.findall(text))
+        else:
+            total += weight * len(pattern.findall(text))
+    return total
+
+
+def input_token_budget(model: str, max_tokens: int = 0) -> int:
+    """模型的输入 token 预算（INPUT_TOKEN_BUDGET 优先），不超过上下文窗口减去输出预留"""
+    budget = INPUT_TOKEN_BUDGET or next(
+        (value for prefix, value in MODEL_INPUT_BUDGETS.items() if model.startswith(prefix)),
+        DEFAULT_INPUT_BUDGET,
+    )
+    return min(budget, MODEL_CONTEXT_WINDOW - max_tokens)
+
+
+_calibration_lock = threading.Lock()
+
+
+class TokenEstimator:
+    """按模型校准的 token 估算器"""
+
+    # 比值的合理范围：超出说明用量数据异常（例如包含了缓存或重试），不参与校准
+    MIN_RATIO, MAX_RATIO = 0.33, 3.0
+    # 指数滑动平均的最小权重（样本较少时退化为累计平均）
+    MIN_WEIGHT = 0.1
+
+    def __init__(self, model: str, calibration_file: Path = TOKEN_CALIBRATION_FILE):
+        self.model = model
+        self.calibration_file = Path(calibration_file)
+        entry = self._load().get(model, {})
+        self.ratio = float(entry.get("ratio", 1.0))
+        self.samples = int(entry.get("samples", 0))
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.calibration_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def estimate(self, text: str) -> int:
+        """校准后的 token 估算"""
+        return round(raw_token_estimate(text) * self.ratio)
+
+    def estimate_messages(self, system: str, prompt: str) -> int:
+        """一次调用（系统提示词 + 用户消息）的输入 token 估算"""
+        return self.estimate(system) + self.estimate(prompt) + MESSAGE_OVERHEAD_TOKENS
+
+    def record(self, estimated: int, actual: int) -> None:
+        """记录一次调用的估算值与实际 input_tokens，更新并保存校准比值"""
+        if estimated <= 0 or actual <= 0:
+            return
+        raw = estimated / self.ratio
+        observed = actual / raw
+        if not self.MIN_RATIO <= observed <= self.MAX_RATIO:
+            return
+
+        with _calibration_lock:
+            # 重新读取：同一进程内的其他论文、其他 worker 进程可能刚刚更新过
+            data = self._load()
+            entry = data.get(self.model, {})
+            samples = int(entry.get("samples", 0))
+            ratio = float(entry.get("ratio", 1.0))
+            weight = max(self.MIN_WEIGHT, 1 / (samples + 1))
+            self.ratio = ratio + (observed - ratio) * weight
+            self.samples = samples + 1
+            data[self.model] = {"ratio": round(self.ratio, 4), "samples": self.samples}
+
+            try:
+                self.calibration_file.parent.mkdir(parents=True, exist_ok=True)
+                write_text_atomic(self.calibration_file, json.dumps(data, indent=2))
+            except OSError as e:
+                print(f"[WARN] Could not save token calibration: {e}")
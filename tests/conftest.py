@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+测试共用的夹具：scripts/ 和 benchmarks/（假服务）加入导入路径，流水线在临时工作目录中运行
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "scripts"))
+sys.path.insert(0, str(REPO_DIR / "benchmarks"))
+
+from stub_servers import StubServer  # noqa: E402
+
+
+@pytest.fixture
+def stub_server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture
+def reader_env(stub_server) -> dict[str, str]:
+    """子进程运行 cloud_paper_reader.py 的环境变量：Claude 指向假服务，不生成配图，在主进程内渲染 PDF"""
+    env = {
+        **os.environ,
+        "ANTHROPIC_API_KEY": "test",
+        "ANTHROPIC_BASE_URL": stub_server.base_url,
+        "PDF_RENDER_WORKERS": "0",
+        "PYTHONUNBUFFERED": "1",
+    }
+    for name in ("GEMINI_API_KEY", "DASHSCOPE_API_KEY", "CIRCUIT_STATE_FILE"):
+        env.pop(name, None)
+    return env
+
+
+def copy_papers(papers_dir: Path, count: int) -> list[Path]:
+    """复制 count 份内容各不相同的示例论文（已处理清单按内容哈希去重）"""
+    papers_dir.mkdir(parents=True, exist_ok=True)
+    papers = []
+    for i in range(count):
+        paper = papers_dir / f"paper-{i}.pdf"
+        shutil.copy(REPO_DIR / "transformer-paper.pdf", paper)
+        with open(paper, "ab") as f:
+            f.write(f"%{i}\n".encode())
+        papers.append(paper)
+    return papers
+
+
+def run_reader(workdir: Path, env: dict[str, str], *args: str, timeout: float = 120) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, str(REPO_DIR / "scripts" / "cloud_paper_reader.py"), *args],
+        cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout,
+    )
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+熔断器测试：假的 Claude / Gemini 接口返回指定状态码，检查熔断、快速失败、半开探测和恢复
+"""
+
+import sys
+import types
+
+import httpx
+import anyio
+import pytest
+
+import cloud_paper_reader
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakers, is_endpoint_failure
+from stub_servers import FakeClaude, FakeGemini
+
+COOLDOWN = 0.5
+
+
+@pytest.fixture
+def breakers(tmp_path, monkeypatch) -> CircuitBreakers:
+    breakers = CircuitBreakers(state_file=tmp_path / "circuit-breakers.json", enabled=True,
+                               failure_rate=0.5, min_calls=4, window=10, cooldown=COOLDOWN)
+    monkeypatch.setattr(cloud_paper_reader, "endpoint_breakers", breakers)
+    return breakers
+
+
+@pytest.fixture
+def claude_env(stub_server, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", stub_server.base_url)
+    return stub_server
+
+
+def call_claude(calls: int = 1) -> list[str]:
+    """并发调用 calls 次 call_api_direct，按调用顺序返回结果"""
+    results = [""] * calls
+
+    async def call(index: int) -> None:
+        results[index] = await cloud_paper_reader.call_api_direct("prompt", system="system")
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            for index in range(calls):
+                tg.start_soon(call, index)
+
+    anyio.run(main)
+    return results
+
+
+def http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://stub/")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+def test_is_endpoint_failure():
+    assert is_endpoint_failure(503) and is_endpoint_failure(429) and is_endpoint_failure(408)
+    assert not is_endpoint_failure(400) and not is_endpoint_failure(200)
+    assert is_endpoint_failure(http_error(502))
+    assert not is_endpoint_failure(http_error(400))
+    assert is_endpoint_failure(httpx.ConnectError("refused"))
+    assert is_endpoint_failure(httpx.ReadTimeout("timeout"))
+    assert is_endpoint_failure(TimeoutError())
+    # 与服务是否可用无关的异常不计为失败
+    assert not is_endpoint_failure(ValueError("bad json"))
+    assert not is_endpoint_failure(KeyError("content"))
+
+
+def test_outage_opens_then_single_probe_closes(claude_env, breakers):
+    claude = FakeClaude(claude_env, status=503)
+    breaker = breakers["claude_api"]
+
+    assert call_claude(4) == ["API 调用失败: 503"] * 4
+    assert breaker.state == OPEN and len(claude.requests) == 4
+
+    # 熔断中：直接失败，不再发出请求
+    results = call_claude(3)
+    assert all("circuit open" in result for result in results)
+    assert len(claude.requests) == 4
+
+    # 冷却结束后只放行一个探测请求，其余调用仍然快速失败
+    anyio.run(anyio.sleep, COOLDOWN)
+    claude.status, claude.latency = 200, 0.3
+    results = call_claude(3)
+    assert len(claude.requests) == 5
+    assert sum(result.startswith("# 测试论文解读") for result in results) == 1
+    assert sum("circuit open" in result for result in results) == 2
+    assert breaker.state == CLOSED and breaker.trips == 0
+
+    claude.latency = 0
+    assert call_claude(2)[0].startswith("# 测试论文解读")
+    assert len(claude.requests) == 7
+
+
+def test_failed_probe_reopens_with_backoff(claude_env, breakers):
+    claude = FakeClaude(claude_env, status=500)
+    breaker = breakers["claude_api"]
+    call_claude(4)
+    assert breaker.state == OPEN and breaker.trips == 1
+
+    anyio.run(anyio.sleep, COOLDOWN)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    breaker.release()
+
+    call_claude(1)
+    assert len(claude.requests) == 5
+    assert breaker.state == OPEN and breaker.trips == 2
+    assert breaker.cooldown == pytest.approx(2 * COOLDOWN)
+
+    # 状态写入文件，下次运行继续熔断
+    reloaded = CircuitBreakers(state_file=breakers.state_file, cooldown=COOLDOWN)
+    assert reloaded["claude_api"].state == OPEN
+    assert not reloaded["claude_api"].allow()
+
+
+class CLIConnectionError(Exception):
+    """假 SDK 的连接错误（与真实 SDK 的异常一样不是 httpx 异常）"""
+
+
+@pytest.fixture
+def failing_sdk(monkeypatch):
+    """假的 claude_agent_sdk：每次 query 都抛出连接错误，记录调用次数"""
+    sdk = types.ModuleType("claude_agent_sdk")
+    sdk.calls = 0
+
+    async def query(**kwargs):
+        sdk.calls += 1
+        raise CLIConnectionError("Failed to connect to Claude Code CLI")
+        yield  # 使 query 成为异步生成器
+
+    sdk.query = query
+    monkeypatch.setitem(sys.modules, "claude_agent_sdk", sdk)
+    return sdk
+
+
+def test_failing_sdk_opens_and_fails_fast(claude_env, breakers, failing_sdk):
+    claude = FakeClaude(claude_env)
+    breaker = breakers["claude_sdk"]
+
+    async def main():
+        return [await cloud_paper_reader.call_claude("prompt", system="system") for _ in range(6)]
+
+    results = anyio.run(main)
+    # 每次都退回直接调用 API 并成功；SDK 失败 4 次后熔断，之后不再尝试 SDK
+    assert all(result.startswith("# 测试论文解读") for result in results)
+    assert failing_sdk.calls == 4
+    assert breaker.state == OPEN and breaker.outcomes == [False] * 4
+    assert len(claude.requests) == 6
+    assert breakers["claude_api"].state == CLOSED
+
+
+def test_client_errors_do_not_open(claude_env, breakers):
+    claude = FakeClaude(claude_env, status=400)
+    assert call_claude(6) == ["API 调用失败: 400"] * 6
+    assert breakers["claude_api"].state == CLOSED
+    assert breakers["claude_api"].outcomes == [True] * 6
+    assert len(claude.requests) == 6
+
+
+@pytest.mark.parametrize("status, state", [(400, CLOSED), (503, OPEN)])
+def test_image_status_is_classified(stub_server, breakers, tmp_path, monkeypatch, status, state):
+    """配图服务拒绝请求（如内容审核返回 400）不计为故障，5xx 计为故障"""
+    gemini = FakeGemini(stub_server, status=status)
+    monkeypatch.setattr(cloud_paper_reader, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(cloud_paper_reader, "GEMINI_BASE_URL", f"{stub_server.base_url}/v1beta/models")
+    monkeypatch.setattr(cloud_paper_reader, "IMAGE_OUTPUT_DIR", tmp_path / "images")
+    monkeypatch.setattr(cloud_paper_reader, "IMAGE_CACHE_DIR", tmp_path / "cache")
+
+    providers = {"gemini": (cloud_paper_reader.generate_image_gemini, [f"prompt {i}" for i in range(4)])}
+    images = anyio.run(cloud_paper_reader.generate_images_parallel, providers)
+    assert images == []
+    assert gemini.requests == 4
+    assert breakers["gemini"].state == state
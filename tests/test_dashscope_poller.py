@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+DashScope 集中轮询器测试：假的 DashScope 任务接口（FakeDashScope），与原来的固定间隔轮询比较空等和查询次数
+（时间尺度按比例缩小：固定间隔 0.5s，任务耗时 1.5~2.5s）
+"""
+
+import time
+import statistics
+
+import anyio
+import pytest
+
+from dashscope_poller import DashScopePoller
+from http_pool import http_client, http_client_lifespan
+from stub_servers import FakeDashScope
+
+FIXED_INTERVAL = 0.5
+TASKS, ROUNDS = 6, 3
+
+
+async def submit(client, api_root: str) -> str:
+    response = await client.post(f"{api_root}/services/aigc/text2image/image-synthesis",
+                                 json={"model": "fake", "input": {"prompt": "x"}})
+    return response.json()["output"]["task_id"]
+
+
+async def wait_fixed_interval(client, api_root: str, task_id: str) -> None:
+    """原来的轮询方式：每个任务固定间隔查询一次"""
+    while True:
+        await anyio.sleep(FIXED_INTERVAL)
+        response = await client.get(f"{api_root}/tasks/{task_id}")
+        if response.json()["output"]["task_status"] == "SUCCEEDED":
+            return
+
+
+def run_rounds(stub_server, adaptive: bool) -> tuple[list[float], int, DashScopePoller]:
+    """分 ROUNDS 轮、每轮并发 TASKS 个任务，返回 (各任务就绪到唤醒的空等, 查询总数, 轮询器)"""
+    fake = FakeDashScope(stub_server, min_seconds=1.5, max_seconds=2.5)
+    api_root = f"{stub_server.base_url}/api/v1"
+    poller = DashScopePoller(api_root, "test", min_interval=FIXED_INTERVAL / 2, max_interval=FIXED_INTERVAL,
+                             poll_ratio=0.2)
+    lags: list[float] = []
+
+    async def main():
+        async with http_client_lifespan(), http_client() as client, anyio.create_task_group() as poller_tg:
+            poller_tg.start_soon(poller.run)
+
+            async def one_task():
+                task_id = await submit(client, api_root)
+                if adaptive:
+                    result = await poller.wait(task_id, timeout=10)
+                    assert result["output"]["task_status"] == "SUCCEEDED"
+                else:
+                    await wait_fixed_interval(client, api_root, task_id)
+                lags.append(time.monotonic() - fake.ready_at[task_id])
+
+            for _ in range(ROUNDS):
+                async with anyio.create_task_group() as tg:
+                    for _ in range(TASKS):
+                        tg.start_soon(one_task)
+            poller_tg.cancel_scope.cancel()
+
+    anyio.run(main)
+    return lags, sum(fake.polls.values()), poller
+
+
+def test_adaptive_poller_beats_fixed_interval(stub_server):
+    fixed_lags, fixed_polls, _ = run_rounds(stub_server, adaptive=False)
+    stub_server.routes.clear()
+    lags, polls, poller = run_rounds(stub_server, adaptive=True)
+
+    assert len(lags) == TASKS * ROUNDS
+    assert polls == poller.poll_requests
+    # 两次查询的间隔不超过固定间隔：空等有同样的上限（留出调度和请求的余量）
+    assert max(lags) < FIXED_INTERVAL + 0.3
+    assert statistics.mean(lags) < statistics.mean(fixed_lags)
+    assert polls < fixed_polls
+
+
+def test_schedule_follows_completion_history():
+    poller = DashScopePoller("http://unused", "test", min_interval=1.0, max_interval=2.0, poll_ratio=0.2)
+    # 样本不足：与固定间隔相同
+    assert poller.first_poll_delay() == 2.0
+    assert poller._next_interval(5.0) == 2.0
+
+    poller.completion_times.extend([5.0 + i for i in range(10)])
+    assert poller.first_poll_delay() == 6.0
+    # p90 之前密集查询，之后逐渐拉长，不超过 max_interval
+    assert poller._next_interval(8.0) == 1.0
+    assert poller._next_interval(16.5) == pytest.approx(1.5)
+    assert poller._next_interval(60.0) == 2.0
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+ImageRouter.race 对冲请求测试：桩服务（协程）+ 假的 Gemini 接口（FakeGemini）
+"""
+
+import time
+
+import anyio
+import pytest
+
+import cloud_paper_reader
+import image_router
+from image_router import ImageRouter
+from stub_servers import TINY_PNG, FakeGemini
+
+
+class StubProvider:
+    """等待 seconds 秒后返回 data（None 表示失败，或抛出 error）；记录调用、完成和被取消的次数"""
+
+    def __init__(self, seconds: float = 0.0, data: bytes | None = TINY_PNG, error: Exception | None = None):
+        self.seconds = seconds
+        self.data = data
+        self.error = error
+        self.calls = 0
+        self.started_at: list[float] = []
+        self.finished = 0
+        self.cancelled = 0
+
+    async def __call__(self) -> bytes | None:
+        self.calls += 1
+        self.started_at.append(time.monotonic())
+        try:
+            await anyio.sleep(self.seconds)
+        except anyio.get_cancelled_exc_class():
+            self.cancelled += 1
+            raise
+        self.finished += 1
+        if self.error:
+            raise self.error
+        return self.data
+
+
+def race(router: ImageRouter, attempts) -> tuple:
+    async def main():
+        started = time.monotonic()
+        result = await router.race(attempts)
+        return result, started
+
+    return anyio.run(main)
+
+
+@pytest.fixture(autouse=True)
+def short_min_delay(monkeypatch):
+    monkeypatch.setattr(image_router, "IMAGE_HEDGE_MIN_DELAY", 0.05)
+
+
+def test_fast_primary_does_not_hedge():
+    router = ImageRouter(hedge_delay=1.0)
+    primary, backup = StubProvider(0.05), StubProvider()
+
+    result, _ = race(router, [("gemini", primary), ("dashscope", backup)])
+    assert (result.provider, result.data, result.attempted) == ("gemini", TINY_PNG, ["gemini"])
+    assert backup.calls == 0
+
+
+def test_hedges_after_default_delay_and_cancels_loser():
+    router = ImageRouter(hedge_delay=0.3)
+    primary, backup = StubProvider(5.0, data=b"slow"), StubProvider(0.05)
+
+    result, started = race(router, [("gemini", primary), ("dashscope", backup)])
+    assert result.provider == "dashscope" and result.data == TINY_PNG
+    assert result.attempted == ["gemini", "dashscope"]
+    assert 0.25 <= backup.started_at[0] - started < 1.0
+    # 主服务的请求被取消，不计入它的统计
+    assert primary.cancelled == 1 and primary.finished == 0
+    assert len(router.stats["gemini"].outcomes) == 0
+    assert list(router.stats["dashscope"].outcomes) == [True]
+
+
+def test_hedges_after_p90_of_history():
+    router = ImageRouter(hedge_delay=30.0)
+    for elapsed in [0.1] * 9 + [0.4]:
+        router.stats.setdefault("gemini", image_router.ProviderStats()).record(True, elapsed)
+    assert router.hedge_delay("gemini") == pytest.approx(0.4)
+
+    primary, backup = StubProvider(5.0), StubProvider(0.0)
+    result, started = race(router, [("gemini", primary), ("dashscope", backup)])
+    assert result.provider == "dashscope"
+    # 按 p90（0.4s）而不是默认的 30s 发出对冲请求
+    assert 0.35 <= backup.started_at[0] - started < 2.0
+    assert primary.cancelled == 1
+
+
+def test_fails_over_immediately_on_failure():
+    router = ImageRouter(hedge_delay=10.0)
+    failing, raising, backup = StubProvider(data=None), StubProvider(error=RuntimeError("boom")), StubProvider()
+
+    result, started = race(router, [("gemini", failing), ("dashscope", backup)])
+    assert result.provider == "dashscope"
+    assert backup.started_at[0] - started < 1.0
+
+    result, _ = race(router, [("dashscope", raising), ("gemini", backup)])
+    assert result.provider == "gemini"
+    assert list(router.stats["dashscope"].outcomes) == [True, False]
+
+
+def test_all_providers_fail():
+    router = ImageRouter(hedge_delay=10.0)
+    result, _ = race(router, [("gemini", StubProvider(data=None)), ("dashscope", StubProvider(data=None))])
+    assert (result.provider, result.data, result.attempted) == (None, None, ["gemini", "dashscope"])
+
+
+def test_order_switches_after_errors():
+    router = ImageRouter(hedge_delay=1.0)
+    assert router.order(["gemini", "dashscope"]) == ["gemini", "dashscope"]
+
+    failing, backup = StubProvider(data=None), StubProvider(0.01)
+    for _ in range(3):
+        order = router.order(["gemini", "dashscope"])
+        race(router, [(name, {"gemini": failing, "dashscope": backup}[name]) for name in order])
+    assert router.order(["gemini", "dashscope"]) == ["dashscope", "gemini"]
+    # 切换后 Gemini 不再被首先调用
+    assert failing.calls == 1
+
+
+@pytest.fixture
+def fake_gemini_env(stub_server, monkeypatch):
+    monkeypatch.setattr(cloud_paper_reader, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(cloud_paper_reader, "GEMINI_BASE_URL", f"{stub_server.base_url}/v1beta/models")
+    return stub_server
+
+
+def gemini_attempt():
+    return cloud_paper_reader.generate_image_gemini("prompt", 1)
+
+
+def test_gemini_outage_fails_over(fake_gemini_env):
+    gemini = FakeGemini(fake_gemini_env, status=503)
+    router, backup = ImageRouter(hedge_delay=10.0), StubProvider()
+
+    result, started = race(router, [("gemini", gemini_attempt), ("dashscope", backup)])
+    assert gemini.requests == 1
+    assert result.provider == "dashscope"
+    assert backup.started_at[0] - started < 5.0
+    assert list(router.stats["gemini"].outcomes) == [False]
+
+    gemini.status = 200
+    result, _ = race(router, [("gemini", gemini_attempt), ("dashscope", backup)])
+    assert result.provider == "gemini" and result.data == TINY_PNG
+
+
+def test_slow_gemini_is_hedged_and_cancelled(fake_gemini_env):
+    gemini = FakeGemini(fake_gemini_env, latency=3.0)
+    router, backup = ImageRouter(hedge_delay=0.3), StubProvider()
+
+    result, started = race(router, [("gemini", gemini_attempt), ("dashscope", backup)])
+    assert result.provider == "dashscope"
+    # 不等 Gemini 返回：取消它的请求后立即结束
+    assert time.monotonic() - started < 2.0
+    assert gemini.requests == 1
+    assert len(router.stats["gemini"].outcomes) == 0
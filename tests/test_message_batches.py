@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+--bulk 模式（Message Batches）端到端测试：假的 /v1/messages/batches，子进程运行 cloud_paper_reader.py
+"""
+
+import json
+import time
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR, copy_papers, run_reader
+from message_batches import PendingBatch
+from stub_servers import FakeClaude, FakeMessageBatches
+
+
+def processed_papers(workdir) -> set[str]:
+    manifest = workdir / "outputs" / "processed.json"
+    if not manifest.exists():
+        return set()
+    return {entry["paper"] for entry in json.loads(manifest.read_text(encoding="utf-8")).values()}
+
+
+@pytest.fixture
+def bulk_env(reader_env):
+    return {**reader_env, "BULK_POLL_INTERVAL": "0.2"}
+
+
+def test_submit_poll_and_resubmit_errored(tmp_path, stub_server, bulk_env):
+    copy_papers(tmp_path / "papers", 3)
+    batches = FakeMessageBatches(stub_server, FakeClaude(stub_server), processing_seconds=0.5,
+                                 fail_custom_ids={"paper-1"})
+
+    result = run_reader(tmp_path, bulk_env, "--bulk")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert len(batches.batches) == 1
+    assert len(batches.batches["msgbatch_0001"]["requests"]) == 3
+    assert batches.polls >= 2
+    assert "1 failed" in result.stdout
+    assert processed_papers(tmp_path) == {"papers/paper-0.pdf", "papers/paper-2.pdf"}
+    assert not (tmp_path / "outputs" / "message-batch.json").exists()
+
+    # 下一次运行只重新提交出错的论文
+    result = run_reader(tmp_path, bulk_env, "--bulk")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert len(batches.batches) == 2
+    assert [r["custom_id"] for r in batches.batches["msgbatch_0002"]["requests"]] == ["paper-0"]
+    assert len(processed_papers(tmp_path)) == 3
+
+    result = run_reader(tmp_path, bulk_env, "--bulk")
+    assert "No unprocessed PDF files" in result.stdout
+    assert len(batches.batches) == 2
+
+
+def test_resume_saved_batch(tmp_path, stub_server, bulk_env):
+    copy_papers(tmp_path / "papers", 2)
+    batches = FakeMessageBatches(stub_server, FakeClaude(stub_server), processing_seconds=3600)
+    state_file = tmp_path / "outputs" / "message-batch.json"
+
+    # 提交后、批次结束前中断运行
+    process = subprocess.Popen(
+        [sys.executable, str(REPO_DIR / "scripts" / "cloud_paper_reader.py"), "--bulk"],
+        cwd=tmp_path, env=bulk_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while not state_file.exists() and time.monotonic() < deadline:
+            time.sleep(0.1)
+    finally:
+        process.kill()
+        process.wait()
+    pending = PendingBatch.load(state_file)
+    assert pending is not None and pending.id == "msgbatch_0001"
+    assert processed_papers(tmp_path) == set()
+
+    # 再次运行：继续轮询同一个批次，不重复提交
+    batches.processing_seconds = 0
+    result = run_reader(tmp_path, bulk_env, "--bulk")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Resuming batch msgbatch_0001" in result.stdout
+    assert len(batches.batches) == 1
+    assert len(processed_papers(tmp_path)) == 2
+    assert not state_file.exists()
+
+
+def test_stale_state_is_discarded(tmp_path, stub_server, bulk_env):
+    copy_papers(tmp_path / "papers", 1)
+    batches = FakeMessageBatches(stub_server, FakeClaude(stub_server), processing_seconds=0)
+    state_file = tmp_path / "outputs" / "message-batch.json"
+    PendingBatch("msgbatch_unknown", {"paper-0": "papers/paper-0.pdf"}, "2026-01-01T00:00:00").save(state_file)
+
+    # 批次不存在（404）：报错退出而不是抛出未处理的异常，并删除状态文件
+    result = run_reader(tmp_path, bulk_env, "--bulk")
+    assert result.returncode == 1
+    assert "[ERROR]" in result.stdout and "msgbatch_unknown" in result.stdout
+    assert "Traceback" not in result.stderr
+    assert not state_file.exists()
+
+    # 下一次运行重新提交
+    result = run_reader(tmp_path, bulk_env, "--bulk")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert len(batches.batches) == 1
+    assert processed_papers(tmp_path) == {"papers/paper-0.pdf"}
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+已处理论文清单：多个进程同时记录时不丢失条目，也不留下写了一半的文件
+"""
+
+import json
+import subprocess
+import sys
+
+from conftest import REPO_DIR
+
+WORKERS, PAPERS_PER_WORKER = 4, 25
+
+RECORD_SCRIPT = """
+import sys
+from pathlib import Path
+sys.path.insert(0, {scripts!r})
+from cloud_paper_reader import record_processed
+
+worker = int(sys.argv[1])
+for i in range({count}):
+    paper = Path("papers") / f"paper-{{worker}}-{{i}}.pdf"
+    paper.write_bytes(f"{{worker}}-{{i}}".encode())
+    record_processed(str(paper), Path("outputs") / f"{{paper.stem}}.md")
+"""
+
+
+def test_concurrent_workers_keep_all_entries(tmp_path):
+    (tmp_path / "papers").mkdir()
+    script = RECORD_SCRIPT.format(scripts=str(REPO_DIR / "scripts"), count=PAPERS_PER_WORKER)
+    workers = [subprocess.Popen([sys.executable, "-c", script, str(worker)], cwd=tmp_path)
+               for worker in range(WORKERS)]
+    assert all(worker.wait(timeout=120) == 0 for worker in workers)
+
+    manifest = json.loads((tmp_path / "outputs" / "processed.json").read_text(encoding="utf-8"))
+    assert len(manifest) == WORKERS * PAPERS_PER_WORKER
+    assert not list((tmp_path / "outputs").glob(".tmp-*"))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+流式调用（SSE）：损坏的 data 行按流中断处理并续写；首字延迟记录到运行报告
+"""
+
+import anyio
+import pytest
+
+import cloud_paper_reader
+from circuit_breaker import CircuitBreakers
+from run_report import run_report, span, summarize_reports
+from stub_servers import FakeClaude
+
+
+@pytest.fixture
+def claude_env(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", stub_server.base_url)
+    monkeypatch.setattr(cloud_paper_reader, "endpoint_breakers",
+                        CircuitBreakers(state_file=tmp_path / "circuit-breakers.json"))
+    return stub_server
+
+
+def stream(tmp_path) -> tuple[str, dict]:
+    async def main():
+        with run_report("paper.pdf") as report:
+            with span("llm"):
+                text = await cloud_paper_reader.call_api_stream("prompt", tmp_path / "out.md", system="system")
+        return text, report.to_dict()
+
+    return anyio.run(main)
+
+
+@pytest.mark.parametrize("options", [{"malformed_streams": 1}, {"interrupt_streams": 1}])
+def test_broken_stream_resumes_from_prefix(claude_env, tmp_path, options):
+    claude = FakeClaude(claude_env, **options)
+
+    text, report = stream(tmp_path)
+    assert text == claude.reply_text()
+    assert (tmp_path / "out.md").read_text(encoding="utf-8") == text
+    assert len(claude.requests) == 2
+    assert claude.requests[1]["messages"][-1]["role"] == "assistant"
+    llm = report["spans"][0]
+    assert llm["retries"] == 1 and llm["status"] == "ok"
+
+
+def test_time_to_first_token_is_reported(claude_env, tmp_path):
+    FakeClaude(claude_env, latency=0.2)
+
+    _, report = stream(tmp_path)
+    ttft = report["spans"][0]["attrs"]["ttft"]
+    assert 0.2 <= ttft < 5
+
+    summary = summarize_reports([report, report])
+    assert summary["llm"]["ttft_p50"] == ttft
+    assert "ttft_p50" not in summary["run"]